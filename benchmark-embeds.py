@@ -0,0 +1,58 @@
+"""
+This script compares the speed of the ways we have to find embedded tweets, using the HTML test fixtures. The results
+of each way must be the same. It times:
+* `Article(html=...)`: the full pipeline, which also extracts the content and searches it for mentions
+* `find_embeds`: parsing the HTML into a tree and searching that
+* `scan_embeds`: the dedicated embed scanner, which never builds a tree
+"""
+
+import os
+import time
+import logging
+import lxml.html
+
+from tweetfinder import Article
+from tweetfinder.embeds import find_embeds, scan_embeds
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger('readability.readability').setLevel(logging.WARNING)
+
+FIXTURES_DIR = "tweetfinder/test/fixtures"
+REPEAT = 20  # run each way this many times on each fixture, and report the average
+
+
+def embeds_via_article(raw_html: bytes):
+    return Article(html=raw_html.decode("utf-8")).list_embedded_tweets()
+
+
+def embeds_via_tree(raw_html: bytes):
+    return find_embeds(lxml.html.document_fromstring(raw_html))
+
+
+def time_it(fn, raw_html: bytes) -> float:
+    start_time = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(raw_html)
+    return (time.perf_counter() - start_time) / REPEAT
+
+
+if __name__ == "__main__":
+    ways = dict(article=embeds_via_article, tree=embeds_via_tree, scan=scan_embeds)
+    totals = {name: 0 for name in ways}
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES_DIR, filename), "rb") as f:
+            raw_html = f.read()
+        expected = embeds_via_article(raw_html)
+        for name, fn in ways.items():
+            assert fn(raw_html) == expected, "{} found different embeds in {}".format(name, filename)
+        secs = {name: time_it(fn, raw_html) for name, fn in ways.items()}
+        for name in ways:
+            totals[name] += secs[name]
+        logger.info("{} ({} bytes, {} embeds): ".format(filename, len(raw_html), len(expected)) +
+                    ", ".join(["{} {:.2f}ms".format(name, secs[name] * 1000) for name in ways]))
+    logger.info("Total: " + ", ".join(["{} {:.2f}ms ({:.1f}x)".format(name, totals[name] * 1000,
+                                                                       totals['article'] / totals[name])
+                                       for name in ways]))
@@ -0,0 +1,113 @@
+"""
+This script benchmarks processing each of the HTML test fixtures, so we can catch performance regressions between
+releases. For each fixture it times every stage of the pipeline separately (parse, embeds, extract, language,
+mentions) and the whole `Article(html=...)`, then reports articles/sec and the peak memory used. Save the results as
+JSON with `--output`, and compare them to an earlier run with `--compare`:
+```
+python benchmark-fixtures.py --output before.json
+(change some code)
+python benchmark-fixtures.py --output after.json --compare before.json
+```
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import resource
+from statistics import median
+
+import tweetfinder
+from tweetfinder import Article
+from tweetfinder.stats import StageStats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger('readability.readability').setLevel(logging.WARNING)
+
+FIXTURES_DIR = "tweetfinder/test/fixtures"
+FIXTURES = ["1987377089.html", "buzzfeed.html", "cnn.html", "guardian.html", "npr.html", "time.html"]
+
+# the stages of processing an article, in the order they run
+STAGES = ['parse', 'embeds', 'extract', 'language', 'mentions']
+
+
+def benchmark_fixture(html: str, repeat: int) -> dict:
+    """Time each stage, and the whole thing, `repeat` times and return the median number of seconds for each."""
+    stage_secs = {stage: [] for stage in STAGES}
+    total_secs = []
+    for _ in range(repeat):
+        stats = StageStats()
+        start_time = time.perf_counter()
+        Article(html=html, stats=stats)
+        total_secs.append(time.perf_counter() - start_time)
+        for stage, totals in stats.to_dict().items():
+            stage_secs[stage].append(totals['secs'])
+    results = {stage: median(secs) for stage, secs in stage_secs.items()}
+    results['total'] = median(total_secs)
+    return results
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports this in kilobytes, but macOS reports it in bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run(repeat: int) -> dict:
+    fixtures = {}
+    for filename in FIXTURES:
+        with open(os.path.join(FIXTURES_DIR, filename)) as f:
+            html = f.read()
+        Article(html=html)  # warm up, so one-time setup isn't counted against the first fixture
+        fixtures[filename] = dict(bytes=len(html.encode("utf-8")), secs=benchmark_fixture(html, repeat))
+        logger.info("{}: ".format(filename) + ", ".join(["{} {:.2f}ms".format(stage, secs * 1000)
+                                                        for stage, secs in fixtures[filename]['secs'].items()]))
+    total_secs = sum([f['secs']['total'] for f in fixtures.values()])
+    return dict(
+        tweetfinder_version=tweetfinder.__version__,
+        python_version=platform.python_version(),
+        platform=platform.platform(),
+        repeat=repeat,
+        fixtures=fixtures,
+        articles_per_sec=len(fixtures) / total_secs,
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def compare(results: dict, earlier: dict) -> None:
+    """Log how much slower or faster each stage got on each fixture compared to an earlier run."""
+    for filename, fixture in results['fixtures'].items():
+        if filename not in earlier['fixtures']:
+            continue
+        changes = []
+        for stage, secs in fixture['secs'].items():
+            earlier_secs = earlier['fixtures'][filename]['secs'].get(stage)
+            if (stage == 'extract') and (earlier_secs is None):
+                earlier_secs = earlier['fixtures'][filename]['secs'].get('readability')  # what it used to be called
+            if earlier_secs:
+                changes.append("{} {:+.0f}%".format(stage, (secs - earlier_secs) / earlier_secs * 100))
+        logger.info("{} vs earlier: {}".format(filename, ", ".join(changes)))
+    logger.info("articles/sec: {:.1f} (was {:.1f}), peak RSS: {:.0f}MB (was {:.0f}MB)".format(
+        results['articles_per_sec'], earlier['articles_per_sec'], results['peak_rss_mb'], earlier['peak_rss_mb']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark processing the HTML test fixtures.")
+    parser.add_argument('--repeat', type=int, default=10, help="how many times to process each fixture")
+    parser.add_argument('--output', help="save the results to this JSON file")
+    parser.add_argument('--compare', help="compare the results to ones saved earlier in this JSON file")
+    options = parser.parse_args()
+    benchmark = run(options.repeat)
+    logger.info("{:.1f} articles/sec, peak RSS {:.0f}MB".format(benchmark['articles_per_sec'],
+                                                                  benchmark['peak_rss_mb']))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(benchmark, f, indent=2)
+        logger.info("Wrote results to {}".format(options.output))
+    if options.compare:
+        with open(options.compare) as f:
+            compare(benchmark, json.load(f))
@@ -0,0 +1,158 @@
+"""
+This script compares the ways we can pull the content out of an article (see `tweetfinder.extractors`), for speed and
+for how closely each one matches readability, which is what our published evaluation results used. It runs over the
+stories in the evaluation CSVs in `docs/evaluation`, from pages saved in a `SnapshotStore` so only the first run needs
+the network:
+```
+python compare-extractors.py --snapshot
+python compare-extractors.py
+```
+Or try it on the HTML test fixtures, without downloading anything:
+```
+python compare-extractors.py --fixtures
+```
+For each extractor it reports how long extracting took, how many mentions were found, how often the mention count is
+the same as readability's (and as the count in the CSV), and the share of readability's words it kept (recall) and of
+its own words that readability also kept (precision). The numbers for every page are saved to a CSV too.
+"""
+
+import os
+import re
+import csv
+import glob
+import time
+import logging
+import argparse
+from statistics import median
+from typing import Dict, List, Tuple
+
+import lxml.html
+
+from tweetfinder import Article
+from tweetfinder.evaluation import SnapshotStore, take_snapshots
+from tweetfinder.extractors import EXTRACTORS, ReadabilityExtractor
+from tweetfinder.stats import StageStats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger('readability.readability').setLevel(logging.WARNING)
+
+EVALUATION_CSVS = "docs/evaluation/*.csv"
+FIXTURES_DIR = "tweetfinder/test/fixtures"
+SNAPSHOT_DIR = "evaluation-snapshots"
+OUTPUT_FILE = "extractor-comparison.csv"
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def load_stories() -> Dict[str, str]:
+    """The URL of every story in the evaluation CSVs, with the mention count we published for it."""
+    stories = {}
+    for path in sorted(glob.glob(EVALUATION_CSVS)):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                stories[row['url']] = row['tweet_finder_mentions']
+    return stories
+
+
+def load_pages(store: SnapshotStore, stories: Dict[str, str]) -> List[Tuple[str, bytes, str, str]]:
+    """The saved HTML of every story we have, as (url, html, encoding, published mention count)."""
+    pages = []
+    for url, published_mentions in stories.items():
+        record = store.record(url)
+        if record is not None:
+            pages.append((url, bytes(record.read()), record.encoding, published_mentions))
+    return pages
+
+
+def load_fixtures() -> List[Tuple[str, bytes, str, str]]:
+    pages = []
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        if filename.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+                pages.append((filename, f.read(), None, ''))
+    return pages
+
+
+def run_extractor(html: bytes, encoding: str, extractor: str) -> Dict:
+    """How long extracting the content took, how many mentions are in it, and the words in it."""
+    stats = StageStats()
+    article = Article(html=html, encoding=encoding, extractor=extractor, stats=stats, lazy=True)
+    mentions = article.list_mentioned_tweets()
+    content = article.get_content()
+    text = lxml.html.fromstring(content).text_content() if content.strip() else ''
+    return dict(secs=stats.to_dict()['extract']['secs'], mentions=None if mentions is None else len(mentions),
+                words=set(WORD_PATTERN.findall(text.lower())))
+
+
+def compare(pages: List[Tuple[str, bytes, str, str]]) -> List[Dict]:
+    rows = []
+    for url, html, encoding, published_mentions in pages:
+        try:
+            results = {name: run_extractor(html, encoding, name) for name in EXTRACTORS}
+        except Exception as e:
+            logger.warning("Failed to process {}: {}".format(url, e))
+            continue
+        reference = results[ReadabilityExtractor.name]
+        row = dict(url=url, published_mentions=published_mentions)
+        for name, result in results.items():
+            shared_words = len(result['words'] & reference['words'])
+            row.update({
+                name + '_ms': round(result['secs'] * 1000, 2),
+                name + '_mentions': result['mentions'],
+                name + '_precision': round(shared_words / len(result['words']), 3) if result['words'] else 1.0,
+                name + '_recall': round(shared_words / len(reference['words']), 3) if reference['words'] else 1.0,
+            })
+        rows.append(row)
+    return rows
+
+
+def summarize(rows: List[Dict]) -> None:
+    logger.info("Compared {} pages".format(len(rows)))
+    for name in EXTRACTORS:
+        supported = [row for row in rows if row[name + '_mentions'] is not None]
+        published = [row for row in supported if row['published_mentions'] != '']
+        logger.info("{}: {:.1f}ms total ({:.2f}ms median) | {} mentions | same count as readability on {:.1%} | same "
+                    "as published on {:.1%} | words precision {:.3f}, recall {:.3f} (median)".format(
+                        name, sum([row[name + '_ms'] for row in rows]), median([row[name + '_ms'] for row in rows]),
+                        sum([row[name + '_mentions'] for row in supported]),
+                        _share([row for row in supported if row[name + '_mentions'] == row['readability_mentions']],
+                               supported),
+                        _share([row for row in published if str(row[name + '_mentions']) == row['published_mentions']],
+                               published),
+                        median([row[name + '_precision'] for row in rows]),
+                        median([row[name + '_recall'] for row in rows])))
+
+
+def _share(matching: List, total: List) -> float:
+    return len(matching) / len(total) if total else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the content extractors for speed and accuracy.")
+    parser.add_argument('--snapshot', action='store_true', help="download any stories not saved yet first")
+    parser.add_argument('--fixtures', action='store_true', help="compare on the HTML test fixtures instead")
+    parser.add_argument('--store', default=SNAPSHOT_DIR, help="where the snapshots are saved")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="CSV file to write the results for each page to")
+    options = parser.parse_args()
+    if options.fixtures:
+        all_pages = load_fixtures()
+    else:
+        snapshot_store = SnapshotStore(options.store)
+        all_stories = load_stories()
+        if options.snapshot:
+            logger.info("Saved {} new snapshots".format(take_snapshots(all_stories, snapshot_store)))
+        all_pages = load_pages(snapshot_store, all_stories)
+        if len(all_pages) < len(all_stories):
+            logger.warning("{} stories have no snapshot (run with --snapshot)".format(
+                len(all_stories) - len(all_pages)))
+    start_time = time.time()
+    results_rows = compare(all_pages)
+    logger.info("Took {:.1f} seconds".format(time.time() - start_time))
+    if results_rows:
+        summarize(results_rows)
+        with open(options.output, 'w', newline='', encoding='utf-8') as output_file:
+            writer = csv.DictWriter(output_file, fieldnames=list(results_rows[0]))
+            writer.writeheader()
+            writer.writerows(results_rows)
+        logger.info("Wrote results to {}".format(options.output))
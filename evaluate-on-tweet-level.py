@@ -1,14 +1,28 @@
+"""
+This script evaluates how well we find embedded tweets, tweet by tweet, against a hand-checked list of the tweets
+embedded in a set of articles. It compares parsing the raw HTML, HTML rendered by a headless browser so JS can run, and
+(optionally) Goose's extraction code. Fetching and rendering the pages is slow, so that is done once and saved:
+```
+python evaluate-on-tweet-level.py --snapshot
+```
+After that, every run replays the saved pages offline and in parallel, which only takes a few seconds:
+```
+python evaluate-on-tweet-level.py [--goose]
+```
+"""
+
 import time
-from goose3 import Goose
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import WebDriverException
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+import logging
+import argparse
 import pandas as pd
 
-from tweetfinder import Article
+from tweetfinder.evaluation import SnapshotStore, take_snapshots, evaluate, score_tweet_ids, RAW, RENDERED
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+logger = logging.getLogger(__name__)
+
+# where the downloaded and rendered pages are saved
+SNAPSHOT_DIR = "evaluation-snapshots"
 
 answer_dict = {'https://www.techradar.com/news/lord-of-the-rings-on-amazon' : ['1349403885836791808',
                                                                                '1422255647106617359',
@@ -56,8 +70,14 @@ answer_dict = {'https://www.techradar.com/news/lord-of-the-rings-on-amazon' : ['
                ['1387966124797661188']}
 
 
+
 def getDriver():
-    # setup a headless chrome we can re-use it in all the tests within this class
+    # setup a headless chrome we can re-use it for all the pages
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import WebDriverException
+    from webdriver_manager.chrome import ChromeDriverManager
     chrome_options = Options()
     chrome_options.add_argument('--mute-audio')
     chrome_options.add_argument('--headless')
@@ -68,88 +88,77 @@ def getDriver():
     return driver
 
 
-def _loadViaSelenium(driver, url: str, delay_secs: int = 1):
+def _renderViaSelenium(driver, url: str, delay_secs: int = 1) -> str:
+    from selenium.webdriver.common.by import By
     driver.get(url)
     # let it render the javascript, then grab the *rendered* html, not the source_html
     time.sleep(delay_secs)  # hopefully it renders after this much time
-    rendered_html = driver.find_element(By.TAG_NAME, "html").get_attribute('innerHTML')
-    # now that we have HTML rendered by Javascript, we can check for tweets
-    return Article(html=rendered_html)
-
-
-def count_tweets_goose(url):
-    g = Goose()
-    article = g.extract(url=url)
-    return article.tweets
-
+    return driver.find_element(By.TAG_NAME, "html").get_attribute('innerHTML')
 
-def count_tweets_goose_js(html):
-    g = Goose()
-    article = g.extract(raw_html=html)
-    return article.tweets
 
-
-def get_stats_for_all():
+def snapshot_all(store: SnapshotStore):
+    """Download and render every page we don't have yet (this is the only part that needs the network)."""
+    driver = getDriver()
+    try:
+        saved = take_snapshots(answer_dict.keys(), store, render=lambda url: _renderViaSelenium(driver, url))
+    finally:
+        driver.quit()
+    logger.info("Saved {} new snapshots to {}".format(saved, store.path))
+
+
+def goose_tweet_ids(html: str):
+    from goose3 import Goose
+    tweet_ids = []
+    for tweet in Goose().extract(raw_html=html).tweets:
+        id_start = tweet.find('status/')
+        tweet_ids.append(tweet[id_start + 7:id_start + 26])
+    return tweet_ids
+
+
+def score_goose(store: SnapshotStore, kind: str):
+    found = []
+    for url in answer_dict.keys():
+        record = store.record(url, kind)
+        html = None if record is None else bytes(record.read()).decode(record.encoding or 'utf-8', 'replace')
+        found.append([] if html is None else goose_tweet_ids(html))
+    tp, fp, fn = score_tweet_ids(found, list(answer_dict.values()))
+    precision = tp.sum() / (tp.sum() + fp.sum()) if (tp.sum() + fp.sum()) else 0
+    recall = tp.sum() / (tp.sum() + fn.sum()) if (tp.sum() + fn.sum()) else 0
+    return [float(precision), float(recall)]
+
+
+def get_stats_for_all(store: SnapshotStore, workers: int = None, goose: bool = False):
     """
-    Pull the total cumulative scores. Notes:
+    Pull the total cumulative scores from the saved snapshots. Notes:
     * True Positive: tweet id in manual set and also in set from tweetfinder
     * False Positive: tweet id not manual set but is in set from tweetfinder
     * False Negative: tweet id in manual set and not in set from tweetfinder
     :return:
     """
-    count_dict = {'tweetfinder': {'tp': 0, 'fp': 0},
-                  'tweetfinder_js': {'tp': 0, 'fp': 0},
-                  'goose': {'tp': 0, 'fp': 0},
-                  'goose_js': {'tp': 0, 'fp': 0}
-                  }
-    driver = getDriver()
-    for url, tweet_id_list in answer_dict.items():
-        article_js = _loadViaSelenium(driver, url)
-        article = Article(url=url)
-        found_tweets_tweetfinder = article.list_embedded_tweets()
-        found_tweets_goose = count_tweets_goose(url)
-        found_tweets_tweetfinder_js = article_js.list_embedded_tweets()
-        found_tweets_goose_js = count_tweets_goose_js(article_js.get_html())
-        found_id_dict = {'tweetfinder': found_tweets_tweetfinder, 'tweetfinder_js': found_tweets_tweetfinder_js,
-                         'goose': found_tweets_goose, 'goose_js': found_tweets_goose_js}
-        for key, found_tweets in found_id_dict.items():
-            found_tweets = found_id_dict[key]
-            key_count_dict = count_dict[key]
-            if key == 'tweetfinder' or key == 'tweetfinder_js':
-                found_id_list = []
-                for tweet in found_tweets:
-                    found_id_list.append(tweet['tweet_id'])
-                found_tweets = found_id_list
-            for tweet_id in found_tweets:
-                if key == 'goose':
-                    id_start = tweet_id.find('status/')
-                    tweet_id = tweet_id[id_start + 7 :id_start + 26]
-                if tweet_id in tweet_id_list:
-                    key_count_dict['tp'] += 1
-                else:
-                    key_count_dict['fp'] += 1
-    total_count = 36
+    start_time = time.time()
     stats_dict = {}
-    stats_dict_dict = {}
-    for key in count_dict.keys():
-        try:
-            count_dict_key = count_dict[key]
-            tp = count_dict_key['tp']
-            fp = count_dict_key['fp']
-            fn = total_count - tp
-            precision = tp / (tp + fp)
-            recall = tp / (tp + fn)
-        except ZeroDivisionError:
-            precision = 0
-            recall = 0
-        stats_dict_dict[key] = {'precision': precision, 'recall': recall}
-        stats_dict[key] = [stats_dict_dict[key]['precision'], stats_dict_dict[key]['recall']]
+    for key, kind in [('tweetfinder', RAW), ('tweetfinder_js', RENDERED)]:
+        scores = evaluate(store, answer_dict, kind=kind, workers=workers)
+        if scores.missing.any():
+            logger.warning("{} pages have no {} snapshot (run with --snapshot)".format(scores.missing.sum(), kind))
+        stats_dict[key] = [scores.precision, scores.recall]
+    if goose:
+        stats_dict['goose'] = score_goose(store, RAW)
+        stats_dict['goose_js'] = score_goose(store, RENDERED)
+    logger.info("Took {:.1f} seconds to evaluate {} pages".format(time.time() - start_time, len(answer_dict)))
     eval_df = pd.DataFrame(stats_dict)
     eval_df.to_csv('embeds_tweet_review.csv', index=False)
+    logger.info("\n{}".format(eval_df))
 
 
 if __name__ == "__main__":
-    get_stats_for_all()
-
-
-
+    parser = argparse.ArgumentParser(description="Evaluate finding embedded tweets against hand-checked answers.")
+    parser.add_argument('--snapshot', action='store_true', help="download and render any pages not saved yet first")
+    parser.add_argument('--goose', action='store_true', help="also score Goose on the same pages")
+    parser.add_argument('--store', default=SNAPSHOT_DIR, help="where the snapshots are saved")
+    parser.add_argument('--workers', type=int, default=None, help="how many processes to use (default: one per CPU)")
+    options = parser.parse_args()
+    snapshot_store = SnapshotStore(options.store)
+    if options.snapshot:
+        snapshot_all(snapshot_store)
+    get_stats_for_all(snapshot_store, workers=options.workers, goose=options.goose)
@@ -19,16 +19,26 @@ setup(name='tweetfinder',
       author_email='r.bhargava@northeastern.edu',
       packages=['tweetfinder', 'tweetfinder.test'],
       data_files=[
-          ('data', ['tweetfinder/data/twitter-patterns-rony-2018.txt']),
+          ('data', ['tweetfinder/data/twitter-patterns-rony-2018.txt', 'tweetfinder/data/mentions-es.txt',
+                    'tweetfinder/data/mentions-de.txt', 'tweetfinder/data/mentions-fr.txt',
+                    'tweetfinder/data/mentions-pt.txt']),
       ],
       include_package_data=True,
       install_requires=[
           "requests",
           "readability-lxml==0.8.1",
           "py3langid==0.3.*",
-          "beautifulsoup4==4.12.*",
+          "lxml",
           "lxml_html_clean==0.4.*",
+          "pyahocorasick==2.*",
+          "numpy",
       ],
+      entry_points={
+          "console_scripts": ["tweetfinder=tweetfinder.cli:main"],
+      },
+      extras_require={
+          "async": ["aiohttp==3.*"],
+      },
       project_urls={
           "Source": "https://github.com/dataculturegroup/Tweet-Finder",
           "Docs": "https://tweet-finder.readthedocs.io/",
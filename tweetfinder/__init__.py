@@ -1,3 +1,35 @@
-from .article import Article, UnsupportedLanguageException
+"""
+Find tweets embedded and mentioned in news articles online. Everything below is only imported the first time you use
+it, so `import tweetfinder` is quick and doesn't load any of the heavier libraries until they are needed.
+"""
+
+import importlib
+
+# which module each of the names you can import from here lives in
+_LAZY_IMPORTS = {
+    'Article': 'article',
+    'UnsupportedLanguageException': 'article',
+    'MentionMatcher': 'matcher',
+    'get_matcher': 'matcher',
+    'get_language_matcher': 'matcher',
+    'process_many': 'batch',
+    'EmbeddedTweet': 'results',
+    'Mention': 'results',
+    'ColumnarResults': 'results',
+}
+
+__all__ = list(_LAZY_IMPORTS)
 
 __version__ = "1.1.1"
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    value = getattr(importlib.import_module('.' + _LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
@@ -2,26 +2,37 @@
 The main module to support finding embedded tweets and mentions of tweets in online news.
 """
 
-from bs4 import BeautifulSoup
-import readability
-import re
-import requests
+import lxml.html
+import time
 import logging
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Union, Optional
 
-from . import mentions
 from . import language as languages
+from . import charsets
+from . import dedup
+from . import mentions
+from . import stats as stage_stats
+from .cache import ParseCache
+from .matcher import MentionMatcher, MENTIONS_CONTEXT_WINDOW_SIZE, get_matcher, get_language_matcher, \
+    might_match_any_language
+from .embeds import find_embeds, scan_embeds, might_have_embeds
+from .extractors import ContentExtractor, ReadabilityExtractor, get_extractor
+from .results import EmbeddedTweet, Mention
 
 logger = logging.getLogger(__name__)
 
-# when we find a mention, we include this many characters of context before and after it
-MENTIONS_CONTEXT_WINDOW_SIZE = 100
-
 # how many seconds to wait when trying to load a webpage via GET
 DEFAULT_TIMEOUT = 5
 
-# modified from https://stackoverflow.com/questions/4138483/twitter-status-url-regex
-tweet_status_url_pattern = re.compile(r'^https?:\/\/twitter\.com\/(?:#!\/)?(\w+)\/status(es)?\/(\d+).*', re.IGNORECASE)
+# we can only find mentions of tweets in articles in these languages
+SUPPORTED_LANGUAGES = list(mentions.LANGUAGES)
+
+# we parse text as utf-8 bytes, which also drops any characters that can't be encoded
+_utf8_html_parser = lxml.html.HTMLParser(encoding="utf-8")
+
+# marks a lazily computed result that hasn't been computed yet (`None` is a valid result for mentions)
+_NOT_PROCESSED = object()
 
 
 class UnsupportedLanguageException(BaseException):
@@ -29,7 +40,8 @@ class UnsupportedLanguageException(BaseException):
 
     def __init__(self, language: str):
         self.language = language
-        super().__init__("Finding mentions is only supported in English right now (not {})".format(self.language))
+        super().__init__("Finding mentions is only supported in {} right now (not {})".format(
+            ", ".join(SUPPORTED_LANGUAGES), self.language))
 
 
 class Article:
@@ -38,79 +50,282 @@ class Article:
     Then call any of the `get_` methods to see what the code found.
     """
 
-    def __init__(self, url: str = None, html: str = None, mentions_list: list = None, timeout: int = None):
+    def __init__(self, url: str = None, html: Union[str, bytes] = None,
+                 mentions_list: Union[list, MentionMatcher] = None, timeout: int = None, lazy: bool = False,
+                 language: str = None, stats=None, cache: ParseCache = None, encoding: str = None,
+                 prefilter: bool = False, script_embeds: bool = False,
+                 extractor: Union[str, ContentExtractor] = None):
         """
         Process an online news article to find embedded tweets and mentions of tweets. Send in either `url` or
         `html`.
         :param url: Option A: Pass in a URL to an available news story online. This will be fetched for you and content
         will be extract via the readability library.
-        :param html: Option B: Pass in html text to be parsed.
+        :param html: Option B: Pass in html to be parsed, as text or as the raw bytes you downloaded (which can be any
+        bytes-like object, ie. a memoryview of a memory-mapped file).
         :param mentions_list: Pass in a custom list of snippets that count as "mentions" or tweets. The default is to
-        use the ones in `mentions.ALL`. You can use another subset from that module, or provide your own.
+        use the built-in ones for the language the article is in (see `mentions.for_language`), ie. `mentions.ALL` for
+        English. You can use another subset from that module, or provide your own, which is then used whatever
+        (supported) language the article is in. If you are processing lots of articles, pass in a `MentionMatcher`
+        from `get_matcher` so the list is only compiled once. An empty list (or `None`) means the default.
         :param timeout: If you pass in `url`, you can customize how long to wait before timing out the request if the
         server doesn't respond. The default value is `DEFAULT_TIMEOUT` (5 seconds).
+        :param lazy: By default everything is parsed right away. Pass in `True` to only do the work needed to answer
+        each of the `get_`, `list_` and `count_` methods the first time you call it. For instance, if you only ask
+        about embedded tweets then the content is never extracted and the mentions are never searched for.
+        :param language: If you already know what language the article is in, pass in its two-letter code (ie. "en")
+        and we won't try to detect it. We only search for mentions in articles in a supported language.
+        :param stats: Pass in a `stats.StageStats` (or anything with a `record` method like it) to record how long each
+        stage of processing this article takes. The default is the one set via `stats.set_default_stats`, if any.
+        :param cache: Pass in a `cache.ParseCache` to reuse the content, embeds and language found the last time we
+        processed the exact same HTML, so only the mentions have to be searched for again.
+        :param encoding: If you pass in `html` as bytes and know its character encoding (ie. from the HTTP headers),
+        pass that in too. Otherwise we use the one declared in the HTML, or utf-8 if there isn't one.
+        :param prefilter: Pass in `True` to first check the raw HTML for any sign of embeds or mentions (ie.
+        "twitter" or "tweet"), and skip parsing and extracting content from pages that can't have any. This never
+        misses anything we would otherwise find, but for pages it skips, `list_mentioned_tweets` returns an empty list
+        even if the page isn't in a supported language.
+        :param script_embeds: Pass in `True` to also find tweets that Javascript embeds once the page runs in a
+        browser, from the data and code in its script tags (ie. Next.js and JSON-LD data, widgets.js calls and oEmbed
+        requests) and `data-tweet-id` attributes. These are listed after the others, with an `html_source` starting
+        with "script" (or "data-tweet-id attribute"), and only if they weren't already found some other way.
+        :param extractor: How to pick out the content to search for mentions: a `ContentExtractor`, or the name of one
+        of `extractors.EXTRACTORS`. The default is "readability", and "density" is much faster (see `extractors`).
         """
         if (url is None) and (html is None):
             raise ValueError('You must pass in either a url or html argument')
         self._url = url
-        # make the list of mentions unique here as a safeguard, and also sort it for reproduceable results
-        self._mentions_list = sorted(set([term.strip().lower() for term in (mentions_list or mentions.ALL)]))
+        self._stats = stats or stage_stats.get_default_stats()
+        # `None` means use the built-in matcher for whatever language the article is in (so does an empty list)
+        self._mentions_matcher = get_matcher(mentions_list) if mentions_list else None
         self._download_timeout = timeout or DEFAULT_TIMEOUT
+        self._encoding = encoding
         if html is None:
+            start_time = self._start_timer()
             self._html = self._download_article()
+            self._record_stage('download', start_time, 0, len(self._html))
         else:
             self._html = html
-        self._process()
+        self._lazy = lazy
+        self._script_embeds = script_embeds
+        self._extractor = get_extractor(extractor)
+        # each of these is filled in the first time it is needed
+        self._html_tree = None
+        self._embeds = None
+        self._content = None
+        self._content_no_tags = None
+        self._language = language
+        self._mentions = _NOT_PROCESSED
+        self._cache = cache
+        self._cache_key = None
+        self._language_detected = False
+        if cache is not None:
+            self._load_from_cache()
+        if prefilter:
+            self._prefilter()
+        if not lazy:
+            self._process()
 
-    def _download_article(self) -> str:
+    def _download_article(self) -> bytes:
         """
-        Internal help to download html from a URL and return the full content.
+        Internal help to download html from a URL and return the full content, as raw bytes so the parser can figure
+        out the encoding from the HTML if the server didn't tell us.
         :return:
         """
         url = self._url
+        import requests  # only needed if we download anything, and slow to import
         r = requests.get(url, timeout=self._download_timeout)
-        return r.text.lower()
+        if 'charset' in r.headers.get('content-type', '').lower():
+            self._encoding = r.encoding
+        return r.content
 
     def _process(self) -> None:
         """
         Parse the HTML and find embedded tweets, and mentions.
         :return:
         """
-        self._html_soup = BeautifulSoup(self._html, "lxml")
-        # remove HTML tags so we can search text-only content for mentions later
-        doc = readability.Document(self._html)
-        self._content = doc.summary().lower()
-        self._content_soup = BeautifulSoup(self._content, "lxml")
-        self._content_no_tags = self._content_soup.get_text().strip()
-        # lets parse it all here so we don't have to do it more than once
-        self._embeds = self._find_embeds()
-        self._mentions = self._find_mentions()
-
-    def get_html(self) -> str:
-        """Return the HTML fetched if you passed in a url, or the same HTML you passed in if not."""
+        self._get_embeds()
+        self._get_mentions()
+
+    def _prefilter(self) -> None:
+        """Rule out embeds and mentions that the raw HTML shows can't be there, without parsing it."""
+        if not self._html_is_ascii_compatible():
+            return
+        start_time = self._start_timer()
+        skipped = 0
+        if (self._embeds is None) and not might_have_embeds(self._html, self._script_embeds):
+            self._embeds = []
+            skipped += 1
+        if (self._mentions is _NOT_PROCESSED) and not self._might_mention(self._html):
+            self._mentions = []
+            skipped += 1
+        self._record_stage('prefilter', start_time, len(self._html), skipped)
+
+    def _might_mention(self, html: Union[str, bytes]) -> bool:
+        """Could the content of this page have any mentions in it? (false positives are fine)"""
+        if self._mentions_matcher is not None:
+            return self._mentions_matcher.might_match(html)
+        if self._language is not None:
+            matcher = get_language_matcher(self._language)
+            return (matcher is not None) and matcher.might_match(html)
+        # we don't know the language yet, and finding out means parsing the page, so check for any language's phrases
+        return might_match_any_language(html)
+
+    def _html_is_ascii_compatible(self) -> bool:
+        """Can we look for ASCII markers in the raw HTML? (not if it is bytes in ie. UTF-16)"""
+        return isinstance(self._html, str) or charsets.is_ascii_compatible(self._guess_encoding())
+
+    def _load_from_cache(self) -> None:
+        """Fill in anything we found the last time we processed this same HTML."""
+        # embeds found in scripts too, or content from another extractor, are different results so are cached
+        # separately
+        options = ['script_embeds'] if self._script_embeds else []
+        if self._extractor.name != ReadabilityExtractor.name:
+            options.append('extractor={}'.format(self._extractor.name))
+        if (self._encoding is not None) and not isinstance(self._html, str):
+            # the same bytes decoded with a different encoding are different text
+            options.append('encoding={}'.format(self._encoding.lower()))
+        self._cache_key = self._cache.key(self._html, ','.join(options))
+        cached = self._cache.get(self._cache_key)
+        if cached is None:
+            return
+        self._embeds = [EmbeddedTweet(**tweet_info) for tweet_info in cached['embeds']]
+        self._content = cached['content']
+        self._content_no_tags = cached['content_no_tags']
+        if cached['language'] is None:
+            return  # save it again once we have detected the language
+        if self._language is None:
+            self._language = cached['language']
+        self._cache_key = None  # no need to save it again
+
+    def _save_to_cache(self) -> None:
+        """Once we have everything that is worth caching, save it for next time."""
+        if (self._cache_key is None) or (self._embeds is None) or (self._content is None) or \
+                (self._language is None):
+            return
+        # only save a language we detected ourselves, not one that was passed in
+        self._cache.put(self._cache_key, dict(embeds=[dict(tweet) for tweet in self._embeds], content=self._content,
+                                              content_no_tags=self._content_no_tags,
+                                              language=self._language if self._language_detected else None))
+        self._cache_key = None
+
+    def release(self) -> None:
+        """
+        Finish processing, and then let go of the HTML, the parsed tree and the extracted content so they don't use up
+        memory while you hold on to the results. After this `get_html` and `get_content` return `None`, but all the
+        other methods still work.
+        """
+        self._process()
+        self._html = None
+        self._html_tree = None
+        self._content = None
+
+    def _get_html_tree(self) -> lxml.html.HtmlElement:
+        """Parse the HTML just once, and share that tree between finding embeds and extracting the content."""
+        if self._html_tree is None:
+            start_time = self._start_timer()
+            if isinstance(self._html, str):
+                self._html_tree = lxml.html.document_fromstring(self._html.encode("utf-8", "replace"),
+                                                                parser=_utf8_html_parser)
+            else:
+                self._html_tree = lxml.html.document_fromstring(self._html,
+                                                                parser=_html_parser(self._guess_encoding()))
+            self._record_stage('parse', start_time, len(self._html), 1)
+        return self._html_tree
+
+    def _guess_encoding(self) -> Optional[str]:
+        """The encoding to parse raw HTML with (see `charsets.guess_encoding`)."""
+        return charsets.guess_encoding(self._html, self._encoding)
+
+    def _get_embeds(self) -> List[EmbeddedTweet]:
+        if self._embeds is None:
+            if not self._lazy:
+                self._get_html_tree()  # parse first, so that is timed as its own stage
+            start_time = self._start_timer()
+            self._embeds = self._find_embeds()
+            self._record_stage('embeds', start_time, len(self._html), len(self._embeds))
+            self._save_to_cache()
+        return self._embeds
+
+    def _get_content(self) -> str:
+        if self._content_no_tags is None:
+            html_tree = self._get_html_tree()
+            start_time = self._start_timer()
+            # the text-only content is what we search for mentions later
+            self._content, self._content_no_tags = self._extractor.extract(html_tree)
+            self._record_stage('extract', start_time, len(self._html), len(self._content_no_tags))
+            self._save_to_cache()
+        return self._content
+
+    def _get_content_no_tags(self) -> str:
+        self._get_content()
+        return self._content_no_tags
+
+    def _get_mentions(self) -> List[Mention]:
+        if self._mentions is _NOT_PROCESSED:
+            # get these first, so they are timed as their own stages
+            content_no_tags = self._get_content_no_tags()
+            self.get_language()
+            start_time = self._start_timer()
+            self._mentions = self._find_mentions()
+            self._record_stage('mentions', start_time, len(content_no_tags), len(self._mentions or []))
+        return self._mentions
+
+    def _start_timer(self) -> Optional[float]:
+        """Start timing a stage, if we are recording stats."""
+        return None if self._stats is None else time.perf_counter()
+
+    def _record_stage(self, stage: str, start_time: Optional[float], input_size: int, output_count: int) -> None:
+        """Finish timing a stage, if we are recording stats."""
+        if self._stats is not None:
+            self._stats.record(stage, time.perf_counter() - start_time, input_size, output_count)
+
+    def get_language(self) -> str:
+        """Return the two-letter code for the language the article is in, as passed in or detected from the content."""
+        if self._language is None:
+            content_no_tags = self._get_content_no_tags()
+            start_time = self._start_timer()
+            # a sample of the text is plenty to tell the language, and much faster than checking all the content
+            self._language = languages.detect_most_likely(content_no_tags, languages.SAMPLE_SIZE)
+            self._record_stage('language', start_time, min(len(content_no_tags), languages.SAMPLE_SIZE), 1)
+            self._language_detected = True
+            self._save_to_cache()
+        return self._language
+
+    def get_html(self) -> Union[str, bytes]:
+        """Return the raw HTML bytes fetched if you passed in a url, or the same HTML you passed in if not."""
         return self._html
 
     def get_content(self) -> str:
-        """Return the part of the webpage that we considered as content, via the readability library."""
-        return self._content
+        """Return the part of the webpage that we considered as content, via the extractor (readability by default)."""
+        return self._get_content()
+
+    def get_content_fingerprint(self) -> Optional[dedup.Fingerprint]:
+        """
+        Return a fingerprint of the article's text, to tell which other articles have the same or nearly the same
+        text (see `dedup.DuplicateIndex`). This is `None` if there isn't any text, or if `prefilter` already showed
+        there can't be any mentions in it (so we never extracted it).
+        """
+        if (self._content_no_tags is None) and (self._mentions is not _NOT_PROCESSED):
+            return None
+        return dedup.fingerprint(self._get_content_no_tags())
 
     def embeds_tweets(self) -> bool:
         """Does this webpage have any embedded tweets?"""
-        return len(self._embeds) > 0
+        return len(self._get_embeds()) > 0
 
-    def mentions_tweets(self) -> int:
-        """Does this webpage mention any tweets?"""
-        return len(self._mentions) > 0
+    def mentions_tweets(self) -> bool:
+        """Does this webpage mention any tweets? (always `False` if it isn't in a supported language)"""
+        return self.count_mentioned_tweets() > 0
 
     def count_embedded_tweets(self):
         """How many tweets are embedded on this webpage?"""
-        return len(self._embeds)
+        return len(self._get_embeds())
 
     def count_mentioned_tweets(self):
-        """How many times are tweets mentioned on this webpage?"""
-        return len(self._mentions)
+        """How many times are tweets mentioned on this webpage? (always 0 if it isn't in a supported language)"""
+        return len(self._get_mentions() or [])
 
-    def list_embedded_tweets(self) -> List[Dict]:
+    def list_embedded_tweets(self) -> List[EmbeddedTweet]:
         """
         Detailed information about the tweets embedded on the webpage.
         :return: The exact info depends on how the tweets were embeded. If they were embedded the official way, then
@@ -119,101 +334,46 @@ class Article:
         `html_source` property of each returned one to identify how we found it and then look for other data based on
         that. You will at least get the tweet id no matter which method we found it with.
         """
-        return self._embeds
+        return self._get_embeds()
 
-    def list_mentioned_tweets(self) -> List[Dict]:
+    def list_mentioned_tweets(self) -> List[Mention]:
         """
         Detailed information about each mention of a tweet we found=.
         :return: None if this isn't a supported language, otherwise a List. Each item includes the `phrase` found,
         some `context` via a window of text around it, and `content_start_index` to help you find it yourself in
         the `get_content` string.
         """
-        return self._mentions
+        return self._get_mentions()
 
-    def _find_embeds(self) -> List[Dict]:
+    def _find_embeds(self) -> List[EmbeddedTweet]:
         """Search content for any embedded tweets via a variety of methods."""
-        tweets = []
-        # Twitter recommends embedding as block quotes
-        blockquotes = self._html_soup.find_all('blockquote')
-        for b in blockquotes:
-            # We could check the official way of doing it:
-            # `if b.has_attr('class') and ('twitter-tweet' in b['class']):  # this is an array of the CSS classes`
-            # But we found some sites don't use that class, so check if there is a link to twitter in there.
-            # In our experimentation this produces better results than just checking the class.
-            links = b.find_all('a')
-            tweet_info = None
-            for link in links:
-                # grab first link that we think is a good one to parse
-                if (tweet_info is None) and tweet_status_url_pattern.match(link['href']):
-                    info = tweet_status_url_pattern.match(link['href']).groups()
-                    tweet_info = dict(tweet_id=info[2], username=info[0], full_url=link['href'],
-                                      html_source='blockquote url pattern')
-            # if no super nice link, fallback on custom parsing of first one that has some good potential
-            if tweet_info is None:
-                for link in links:
-                    if (tweet_info is None) and link.has_attr('href') and ('twitter.com' in link['href']):
-                        try:
-                            twitter_url = link['href']
-                            username_start_index = twitter_url.find('@')
-                            username = twitter_url[username_start_index:-1]
-                            tweet_id_start_index = twitter_url.find('/')
-                            tweet_id = twitter_url[tweet_id_start_index:-1]
-                            tweet_info = dict(tweet_id=tweet_id, username=username, full_url=twitter_url,
-                                              html_source='blockquote url fallback')
-                        except Exception:  # some other format that we couldn't handle
-                            logger.warning("Can't parse potential link to tweet: {}".format(link['href']))
-                            tweet_info = None
-            if tweet_info:
-                tweets.append(tweet_info)
-        # some people do it differently, (CNN, others) embed with like this
-        divs = self._html_soup.find_all('div', class_="embed-twitter")
-        for d in divs:
-            if d.has_attr('data-embed-id'):
-                tweet_info = dict(tweet_id=d['data-embed-id'], html_source='div with data-embed-id')
-                tweets.append(tweet_info)
-        # check if we are looking at HTML already rendered by JS and transformed into an iframe of content
-        divs = self._html_soup.find_all('div', class_="twitter-tweet-rendered")
-        for d in divs:
-            iframes = d.find_all('iframe')
-            for iframe in iframes:
-                if iframe.has_attr('data-tweet-id'):
-                    tweet_info = dict(tweet_id=iframe['data-tweet-id'], html_source='rendered iframe')
-                    tweets.append(tweet_info)
-        return tweets
-
-    def _validate_language(self):
+        if self._lazy and (self._html_tree is None) and self._html_is_ascii_compatible():
+            # nothing else has needed the parsed HTML yet, so use the faster scanner that doesn't build a tree
+            return scan_embeds(self._html, None if isinstance(self._html, str) else self._guess_encoding(),
+                               self._script_embeds)
+        return find_embeds(self._get_html_tree(), self._script_embeds)
+
+    def _validate_language(self) -> None:
         """Throw an error if this isn't a supported language for finding mentions."""
-        valid_languages = ['en']
-        return languages.detect_most_likely(self._content) in valid_languages
+        if self.get_language() not in SUPPORTED_LANGUAGES:
+            raise UnsupportedLanguageException(self.get_language())
 
-    def _find_mentions(self) -> List[Dict]:
+    def _find_mentions(self) -> List[Mention]:
         """
-        Find the first occurrence of the twitter phrase, then continue searching for the next occurrence of the twitter
-        phrase from the index of end of the current twitter phrase instance until there are no more twitter phrases
-        located.
+        Find every occurrence of every twitter phrase in the text-only content, in one pass via the compiled matcher.
         :return: None if the language isn't supported, otherwise a list.
         """
         try:
-            self._validate_language()  # bail if this isn't in english
+            self._validate_language()  # bail if we don't have phrases for this language
         except UnsupportedLanguageException:
             return None
-        mentions_dict_list = []
-        article_text = self._content_no_tags
-        for twitter_phrase in self._mentions_list:
-            start_index = 0
-            phrase_index = 0
-            while phrase_index != -1:
-                phrase_index = article_text.find(twitter_phrase, start_index)
-                # this is the start index into the *content*, not the raw html
-                start_index = phrase_index
-                if phrase_index != -1:
-                    context_start = max(0, phrase_index - MENTIONS_CONTEXT_WINDOW_SIZE)
-                    context_end = min(len(article_text),
-                                      phrase_index + len(twitter_phrase) + MENTIONS_CONTEXT_WINDOW_SIZE)
-                    context = article_text[context_start:context_end]
-                    mention_dict = {'phrase': twitter_phrase, 'context': context, 'content_start_index': start_index}
-                    mentions_dict_list.append(mention_dict)
-                    start_index = phrase_index + len(twitter_phrase)
-        # returns a tuple of the twitter phrase count and a list of the starting indices of each of the
-        # twitter phrases
-        return mentions_dict_list
+        matcher = self._mentions_matcher
+        if matcher is None:
+            matcher = get_language_matcher(self.get_language())
+        return matcher.find_all(self._get_content_no_tags())
+
+
+@lru_cache(maxsize=None)
+def _html_parser(encoding: Optional[str]) -> lxml.html.HTMLParser:
+    """A parser for raw HTML in this encoding (`None` to let the parser figure it out)."""
+    return lxml.html.HTMLParser(encoding=encoding)
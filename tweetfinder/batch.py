@@ -0,0 +1,179 @@
+"""
+Process lots of articles at once, spreading the work over a pool of processes.
+"""
+
+import os
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
+
+from .article import Article
+from .corpus import CorpusRecord
+from .dedup import DuplicateIndex, DEFAULT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# how many articles we send to a worker process at a time
+DEFAULT_CHUNK_SIZE = 8
+
+# the Article arguments for the worker process we are in (set once when the worker starts up)
+_worker_article_kwargs = {}
+# the articles the worker process we are in has seen, if we are looking for duplicates
+_worker_duplicates = None
+
+
+def _article_args(item: Union[str, bytes, Dict, CorpusRecord]) -> Dict:
+    """Figure out which Article arguments an item passed into `process_many` is."""
+    if isinstance(item, dict):
+        return item
+    if isinstance(item, CorpusRecord):
+        return dict(html=item.read(), encoding=item.encoding)
+    if isinstance(item, str) and (item.startswith('http://') or item.startswith('https://')):
+        return dict(url=item)
+    return dict(html=item)
+
+
+def process_one(item: Union[str, bytes, Dict, CorpusRecord], duplicates: DuplicateIndex = None,
+                **article_kwargs) -> Dict:
+    """
+    Process one article and return what we found as plain data (which is cheap to send between processes).
+    :param item: a URL, some HTML, a dict of arguments for `Article` (ie. with a `url` or `html` key), or a
+    `CorpusRecord` from `corpus.read_corpus`
+    :param duplicates: Pass in an index of the articles processed so far to check whether this one has the same text
+    as one of them (see `dedup`). If it does, the `mentions` and `language` of that one are reused instead of finding
+    them again, and `duplicate_of` is its key. If not, the result has the `fingerprint` of its text to add to the index.
+    :param article_kwargs: any other arguments to pass to `Article`
+    :return: a dict with the `embeds`, `mentions` and `language`. If we couldn't process it these are `None` and `error`
+    says why. For a `CorpusRecord` the `source` says where in the archive it came from.
+    """
+    if duplicates is not None:
+        # only do the work we ask for, so nothing is spent on mentions or language for a duplicate
+        article_kwargs = dict(article_kwargs, lazy=True)
+    try:
+        article = Article(**_article_args(item), **article_kwargs)
+        result = dict(embeds=[dict(tweet) for tweet in article.list_embedded_tweets()])
+        duplicate_of = None
+        if duplicates is not None:
+            fingerprint = article.get_content_fingerprint()
+            duplicate_of = None if fingerprint is None else duplicates.find(fingerprint)
+            result.update(duplicate_of=duplicate_of, fingerprint=None if duplicate_of is not None else fingerprint)
+        if duplicate_of is not None:
+            result['mentions'], result['language'] = duplicates.get(duplicate_of)
+        else:
+            mentions = article.list_mentioned_tweets()
+            result.update(mentions=None if mentions is None else [dict(mention) for mention in mentions],
+                          language=article.get_language())
+        result['error'] = None
+    except Exception as e:
+        # probably a fetch or parse error, so report it and keep going with the other articles
+        logger.debug("Failed to process article: {}".format(e))
+        result = dict(embeds=None, mentions=None, language=None, error="{}: {}".format(type(e).__name__, e))
+        if duplicates is not None:
+            result.update(duplicate_of=None, fingerprint=None)
+    if isinstance(item, CorpusRecord):
+        result['source'] = item.to_dict()
+    return result
+
+
+def _init_worker(article_kwargs: Dict, dedup_threshold: Optional[float]) -> None:
+    global _worker_article_kwargs, _worker_duplicates
+    _worker_article_kwargs = article_kwargs
+    _worker_duplicates = None if dedup_threshold is None else DuplicateIndex(dedup_threshold)
+
+
+def _process_chunk(chunk: List[Tuple[int, Union[str, bytes, Dict, CorpusRecord]]]) -> List[Dict]:
+    results = []
+    for index, item in chunk:
+        result = process_one(item, _worker_duplicates, **_worker_article_kwargs)
+        result['index'] = index
+        if (_worker_duplicates is not None) and (result['fingerprint'] is not None):
+            # so this worker can skip the work for later duplicates of it (the fingerprint still goes back to the
+            # main process, which checks against what all the workers have seen)
+            _worker_duplicates.add(index, result['fingerprint'], (result['mentions'], result['language']))
+        results.append(result)
+    return results
+
+
+def _check_duplicates(result: Dict, duplicates: DuplicateIndex) -> Dict:
+    """
+    Decide, in the main process, whether a result is for a duplicate of an earlier article. It gets the `mentions` and
+    `language` of the first article with that text, and `duplicate_of` is the `index` of that article.
+    """
+    fingerprint = result.pop('fingerprint')
+    duplicate_of = result['duplicate_of']
+    if (duplicate_of is None) and (fingerprint is not None):
+        duplicate_of = duplicates.find(fingerprint)
+        if duplicate_of is None:
+            duplicates.add(result['index'], fingerprint, (result['mentions'], result['language']))
+            return result
+        # a worker might have seen later duplicates of this one, and said they were duplicates of it
+        duplicates.add_duplicate(result['index'], duplicate_of)
+    if duplicate_of is not None:
+        result['duplicate_of'] = duplicates.original(duplicate_of)
+        result['mentions'], result['language'] = duplicates.get(duplicate_of)
+    return result
+
+
+def _chunks(items: Iterable, chunk_size: int) -> Iterator[List[Tuple[int, Union[str, bytes, Dict, CorpusRecord]]]]:
+    numbered_items = enumerate(items)
+    while True:
+        chunk = list(itertools.islice(numbered_items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_many(items: Iterable[Union[str, bytes, Dict, CorpusRecord]], workers: int = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, max_in_flight: int = None, ordered: bool = True,
+                 dedup: bool = False, dedup_threshold: float = DEFAULT_THRESHOLD, **article_kwargs) -> Iterator[Dict]:
+    """
+    Process lots of articles in parallel over a pool of processes, yielding the results as they are ready.
+    :param items: the articles to process. Each one can be a URL, some HTML, a dict of arguments for `Article`, or a
+    `CorpusRecord` (which workers read straight from the archive, instead of it being sent to them). This can be a
+    generator - items are only pulled from it as workers free up.
+    :param workers: how many processes to use. The default is one per CPU. Pass in 1 to process everything right here
+    in this process instead.
+    :param chunk_size: how many articles to send to a worker at a time
+    :param max_in_flight: the most chunks to have queued up or being processed at once, which bounds how much memory
+    we use no matter how many items there are. The default is two per worker.
+    :param ordered: by default results come back in the same order as the items. Pass in `False` to get each one as
+    soon as it is ready instead.
+    :param dedup: Pass in `True` to spot articles with the same or nearly the same text as an earlier one, like wire
+    stories that many outlets run (see `dedup`). Those reuse the `mentions` and `language` found in the first one, and
+    their `duplicate_of` is its `index` (it is `None` for the rest). Each worker skips finding mentions in duplicates of
+    articles it has already seen itself.
+    :param dedup_threshold: how similar the text has to be to count as a duplicate, from 0 to 1 (see `dedup`)
+    :param article_kwargs: any other arguments to pass to every `Article` (ie. `mentions_list`, `timeout`, `lazy`)
+    :return: a dict for each item with the `embeds` and `mentions` we found, plus the `index` of the item it is for.
+    If we couldn't process an item then `error` says why.
+    """
+    workers = workers or os.cpu_count() or 1
+    duplicates = DuplicateIndex(dedup_threshold) if dedup else None
+    if workers == 1:
+        for index, item in enumerate(items):
+            result = process_one(item, duplicates, **article_kwargs)
+            result['index'] = index
+            yield result if duplicates is None else _check_duplicates(result, duplicates)
+        return
+    max_in_flight = max_in_flight or (workers * 2)
+    chunks = _chunks(items, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(article_kwargs, dedup_threshold if dedup else None)) as executor:
+        in_flight = deque(executor.submit(_process_chunk, chunk) for chunk in itertools.islice(chunks, max_in_flight))
+        while in_flight:
+            if ordered:
+                done = [in_flight.popleft()]
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                # in the order they were sent, so an article a worker says is a duplicate was always checked first
+                done = [future for future in in_flight if future in done]
+                for future in done:
+                    in_flight.remove(future)
+            for future in done:
+                # refill the queue before handing back results so the workers stay busy
+                for chunk in itertools.islice(chunks, 1):
+                    in_flight.append(executor.submit(_process_chunk, chunk))
+                for result in future.result():
+                    yield result if duplicates is None else _check_duplicates(result, duplicates)
@@ -0,0 +1,148 @@
+"""
+A persistent cache of the expensive parts of processing an article, so re-running a corpus (ie. with a new list of
+mention phrases) doesn't have to parse the HTML and extract the content all over again. Results are stored in SQLite,
+keyed by a hash of the raw HTML and the library version, and the least recently used ones are thrown away when the
+cache gets too big.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# how big the cache can get (in compressed bytes) before we start throwing away the least recently used results
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# how long to wait for another process that is writing to the same cache
+_SQLITE_TIMEOUT_SECS = 30
+
+# how many of the least recently used results to look at at a time when the cache is too big
+_EVICT_BATCH_SIZE = 100
+
+
+class ParseCache:
+    """
+    Stores the extracted content, the text-only content, the embedded tweets and the detected language of articles in
+    a SQLite file. Pass one in to `Article(cache=...)` and anything it has seen before skips parsing, embed detection,
+    readability and language detection. It is safe to share one cache file between processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param path: the SQLite file to keep the cache in (created if it doesn't exist)
+        :param max_bytes: the most (compressed) data to keep before throwing away the least recently used results
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        with self._lock, self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS parse_results (key TEXT PRIMARY KEY, data BLOB NOT NULL, "
+                       "size INTEGER NOT NULL, last_access REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS parse_results_last_access ON parse_results (last_access)")
+            # the total size is kept up to date as results are added and removed, so writes don't have to add it up
+            db.execute("CREATE TABLE IF NOT EXISTS cache_info (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                       "total_size INTEGER NOT NULL)")
+            db.execute("INSERT OR IGNORE INTO cache_info (id, total_size) "
+                       "SELECT 0, COALESCE(SUM(size), 0) FROM parse_results")
+
+    def _connection(self) -> sqlite3.Connection:
+        # a connection can't be used on both sides of a fork, so a forked worker process opens its own one
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=_SQLITE_TIMEOUT_SECS, check_same_thread=False)
+            self._db_pid = os.getpid()
+        return self._db
+
+    def __reduce__(self):
+        # a database connection can't be sent to another process, so it opens its own one on the same file
+        return ParseCache, (self.path, self.max_bytes)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM parse_results").fetchone()[0]
+
+    def size_bytes(self) -> int:
+        """How much (compressed) data is in the cache."""
+        with self._lock:
+            return self._connection().execute("SELECT total_size FROM cache_info").fetchone()[0]
+
+    @staticmethod
+    def key(html: Union[str, bytes], options: str = '') -> str:
+        """
+        The cache key for some HTML. This includes the library version, so upgrading never reuses results from an older
+        version that might have extracted things differently.
+        :param options: anything else that changes what is extracted from the HTML (ie. which optional methods are used)
+        """
+        from . import __version__
+        if isinstance(html, str):
+            html = html.encode("utf-8", "replace")
+        digest = hashlib.sha256(html)
+        digest.update(__version__.encode("utf-8"))
+        digest.update(options.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        :param key: from `ParseCache.key`
+        :return: the results stored for this key, or `None` if there aren't any
+        """
+        with self._lock, self._connection() as db:
+            row = db.execute("SELECT data FROM parse_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE parse_results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, results: Dict) -> None:
+        """
+        Store the results for a key, and throw away the least recently used ones if that makes the cache too big.
+        :param key: from `ParseCache.key`
+        :param results: a dict of plain data that can be saved as JSON
+        """
+        data = zlib.compress(json.dumps(results).encode("utf-8"))
+        with self._lock, self._connection() as db:
+            # update the total first, so no other process can change this key before we replace it
+            db.execute("UPDATE cache_info SET total_size = total_size + ? - "
+                       "COALESCE((SELECT size FROM parse_results WHERE key = ?), 0)", (len(data), key))
+            db.execute("INSERT OR REPLACE INTO parse_results (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                       (key, data, len(data), time.time()))
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total_size = db.execute("SELECT total_size FROM cache_info").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+        evicted = 0
+        while total_size > self.max_bytes:
+            # only read the least recently used few at a time, instead of every key in the cache
+            oldest = db.execute("SELECT key, size FROM parse_results ORDER BY last_access LIMIT ?",
+                                (_EVICT_BATCH_SIZE,)).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if total_size <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM parse_results WHERE key = ?", (key,))
+                total_size -= size
+                evicted += 1
+        db.execute("UPDATE cache_info SET total_size = ?", (max(total_size, 0),))
+        logger.debug("Evicted {} results from the parse cache".format(evicted))
+
+    def clear(self) -> None:
+        """Throw away everything in the cache."""
+        with self._lock, self._connection() as db:
+            db.execute("DELETE FROM parse_results")
+            db.execute("UPDATE cache_info SET total_size = 0")
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = self._db_pid = None
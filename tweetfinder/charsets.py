@@ -0,0 +1,67 @@
+"""
+Figure out how to decode the raw bytes of a webpage, so we can hand them straight to the parser.
+"""
+
+import re
+import codecs
+import logging
+from functools import lru_cache
+from typing import Optional, Union
+
+import lxml.html
+
+logger = logging.getLogger(__name__)
+
+# how raw HTML declares its encoding (ie. `<meta charset="utf-8">`), which we look for near the start of the page
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+META_CHARSET_SEARCH_BYTES = 4096
+
+_UTF16_BOMS = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+def guess_encoding(html: Union[bytes, memoryview], encoding: str = None) -> Optional[str]:
+    """
+    The encoding to parse raw HTML with.
+    :param html: the raw HTML, or at least the first `META_CHARSET_SEARCH_BYTES` of it
+    :param encoding: the encoding we were told about (ie. from the HTTP headers), if any
+    :return: `encoding` if there is one, or the one declared in the HTML, or utf-8 if the HTML doesn't say (the parser
+    would guess latin-1, which is usually wrong). `None` means the page starts with a UTF-16 byte order mark, which
+    the parser can handle on its own.
+    """
+    if encoding is not None:
+        return parser_encoding(encoding)
+    if bytes(html[:2]) in _UTF16_BOMS:
+        return None
+    # the parser only understands the old `http-equiv` way of declaring it, so we look for it ourselves
+    match = _META_CHARSET_PATTERN.search(html, 0, META_CHARSET_SEARCH_BYTES)
+    if match:
+        return parser_encoding(match.group(1).decode("ascii"))
+    return "utf-8"
+
+
+@lru_cache(maxsize=None)
+def parser_encoding(encoding: str) -> str:
+    """
+    The name the parser knows an encoding by. It doesn't know some of the names Python does (ie. "latin-1"), so try
+    Python's usual name for it too, and fall back to utf-8 if it is one we've never heard of.
+    """
+    try:
+        names = [encoding, codecs.lookup(encoding).name]
+    except LookupError:
+        names = [encoding]
+    for name in names:
+        try:
+            lxml.html.HTMLParser(encoding=name)
+            return name
+        except LookupError:
+            pass
+    logger.debug("Unknown encoding {}, using utf-8 instead".format(encoding))
+    return "utf-8"
+
+
+def is_ascii_compatible(encoding: Optional[str]) -> bool:
+    """Can we look for ASCII markers in the raw bytes of HTML in this encoding? (not in ie. UTF-16)"""
+    try:
+        return (encoding is not None) and not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+    except LookupError:
+        return False
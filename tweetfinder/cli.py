@@ -0,0 +1,210 @@
+"""
+Command-line tool to run a whole corpus of stories through tweetfinder. It streams stories in from a CSV or JSONL file
+and writes one record per story out as soon as it is processed, so memory use doesn't grow with the size of the corpus
+(except with `--dedup`, which has to remember every distinct story it has seen).
+Progress is checkpointed as it goes, so a crashed run can pick up where it left off with `--resume`.
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+from collections import deque
+from typing import Iterator, Dict, TextIO
+
+from .article import DEFAULT_TIMEOUT
+from .batch import process_many, DEFAULT_CHUNK_SIZE
+from .cache import ParseCache
+from .extractors import EXTRACTORS
+from .matcher import get_matcher
+
+logger = logging.getLogger(__name__)
+
+# write out a checkpoint after this many stories
+DEFAULT_CHECKPOINT_EVERY = 100
+
+CSV_COLUMNS = ['stories_id', 'url', 'language', 'embed_count', 'mention_count', 'tweet_ids', 'error']
+# the extra column when we are looking for duplicate stories
+DUPLICATE_COLUMN = 'duplicate_of'
+
+
+def read_stories(input_file: TextIO, input_format: str) -> Iterator[Dict]:
+    """
+    Stream stories in from a file, one row at a time.
+    :param input_file: a CSV with a header row, or JSON lines. Each story needs a `url` or `html`, and may have a
+    `stories_id`.
+    :param input_format: `csv` or `jsonl`
+    """
+    if input_format == 'csv':
+        _allow_large_csv_fields()  # inline `html` is often bigger than the default limit of 128KB
+        yield from csv.DictReader(input_file)
+    else:
+        for line in input_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _allow_large_csv_fields() -> None:
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return
+        except OverflowError:  # bigger than a C long on this platform
+            limit = limit // 10
+
+
+def _checkpoint_path(output_path: str) -> str:
+    return output_path + '.checkpoint'
+
+
+def _read_checkpoint(output_path: str) -> Dict:
+    try:
+        with open(_checkpoint_path(output_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict(stories_done=0, output_bytes=0)
+
+
+def _write_checkpoint(output_path: str, stories_done: int, output_bytes: int) -> None:
+    # write it to the side and then swap it in, so a crash can't leave a half-written checkpoint behind
+    temp_path = _checkpoint_path(output_path) + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(dict(stories_done=stories_done, output_bytes=output_bytes), f)
+    os.replace(temp_path, _checkpoint_path(output_path))
+
+
+def _record(story: Dict, result: Dict, output_format: str) -> Dict:
+    """Turn the result for one story into what we write out for it."""
+    record = dict(stories_id=story.get('stories_id', ''), url=story.get('url', ''), language=result['language'])
+    if output_format == 'csv':
+        embeds = result['embeds'] or []
+        record.update(embed_count=len(embeds), mention_count=len(result['mentions'] or []),
+                      tweet_ids=" ".join([tweet['tweet_id'] for tweet in embeds]), error=result['error'] or '')
+    else:
+        record.update(embeds=result['embeds'], mentions=result['mentions'], error=result['error'])
+    return record
+
+
+def run(input_path: str, output_path: str, input_format: str = None, output_format: str = None, workers: int = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE, resume: bool = False,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, dedup: bool = False, **article_kwargs) -> int:
+    """
+    Process every story in the input file and write the results to the output file.
+    :param input_path: a CSV or JSONL file of stories (see `read_stories`)
+    :param output_path: where to write one record per story, as CSV or JSONL
+    :param input_format: `csv` or `jsonl`; the default is to guess from the input file extension
+    :param output_format: `csv` or `jsonl`; the default is to guess from the output file extension
+    :param workers: how many processes to use (see `process_many`)
+    :param chunk_size: how many stories to send to a worker at a time
+    :param resume: pick up where the last run writing to the same output left off, instead of starting over
+    :param checkpoint_every: how many stories to process between checkpoints
+    :param dedup: spot stories with the same or nearly the same text as an earlier one (see `process_many`). Each
+    record then says which story it is a `duplicate_of`, by its `stories_id` (or `url` if it doesn't have one). Only
+    stories processed in this run are checked, so after `resume` it won't find duplicates of earlier ones. This keeps
+    the fingerprint and id of every distinct story in memory, so memory use grows with the size of the corpus.
+    :param article_kwargs: any other arguments to pass to every `Article`
+    :return: how many stories were processed in this run
+    """
+    input_format = input_format or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+    output_format = output_format or ('csv' if output_path.lower().endswith('.csv') else 'jsonl')
+    resume = resume and os.path.exists(output_path)
+    checkpoint = _read_checkpoint(output_path) if resume else dict(stories_done=0, output_bytes=0)
+    if checkpoint['stories_done'] > 0:
+        logger.info("Resuming after {} stories".format(checkpoint['stories_done']))
+    stories_done = checkpoint['stories_done']
+    start_time = time.time()
+    with open(input_path, newline='', encoding='utf-8-sig') as input_file, \
+            open(output_path, 'r+' if resume else 'w', newline='', encoding='utf-8') as output_file:
+        # throw away anything written after the last checkpoint, because we are going to process those stories again
+        output_file.seek(checkpoint['output_bytes'])
+        output_file.truncate()
+        csv_writer = None
+        if output_format == 'csv':
+            csv_writer = csv.DictWriter(output_file, fieldnames=CSV_COLUMNS + ([DUPLICATE_COLUMN] if dedup else []))
+            if checkpoint['output_bytes'] == 0:
+                csv_writer.writeheader()
+        stories = itertools.islice(read_stories(input_file, input_format), stories_done, None)
+        # results come back in order, so we just need to remember the stories that are still being processed
+        pending_stories = deque()
+        originals = {}  # index -> id of each story that isn't a duplicate, if we are looking for them
+
+        def items():
+            for story in stories:
+                pending_stories.append(story)
+                yield {key: story[key] for key in ('url', 'html') if story.get(key)}
+        for result in process_many(items(), workers=workers, chunk_size=chunk_size, dedup=dedup, **article_kwargs):
+            story = pending_stories.popleft()
+            record = _record(story, result, output_format)
+            if dedup:
+                if result['duplicate_of'] is None:
+                    stories_id = story.get('stories_id')
+                    # a stories_id can be 0 in JSONL, which is still an id
+                    originals[result['index']] = stories_id if stories_id not in (None, '') else story.get('url', '')
+                record[DUPLICATE_COLUMN] = originals.get(result['duplicate_of'])
+            if csv_writer:
+                csv_writer.writerow(record)
+            else:
+                output_file.write(json.dumps(record) + '\n')
+            stories_done += 1
+            if stories_done % checkpoint_every == 0:
+                output_file.flush()
+                _write_checkpoint(output_path, stories_done, output_file.tell())
+                logger.info("Processed {} stories".format(stories_done))
+        output_file.flush()
+        _write_checkpoint(output_path, stories_done, output_file.tell())
+    processed = stories_done - checkpoint['stories_done']
+    logger.info("Processed {} stories in {:.1f} seconds".format(processed, time.time() - start_time))
+    return processed
+
+
+def main(args=None) -> None:
+    parser = argparse.ArgumentParser(prog='tweetfinder', description=__doc__.strip())
+    parser.add_argument('input', help="CSV or JSONL file of stories, each with a `url` or `html`, and optionally a "
+                                      "`stories_id`")
+    parser.add_argument('output', help="file to write one CSV or JSONL record per story to")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help="default is based on the file extension")
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], help="default is based on the file extension")
+    parser.add_argument('--workers', type=int, help="how many processes to use (default is one per CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="how many stories to send to a worker at a time")
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help="seconds to wait for each story to download")
+    parser.add_argument('--mentions', help="file of phrases that count as mentions of tweets, one per line (default "
+                                           "is the built-in list)")
+    parser.add_argument('--cache', help="SQLite file to cache parse results in, so later runs over the same stories "
+                                        "only have to search for mentions again")
+    parser.add_argument('--prefilter', action='store_true', help="skip parsing stories whose HTML has no sign of "
+                                                                 "embedded or mentioned tweets")
+    parser.add_argument('--script-embeds', action='store_true', help="also find tweets that Javascript would embed, "
+                                                                     "from the data and code in script tags")
+    parser.add_argument('--extractor', choices=list(EXTRACTORS), help="how to pick out the content to search for "
+                                                                      "mentions (default is readability)")
+    parser.add_argument('--dedup', action='store_true', help="reuse the results of an earlier story for stories with "
+                                                             "the same or nearly the same text (ie. wire stories); "
+                                                             "memory use grows with the number of distinct stories")
+    parser.add_argument('--resume', action='store_true', help="continue from the last checkpoint of this output")
+    parser.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help="how many stories to process between checkpoints")
+    parser.add_argument('--verbose', action='store_true', help="log more about what is happening")
+    options = parser.parse_args(args)
+    logging.basicConfig(level=logging.DEBUG if options.verbose else logging.INFO,
+                        format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+    mentions_list = None
+    if options.mentions:
+        with open(options.mentions) as f:
+            mentions_list = get_matcher(f.readlines())
+    cache = ParseCache(options.cache) if options.cache else None
+    try:
+        run(options.input, options.output, input_format=options.input_format, output_format=options.output_format,
+            workers=options.workers, chunk_size=options.chunk_size, resume=options.resume,
+            checkpoint_every=options.checkpoint_every, dedup=options.dedup, timeout=options.timeout,
+            mentions_list=mentions_list, cache=cache, prefilter=options.prefilter, script_embeds=options.script_embeds,
+            extractor=options.extractor)
+    except KeyboardInterrupt:
+        logger.info("Stopped - run again with --resume to pick up from the last checkpoint")
+        sys.exit(1)
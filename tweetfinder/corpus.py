@@ -0,0 +1,245 @@
+"""
+Read webpages straight out of local archives - WARC files (plain or gzipped) and directories of saved HTML - without
+copying or decoding each one into a Python string first. Files are memory-mapped, and each page is handed to `Article`
+as a zero-copy view of the raw bytes. Every record remembers which file it came from and where in it, so results can
+point back to their source, and so worker processes can find the page again without it being sent to them.
+"""
+
+import os
+import mmap
+import zlib
+import logging
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple, Optional, Union, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# how many files to keep mapped at once (per process)
+MAPPED_FILES_CACHE_SIZE = 16
+
+HTML_FILE_EXTENSIONS = ('.html', '.htm')
+
+# how much compressed data to decompress at a time when finding the end of a gzipped WARC record
+_GZIP_READ_SIZE = 64 * 1024
+
+_HTML_CONTENT_TYPES = (b'text/html', b'application/xhtml+xml')
+
+
+class CorpusRecord(NamedTuple):
+    """
+    Where to find one webpage in an archive. This is small and cheap to send to another process, which can then read
+    the page itself.
+    """
+    path: str  # the file it is in
+    offset: int  # where the HTML starts in the file (or where the whole record starts, in a gzipped WARC)
+    length: int  # how many bytes of the file it takes up
+    url: Optional[str] = None  # the URL it was downloaded from, if we know it
+    encoding: Optional[str] = None  # the charset from the HTTP headers, if there was one
+    content_encoding: Optional[str] = None  # how the HTML was compressed or chunked when it was downloaded, if it was
+
+    def read(self) -> Union[memoryview, bytes]:
+        """
+        The raw HTML bytes of the page. This is a zero-copy view of the memory-mapped file, unless the page had to be
+        decompressed.
+        """
+        if _is_gzip(self.path):
+            member = _decompress_member(_mapped_file(self.path), self.offset)[0]
+            info = _parse_warc_record(member, 0)[1]
+            payload = member[info['payload_start']:info['payload_end']]
+        else:
+            payload = memoryview(_mapped_file(self.path))[self.offset:self.offset + self.length]
+        if self.content_encoding is not None:
+            payload = _decode_content(bytes(payload), self.content_encoding)
+        return payload
+
+    def to_dict(self) -> Dict:
+        """Where this came from, as plain data (ie. to save with the results)."""
+        return dict(path=self.path, offset=self.offset, length=self.length, url=self.url)
+
+
+def read_corpus(paths: Union[str, Iterable[str]]) -> Iterator[CorpusRecord]:
+    """
+    Find every HTML page in some archives.
+    :param paths: one or more WARC files (`.warc` or `.warc.gz`), HTML files, or directories to search for HTML files
+    :return: a `CorpusRecord` for each page. Pass these straight to `process_many`, or read one yourself and hand it to
+    `Article(html=record.read(), encoding=record.encoding)`.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.lower().endswith(HTML_FILE_EXTENSIONS):
+                        yield from _read_html_file(os.path.join(dir_path, file_name))
+        elif _is_warc(path):
+            yield from _read_warc(path)
+        else:
+            yield from _read_html_file(path)
+
+
+def _is_gzip(path: str) -> bool:
+    return path.lower().endswith('.gz')
+
+
+def _is_warc(path: str) -> bool:
+    return path.lower().endswith(('.warc', '.warc.gz'))
+
+
+@lru_cache(maxsize=MAPPED_FILES_CACHE_SIZE)
+def _mapped_file(path: str) -> Union[mmap.mmap, bytes]:
+    """Memory-map a file read-only, reusing the map for every record in it."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''  # an empty file can't be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_html_file(path: str) -> Iterator[CorpusRecord]:
+    yield CorpusRecord(path, 0, os.path.getsize(path))
+
+
+def _read_warc(path: str) -> Iterator[CorpusRecord]:
+    data = _mapped_file(path)
+    position = 0
+    while position < len(data):
+        if _is_gzip(path):
+            # each record is compressed on its own, so we can find it again later from where it starts
+            member, member_length = _decompress_member(data, position)
+            info = _parse_warc_record(member, 0)[1]
+            record = CorpusRecord(path, position, member_length, *_record_details(info)) if info else None
+            position += member_length
+        else:
+            position, info = _parse_warc_record(data, position)
+            record = CorpusRecord(path, info['payload_start'], info['payload_end'] - info['payload_start'],
+                                  *_record_details(info)) if info else None
+        if record is not None and info['is_html']:
+            yield record
+
+
+def _record_details(info: Dict) -> Tuple:
+    return info['url'], info['encoding'], info['content_encoding']
+
+
+def _decompress_member(data: Union[mmap.mmap, bytes], start: int) -> Tuple[bytes, int]:
+    """Decompress the one gzip member that starts here, and return it and how long it was compressed."""
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    view = memoryview(data)
+    parts = []
+    position = start
+    while not decompressor.eof:
+        if position >= len(data):
+            raise ValueError("Truncated gzip record at {}".format(start))
+        chunk = view[position:position + _GZIP_READ_SIZE]
+        parts.append(decompressor.decompress(chunk))
+        position += len(chunk) - len(decompressor.unused_data)
+    return b''.join(parts), position - start
+
+
+def _parse_headers(data: Union[mmap.mmap, bytes], start: int, end: int) -> Tuple[bytes, Dict[bytes, bytes]]:
+    """Parse the first line, and the `Name: value` lines after it, of some WARC or HTTP headers."""
+    lines = bytes(data[start:end]).split(b'\r\n')
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def _parse_warc_record(data: Union[mmap.mmap, bytes], start: int) -> Tuple[int, Optional[Dict]]:
+    """
+    Parse the WARC record that starts here (after skipping any blank lines).
+    :return: where the next record starts, and what we need to know about this one (or `None` if it isn't a page)
+    """
+    while data[start:start + 2] == b'\r\n':
+        start += 2
+    headers_end = data.find(b'\r\n\r\n', start)
+    if headers_end == -1:
+        return len(data), None
+    first_line, headers = _parse_headers(data, start, headers_end)
+    if not first_line.startswith(b'WARC/'):
+        raise ValueError("Not a WARC record at {}".format(start))
+    block_start = headers_end + 4
+    block_end = block_start + int(headers.get(b'content-length', b'0'))
+    record_type = headers.get(b'warc-type', b'')
+    info = dict(url=headers.get(b'warc-target-uri', b'').decode('utf-8', 'replace') or None, is_html=False,
+                payload_start=block_start, payload_end=block_end, encoding=None, content_encoding=None)
+    content_type = headers.get(b'content-type', b'')
+    if record_type == b'response' and content_type.startswith(b'application/http'):
+        # the block is a whole HTTP response, so the page is after its headers
+        http_end = data.find(b'\r\n\r\n', block_start, block_end)
+        if http_end == -1:
+            return block_end, None
+        status_line, http_headers = _parse_headers(data, block_start, http_end)
+        status = status_line.split(b' ')
+        info['payload_start'] = http_end + 4
+        content_type = http_headers.get(b'content-type', b'')
+        info['is_html'] = (len(status) > 1) and (status[1] == b'200') and _is_html_content_type(content_type)
+        info['content_encoding'] = _content_encodings(http_headers)
+    elif record_type == b'resource':
+        info['is_html'] = _is_html_content_type(content_type)
+    else:
+        return block_end, None
+    info['encoding'] = _charset(content_type)
+    return block_end, info
+
+
+def _is_html_content_type(content_type: bytes) -> bool:
+    return content_type.lower().startswith(_HTML_CONTENT_TYPES)
+
+
+def _charset(content_type: bytes) -> Optional[str]:
+    for param in content_type.split(b';')[1:]:
+        name, _, value = param.partition(b'=')
+        if name.strip().lower() == b'charset':
+            return value.strip().strip(b'"\'').decode('ascii', 'replace') or None
+    return None
+
+
+def _content_encodings(http_headers: Dict[bytes, bytes]) -> Optional[str]:
+    """
+    How a page was chunked and compressed, as the comma-separated list of encodings to undo in the order to undo them
+    (the reverse of the order they were done in: each header lists its encodings in the order they were applied, and
+    the transfer encodings were applied after the content encodings). `None` if it wasn't.
+    """
+    encodings = []
+    for name in (b'content-encoding', b'transfer-encoding'):
+        header = http_headers.get(name, b'').decode('ascii', 'replace').lower()
+        encodings += [encoding.strip() for encoding in header.split(',')]
+    encodings = [encoding for encoding in reversed(encodings) if encoding not in ('', 'identity')]
+    return ",".join(encodings) or None
+
+
+def _decode_content(payload: bytes, content_encoding: str) -> bytes:
+    """Undo the chunking and compression of a page as it was downloaded (see `_content_encodings`)."""
+    for encoding in content_encoding.split(','):
+        if encoding == 'chunked':
+            payload = _dechunk(payload)
+        elif encoding in ('gzip', 'x-gzip'):
+            payload = zlib.decompress(payload, zlib.MAX_WBITS | 16)
+        elif encoding == 'deflate':
+            try:
+                payload = zlib.decompress(payload)
+            except zlib.error:  # some servers send raw deflate data without the zlib header
+                payload = zlib.decompress(payload, -zlib.MAX_WBITS)
+        else:
+            # anything encoded before this can't be undone either
+            logger.warning("Can't decode content encoded as {}".format(encoding))
+            break
+    return payload
+
+
+def _dechunk(payload: bytes) -> bytes:
+    parts = []
+    position = 0
+    while position < len(payload):
+        line_end = payload.find(b'\r\n', position)
+        if line_end == -1:
+            break
+        chunk_size = int(payload[position:line_end].split(b';')[0].strip() or b'0', 16)
+        if chunk_size == 0:
+            break
+        parts.append(payload[line_end + 2:line_end + 2 + chunk_size])
+        position = line_end + 2 + chunk_size + 2
+    return b''.join(parts)
@@ -0,0 +1,166 @@
+"""
+Spot articles whose text is the same as, or nearly the same as, one we have already processed - like a wire story that
+hundreds of outlets run with only the headline or a sentence changed. Each article's text gets a `Fingerprint`: a hash
+of the exact words, and a MinHash signature that estimates how many runs of words it shares with another article. A
+`DuplicateIndex` keeps these in memory, with locality-sensitive hashing (LSH) so finding a near-duplicate only
+compares against the few articles that share part of a signature, instead of every article seen so far.
+"""
+
+import re
+import zlib
+import hashlib
+import logging
+from typing import TYPE_CHECKING, Any, Hashable, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:  # numpy is only imported once we fingerprint something
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# how many hash functions make up a MinHash signature (more is more accurate, but slower and bigger)
+NUM_PERMUTATIONS = 128
+
+# how many words in a row make up each of the pieces ("shingles") we compare articles by
+SHINGLE_SIZE = 5
+
+# the share of shingles two articles need to have in common to be near-duplicates
+DEFAULT_THRESHOLD = 0.8
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PERMUTATION_SEED = 1
+
+_permutations = None
+
+
+class Fingerprint(NamedTuple):
+    """The exact hash and the MinHash signature of an article's text."""
+    digest: str
+    signature: 'np.ndarray'
+
+
+def _get_permutations() -> 'Tuple[np.ndarray, np.ndarray]':
+    """The same random hash functions every time, and in every process, so signatures can be compared."""
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+        generator = np.random.RandomState(_PERMUTATION_SEED)
+        _permutations = (generator.randint(1, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64),
+                         generator.randint(0, _MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64))
+    return _permutations
+
+
+def fingerprint(text: str) -> Optional[Fingerprint]:
+    """
+    Fingerprint some text. Case, punctuation and spacing are ignored, so the same story formatted a bit differently is
+    still an exact match.
+    :param text: the text of an article (ie. from `Article.get_content`, without the tags)
+    :return: the `Fingerprint`, or `None` if there aren't any words to compare
+    """
+    import numpy as np
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return None
+    digest = hashlib.sha1(" ".join(words).encode('utf-8')).hexdigest()
+    shingles = set([" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))])
+    hashes = np.array([zlib.crc32(shingle.encode('utf-8')) for shingle in shingles], dtype=np.uint64)
+    a, b = _get_permutations()
+    # apply every hash function to every shingle at once, and keep the smallest value each function gave
+    with np.errstate(over='ignore'):
+        permuted = (np.outer(hashes, a) + b) % np.uint64(_MERSENNE_PRIME) & np.uint64(_MAX_HASH)
+    return Fingerprint(digest, permuted.min(axis=0).astype(np.uint32))
+
+
+def similarity(first: Fingerprint, second: Fingerprint) -> float:
+    """Estimate the share of shingles two articles have in common (their Jaccard similarity), from 0 to 1."""
+    if first.digest == second.digest:
+        return 1.0
+    return float((first.signature == second.signature).sum()) / len(first.signature)
+
+
+def _band_rows(threshold: float) -> int:
+    """
+    How many rows of the signature to put in each LSH band. Two articles are compared if all the rows of any one band
+    match, which mostly happens when they are more similar than `(1 / bands) ** (1 / rows)`. We pick the highest one of
+    those that is still below the threshold, so we rarely miss a near-duplicate, and then check each one we compare.
+    """
+    best_rows = 1
+    for rows in range(1, NUM_PERMUTATIONS + 1):
+        if (NUM_PERMUTATIONS % rows == 0) and ((rows / NUM_PERMUTATIONS) ** (1 / rows) <= threshold):
+            best_rows = rows
+    return best_rows
+
+
+class DuplicateIndex:
+    """
+    Remembers the fingerprint of each article (and any value you want to keep with it, like what we found in it) by a
+    key you choose, and finds the one an article duplicates. Nothing is written to disk.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        """
+        :param threshold: how similar (see `similarity`) an article has to be to one we have seen to be a duplicate
+        of it
+        """
+        self.threshold = threshold
+        self._rows = _band_rows(threshold)
+        self._digests = {}  # digest -> key
+        self._bands = [{} for _ in range(NUM_PERMUTATIONS // self._rows)]  # for each band, its rows -> keys
+        self._fingerprints = {}  # key -> fingerprint
+        self._values = {}  # key -> value
+        self._duplicates = {}  # key of a duplicate -> key of the article it duplicates
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return (key in self._fingerprints) or (key in self._duplicates)
+
+    def add(self, key: Hashable, article_fingerprint: Fingerprint, value: Any = None) -> None:
+        """
+        Remember an article that isn't a duplicate, so later ones can be found to be duplicates of it.
+        :param key: what to call it (ie. its position in a batch)
+        :param article_fingerprint: the `fingerprint` of its text
+        :param value: anything to keep with it, to get back via `get`
+        """
+        self._digests.setdefault(article_fingerprint.digest, key)
+        for band, band_keys in zip(self._band_keys(article_fingerprint), self._bands):
+            band_keys.setdefault(band, []).append(key)
+        self._fingerprints[key] = article_fingerprint
+        self._values[key] = value
+
+    def add_duplicate(self, key: Hashable, original_key: Hashable) -> None:
+        """Remember that an article is a duplicate of one that was added, so `original` and `get` work for it too."""
+        self._duplicates[key] = self.original(original_key)
+
+    def find(self, article_fingerprint: Fingerprint) -> Optional[Hashable]:
+        """
+        Find the article that one is a duplicate of.
+        :return: the key of the exact duplicate if there is one, or else of the most similar near-duplicate. `None`
+        if it isn't a duplicate of anything we have seen.
+        """
+        if article_fingerprint.digest in self._digests:
+            return self._digests[article_fingerprint.digest]
+        # only the articles that match all of at least one band are similar enough to be worth checking
+        candidates = dict.fromkeys(key for band, band_keys in zip(self._band_keys(article_fingerprint), self._bands)
+                                   for key in band_keys.get(band, []))
+        best_key, best_similarity = None, 0.0
+        for key in candidates:
+            key_similarity = similarity(article_fingerprint, self._fingerprints[key])
+            if (key_similarity >= self.threshold) and ((best_key is None) or (key_similarity > best_similarity)):
+                best_key, best_similarity = key, key_similarity
+        return best_key
+
+    def original(self, key: Hashable) -> Hashable:
+        """The key of the article that `key` is a duplicate of, or `key` itself if it isn't a duplicate."""
+        return self._duplicates.get(key, key)
+
+    def get(self, key: Hashable) -> Any:
+        """The value kept with an article (or with the article it is a duplicate of)."""
+        return self._values[self.original(key)]
+
+    def _band_keys(self, article_fingerprint: Fingerprint) -> List[bytes]:
+        signature = article_fingerprint.signature
+        return [signature[start:start + self._rows].tobytes() for start in range(0, len(signature), self._rows)]
@@ -0,0 +1,310 @@
+"""
+Find tweets embedded in the HTML of a webpage.
+"""
+
+import re
+import json
+import logging
+from urllib.parse import unquote
+from typing import Iterator, List, Optional, Tuple, Union
+
+from lxml import etree
+from lxml.html import HtmlElement
+
+from .results import EmbeddedTweet
+from .urls import parse_tweet_url, is_twitter_link
+
+logger = logging.getLogger(__name__)
+
+# we can't find an embedded tweet in a page that doesn't have at least one of these in it somewhere
+_EMBED_MARKERS = ['embed-twitter', 'twitter-tweet-rendered']
+_BLOCKQUOTE_TAG_PATTERN = re.compile(r'<[bB][lL][oO][cC][kK][qQ][uU][oO][tT][eE]')
+_EMBED_MARKER_BYTES = [marker.encode() for marker in _EMBED_MARKERS]
+_BLOCKQUOTE_TAG_PATTERN_BYTES = re.compile(_BLOCKQUOTE_TAG_PATTERN.pattern.encode())
+# buffers like memoryviews can only be searched with a regex, so this checks for all of those at once
+_EMBED_MARKERS_PATTERN_BYTES = re.compile(b'|'.join([re.escape(marker) for marker in _EMBED_MARKER_BYTES] +
+                                                   [_BLOCKQUOTE_TAG_PATTERN_BYTES.pattern]))
+
+# signs that some Javascript or data on the page might embed a tweet (see `find_embeds` with `scripts=True`)
+_SCRIPT_MARKERS_PATTERN = re.compile(r'tweet[-_]?id|twitter\.com|x\.com|createTweet|oembed', re.IGNORECASE)
+_SCRIPT_MARKERS_PATTERN_BYTES = re.compile(_SCRIPT_MARKERS_PATTERN.pattern.encode(), re.IGNORECASE)
+
+# scripts with these types (or this id, for Next.js) hold JSON data instead of Javascript
+_JSON_SCRIPT_TYPES = ('application/ld+json', 'application/json')
+_NEXT_DATA_SCRIPT_ID = '__NEXT_DATA__'
+# keys that JSON data uses for the id of a tweet (compared ignoring case)
+_TWEET_ID_KEYS = {'tweetid', 'tweet_id', 'tweetidstr', 'tweet_id_str'}
+# keys that JSON data uses for the link to a tweet it embeds (compared ignoring case)
+_EMBED_URL_KEYS = {'embedurl', 'embed_url', 'tweeturl', 'tweet_url'}
+# keys that say what kind of thing a JSON object is, ie. `{"type": "tweet", "url": ...}` for an embed
+_JSON_TYPE_KEYS = {'type', '@type', '_type', '__typename', 'blocktype', 'embedtype'}
+_EMBED_TYPE_PATTERN = re.compile(r'tweet|embed', re.IGNORECASE)
+# widgets.js calls that embed a tweet by its id, ie. `twttr.widgets.createTweet('20', element)`
+_CREATE_TWEET_PATTERN = re.compile(r'createTweet\(\s*["\'](\d+)["\']')
+# requests for the embed code of a tweet, ie. `https://publish.twitter.com/oembed?url=https%3A%2F%2Ftwitter.com...`
+_OEMBED_URL_PATTERN = re.compile(r'oembed[^"\'\s]*?[?&]url=([^&"\'\s]+)', re.IGNORECASE)
+# how Javascript strings commonly escape the characters in HTML
+_SCRIPT_ESCAPES = [('\\"', '"'), ("\\'", "'"), ('\\/', '/'), ('\\u003c', '<'), ('\\u003C', '<'), ('\\u003e', '>'),
+                   ('\\u003E', '>'), ('\\u0026', '&'), ('\\u002F', '/'), ('\\u002f', '/')]
+
+# match elements that have the CSS class passed in as `name`, the same way a browser would
+_HAS_CLASS_XPATH = 'contains(concat(" ", normalize-space(@class), " "), concat(" ", $name, " "))'
+
+
+def find_embeds(html_tree: HtmlElement, scripts: bool = False) -> List[EmbeddedTweet]:
+    """
+    Search a parsed webpage for any embedded tweets via a variety of methods.
+    :param html_tree: the webpage, parsed via `lxml.html`
+    :param scripts: Pass in `True` to also find tweets that Javascript would embed once the page runs in a browser, from
+    the data and code in script tags and `data-tweet-id` attributes (see `_tweets_from_script`). These come after all
+    the others, and only ones we haven't already found are included.
+    :return: a list of info about each tweet embedded (see `Article.list_embedded_tweets`)
+    """
+    tweets = []
+    # Twitter recommends embedding as block quotes
+    for b in html_tree.iter('blockquote'):
+        tweet_info = _tweet_from_blockquote_links([link.get('href') for link in b.iter('a')
+                                                   if link.get('href') is not None])
+        if tweet_info:
+            tweets.append(tweet_info)
+    # some people do it differently, (CNN, others) embed with like this
+    for d in html_tree.xpath('//div[{}]'.format(_HAS_CLASS_XPATH), name="embed-twitter"):
+        if d.get('data-embed-id') is not None:
+            tweets.append(EmbeddedTweet(d.get('data-embed-id'), 'div with data-embed-id'))
+    # check if we are looking at HTML already rendered by JS and transformed into an iframe of content
+    for d in html_tree.xpath('//div[{}]'.format(_HAS_CLASS_XPATH), name="twitter-tweet-rendered"):
+        for iframe in d.iter('iframe'):
+            if iframe.get('data-tweet-id') is not None:
+                tweets.append(EmbeddedTweet(iframe.get('data-tweet-id'), 'rendered iframe'))
+    if scripts:
+        script_tweets = []
+        for element in html_tree.iter(etree.Element):
+            if element.get('data-tweet-id') is not None:
+                script_tweets.append(EmbeddedTweet(element.get('data-tweet-id'), 'data-tweet-id attribute'))
+            if element.tag == 'script':
+                script_tweets += _tweets_from_script(element.get('type'), element.get('id'), element.text)
+        tweets += _new_tweets(tweets, script_tweets)
+    return tweets
+
+
+def _tweet_from_blockquote_links(hrefs: List[str]) -> Optional[EmbeddedTweet]:
+    """Figure out which tweet a blockquote embeds from the links inside it, if any."""
+    # We could check the official way of doing it:
+    # `if 'twitter-tweet' in b.classes:`
+    # But we found some sites don't use that class, so check if there is a link to twitter in there.
+    # In our experimentation this produces better results than just checking the class.
+    # grab first link that we think is a good one to parse
+    for href in hrefs:
+        tweet_url = parse_tweet_url(href)
+        if tweet_url is not None:
+            return EmbeddedTweet(tweet_url.tweet_id, 'blockquote url pattern', username=tweet_url.username,
+                                 full_url=tweet_url.url)
+    # if no super nice link, fallback on custom parsing of first one that has some good potential
+    for href in hrefs:
+        if is_twitter_link(href):
+            try:
+                username_start_index = href.find('@')
+                username = href[username_start_index:-1]
+                tweet_id_start_index = href.find('/')
+                tweet_id = href[tweet_id_start_index:-1]
+                return EmbeddedTweet(tweet_id, 'blockquote url fallback', username=username, full_url=href)
+            except Exception:  # some other format that we couldn't handle
+                logger.warning("Can't parse potential link to tweet: {}".format(href))
+    return None
+
+
+def _tweets_from_script(script_type: Optional[str], script_id: Optional[str],
+                        text: Optional[str]) -> List[EmbeddedTweet]:
+    """
+    Find tweets that the contents of a script tag would embed. Only things that embed a tweet count, not just any link
+    to one (ie. in the text of the article). Each is found one of these ways, which is its `html_source`:
+    * `script json`: in JSON data, ie. `application/ld+json` or Next.js' `__NEXT_DATA__` (see `_tweets_in_json`)
+    * `script widgets.js`: a call to `twttr.widgets.createTweet` with the tweet id
+    * `script oembed`: a request for the embed code of a tweet
+    * `script embed html`: the HTML of an embed, in a Javascript string
+    """
+    if not text:
+        return []
+    if ((script_type or '').strip().lower() in _JSON_SCRIPT_TYPES) or (script_id == _NEXT_DATA_SCRIPT_ID):
+        try:
+            return [EmbeddedTweet(tweet_id, 'script json', username=username, full_url=full_url)
+                    for tweet_id, username, full_url in _tweets_in_json(json.loads(text))]
+        except ValueError:
+            pass  # not valid JSON after all, so search it like any other script
+    tweets = [EmbeddedTweet(tweet_id, 'script widgets.js') for tweet_id in _CREATE_TWEET_PATTERN.findall(text)]
+    for encoded_url in _OEMBED_URL_PATTERN.findall(text):
+        tweet_url = parse_tweet_url(unquote(encoded_url))
+        if tweet_url is not None:
+            tweets.append(EmbeddedTweet(tweet_url.tweet_id, 'script oembed', username=tweet_url.username,
+                                        full_url=tweet_url.url))
+    if 'blockquote' in text.lower():
+        for escaped, character in _SCRIPT_ESCAPES:
+            text = text.replace(escaped, character)
+        tweets += [EmbeddedTweet(tweet_id, 'script embed html', username=username, full_url=full_url)
+                   for tweet_id, username, full_url in _tweets_in_html(text)]
+    return tweets
+
+
+def _tweets_in_json(data, embeds_links: bool = False) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Find the id (and username and link, if we can) of every tweet embedded by some JSON data, in order. These are the
+    values of keys like `tweetId`, the tweets embedded in strings of HTML, and links to tweets where the data says they
+    are embedded: the value of a key like `embedUrl`, or in an object whose `type` is an embed or tweet. Other links to
+    tweets (ie. in the rich text of the article, or a JSON-LD `citation`) don't count.
+    :param embeds_links: is `data` the value of something that embeds a link to a tweet, if it is one?
+    """
+    if isinstance(data, dict):
+        is_embed = any((key.lower() in _JSON_TYPE_KEYS) and isinstance(value, str) and
+                       (_EMBED_TYPE_PATTERN.search(value) is not None) for key, value in data.items())
+        for key, value in data.items():
+            if (key.lower() in _TWEET_ID_KEYS) and isinstance(value, (str, int)) and str(value).isdigit():
+                yield str(value), None, None
+            else:
+                yield from _tweets_in_json(value, is_embed or (key.lower() in _EMBED_URL_KEYS))
+    elif isinstance(data, list):
+        for value in data:
+            yield from _tweets_in_json(value, embeds_links)
+    elif isinstance(data, str):
+        if '<' in data:
+            yield from _tweets_in_html(data)
+        elif embeds_links:
+            tweet_url = parse_tweet_url(data.strip())
+            if tweet_url is not None:
+                yield tweet_url.tweet_id, tweet_url.username, tweet_url.url
+
+
+def _tweets_in_html(html: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """The id, username and link of each tweet embedded in some HTML (except ones we'd have to guess at)."""
+    return [(tweet['tweet_id'], tweet.get('username'), tweet.get('full_url')) for tweet in scan_embeds(html)
+            if tweet['html_source'] != 'blockquote url fallback']
+
+
+def _new_tweets(tweets: List[EmbeddedTweet], more_tweets: List[EmbeddedTweet]) -> List[EmbeddedTweet]:
+    """The tweets in `more_tweets` that aren't in `tweets`, or earlier in `more_tweets`."""
+    seen = set([tweet['tweet_id'] for tweet in tweets])
+    new_tweets = []
+    for tweet in more_tweets:
+        if tweet['tweet_id'] not in seen:
+            seen.add(tweet['tweet_id'])
+            new_tweets.append(tweet)
+    return new_tweets
+
+
+class _EmbedScanner:
+    """
+    An lxml parser target that watches the stream of tags go by and picks out embedded tweets, without ever building a
+    tree of the document. This finds the same tweets, in the same order, as `find_embeds`. Each blockquote is turned
+    into a tweet (or not) as soon as it closes, so only the links inside the blockquotes that are still open are kept.
+    """
+
+    def __init__(self, scripts: bool = False):
+        """
+        :param scripts: also find tweets in script tags and `data-tweet-id` attributes (see `find_embeds`)
+        """
+        # the blockquotes and divs we are inside of, with what we are collecting for them and their slot in the results
+        self._open_tags = []
+        self._blockquotes = []  # the tweet for each blockquote (or its hrefs while it is open), in the order they start
+        self._div_embeds = []
+        self._rendered_iframes = []  # a list of iframe tweet ids for each rendered div, in the order they started
+        self._scripts = scripts
+        self._script = None  # the type, id and text so far of the script tag we are inside of
+        self._script_tweets = []
+
+    def start(self, tag, attrib):
+        if self._scripts:
+            if attrib.get('data-tweet-id') is not None:
+                self._script_tweets.append(EmbeddedTweet(attrib['data-tweet-id'], 'data-tweet-id attribute'))
+            if tag == 'script':
+                self._script = (attrib.get('type'), attrib.get('id'), [])
+        if tag == 'blockquote':
+            self._blockquotes.append([])
+            self._open_tags.append((tag, self._blockquotes[-1], len(self._blockquotes) - 1))
+        elif tag == 'div':
+            classes = attrib.get('class', '').split()
+            if ('embed-twitter' in classes) and (attrib.get('data-embed-id') is not None):
+                self._div_embeds.append(EmbeddedTweet(attrib['data-embed-id'], 'div with data-embed-id'))
+            if 'twitter-tweet-rendered' in classes:
+                self._rendered_iframes.append([])
+                self._open_tags.append((tag, self._rendered_iframes[-1], None))
+            else:
+                self._open_tags.append((tag, None, None))
+        elif (tag == 'a') and (attrib.get('href') is not None):
+            for open_tag, hrefs, _ in self._open_tags:
+                if open_tag == 'blockquote':
+                    hrefs.append(attrib['href'])
+        elif (tag == 'iframe') and (attrib.get('data-tweet-id') is not None):
+            for open_tag, tweet_ids, _ in self._open_tags:
+                if (open_tag == 'div') and (tweet_ids is not None):
+                    tweet_ids.append(attrib['data-tweet-id'])
+
+    def end(self, tag):
+        if (tag == 'script') and (self._script is not None):
+            script_type, script_id, text = self._script
+            self._script_tweets += _tweets_from_script(script_type, script_id, ''.join(text))
+            self._script = None
+        if (tag in ('blockquote', 'div')) and self._open_tags:
+            # pop back to the matching open tag, in case the HTML wasn't nested properly
+            for index in range(len(self._open_tags) - 1, -1, -1):
+                if self._open_tags[index][0] == tag:
+                    self._close_tags(index)
+                    break
+
+    def _close_tags(self, index: int) -> None:
+        for open_tag, hrefs, slot in self._open_tags[index:]:
+            if open_tag == 'blockquote':
+                self._blockquotes[slot] = _tweet_from_blockquote_links(hrefs)
+        del self._open_tags[index:]
+
+    def data(self, data):
+        if self._script is not None:
+            self._script[2].append(data)
+
+    def close(self) -> List[EmbeddedTweet]:
+        self._close_tags(0)
+        tweets = [tweet_info for tweet_info in self._blockquotes if tweet_info]
+        tweets += self._div_embeds
+        for tweet_ids in self._rendered_iframes:
+            tweets += [EmbeddedTweet(tweet_id, 'rendered iframe') for tweet_id in tweet_ids]
+        if self._scripts:
+            tweets += _new_tweets(tweets, self._script_tweets)
+        return tweets
+
+
+def might_have_embeds(html: Union[bytes, str], scripts: bool = False) -> bool:
+    """
+    A quick check of the raw HTML, without parsing it. If this is `False` the page can't have any embedded tweets that
+    `find_embeds` or `scan_embeds` would find.
+    :param html: the raw HTML of the webpage, as bytes (in an ASCII-compatible encoding) or text
+    :param scripts: whether we are also looking for tweets in scripts (see `find_embeds`)
+    """
+    if scripts:
+        pattern = _SCRIPT_MARKERS_PATTERN if isinstance(html, str) else _SCRIPT_MARKERS_PATTERN_BYTES
+        if pattern.search(html) is not None:
+            return True
+    if isinstance(html, str):
+        markers, blockquote_tag_pattern = _EMBED_MARKERS, _BLOCKQUOTE_TAG_PATTERN
+    elif isinstance(html, bytes):
+        markers, blockquote_tag_pattern = _EMBED_MARKER_BYTES, _BLOCKQUOTE_TAG_PATTERN_BYTES
+    else:
+        return _EMBED_MARKERS_PATTERN_BYTES.search(html) is not None
+    return any(marker in html for marker in markers) or (blockquote_tag_pattern.search(html) is not None)
+
+
+def scan_embeds(html: Union[bytes, str], encoding: str = None, scripts: bool = False) -> List[EmbeddedTweet]:
+    """
+    A faster way to find embedded tweets when that is all you need. Pages that can't have any embeds are skipped
+    without parsing them at all, and the rest are streamed through without building a tree of the document.
+    :param html: the raw HTML of the webpage, as bytes or text
+    :param encoding: the character encoding of `html` if it is bytes and you know it (ie. from the HTTP headers). The
+    default is to figure it out from the HTML itself.
+    :param scripts: also find tweets in scripts (see `find_embeds`)
+    :return: a list of info about each tweet embedded (the same as `Article.list_embedded_tweets`)
+    """
+    if not might_have_embeds(html, scripts):
+        return []
+    if isinstance(html, str):
+        # lxml won't parse text that declares an encoding (ie. an `<?xml ... encoding="utf-8"?>` line), so parse it as
+        # utf-8 bytes instead, the same as `Article` does
+        html, encoding = html.encode("utf-8", "replace"), "utf-8"
+    parser = etree.HTMLParser(target=_EmbedScanner(scripts), encoding=encoding)
+    return etree.fromstring(html, parser)
@@ -0,0 +1,238 @@
+"""
+Evaluate how well we find embedded tweets against a hand-checked list of the tweets in each article, without touching
+the network. Each webpage is downloaded (and optionally rendered in a browser, so Javascript embeds show up) once and
+saved to a local `SnapshotStore`. After that every evaluation replays the saved HTML through `Article` in parallel,
+and scores all the articles at once with numpy, so re-checking a code change takes seconds instead of hours.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .batch import process_many
+from .corpus import CorpusRecord
+
+if TYPE_CHECKING:  # numpy is only imported once we score something
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# the kinds of HTML we save for each page: what the server sent, and what a browser showed after running Javascript
+RAW = 'raw'
+RENDERED = 'rendered'
+
+# how many pages to download at once when taking snapshots
+DEFAULT_FETCH_WORKERS = 8
+
+_INDEX_FILENAME = "snapshots.jsonl"
+
+
+class SnapshotStore:
+    """
+    A directory of saved webpages, keyed by URL. Each page is saved as an HTML file, exactly as it was downloaded, and
+    an index file records which URL each one is and how it is encoded.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: the directory to keep the snapshots in (it is created if it doesn't exist)
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._encodings = {}  # url -> {kind: encoding}
+        index_path = os.path.join(path, _INDEX_FILENAME)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._encodings.setdefault(entry['url'], {})[entry['kind']] = entry['encoding']
+
+    def __len__(self) -> int:
+        return len(self._encodings)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._encodings
+
+    def urls(self) -> List[str]:
+        return list(self._encodings)
+
+    def has(self, url: str, kind: str = RAW) -> bool:
+        return kind in self._encodings.get(url, {})
+
+    def save(self, url: str, html: Union[str, bytes], kind: str = RAW, encoding: str = None) -> None:
+        """
+        Save (or replace) one snapshot of a webpage.
+        :param url: the webpage
+        :param html: its HTML, as text or as the raw bytes that were downloaded
+        :param kind: `RAW` or `RENDERED`
+        :param encoding: the character encoding of `html` if it is bytes and you know it (ie. from the HTTP headers)
+        """
+        if isinstance(html, str):
+            html, encoding = html.encode('utf-8'), 'utf-8'
+        with open(self._file_path(url, kind), 'wb') as f:
+            f.write(html)
+        with open(os.path.join(self.path, _INDEX_FILENAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(url=url, kind=kind, encoding=encoding)) + "\n")
+        self._encodings.setdefault(url, {})[kind] = encoding
+
+    def record(self, url: str, kind: str = RAW) -> Optional[CorpusRecord]:
+        """
+        Where to find one saved snapshot, to read it yourself or pass it to `process_many`.
+        :return: a `CorpusRecord`, or `None` if we don't have that snapshot
+        """
+        if not self.has(url, kind):
+            return None
+        file_path = self._file_path(url, kind)
+        return CorpusRecord(file_path, 0, os.path.getsize(file_path), url, self._encodings[url][kind])
+
+    def _file_path(self, url: str, kind: str) -> str:
+        return os.path.join(self.path, "{}.{}.html".format(hashlib.sha1(url.encode('utf-8')).hexdigest(), kind))
+
+
+def take_snapshots(urls: Iterable[str], store: SnapshotStore, render: Callable[[str], str] = None,
+                   timeout: int = None, workers: int = DEFAULT_FETCH_WORKERS) -> int:
+    """
+    Download, and optionally render, every webpage that isn't already in the store. Pages that fail are logged and
+    skipped, so running this again only retries those.
+    :param urls: the webpages to save
+    :param store: where to save them
+    :param render: a function that returns the HTML of a URL after a browser has run its Javascript (ie. via Selenium).
+    This is called on one page at a time. Leave it out to only save the raw HTML.
+    :param timeout: how long to wait for each server to respond. The default value is `DEFAULT_TIMEOUT` (5 seconds).
+    :param workers: how many pages to download at once
+    :return: how many snapshots were saved
+    """
+    urls = list(dict.fromkeys(urls))
+    saved = 0
+    missing = [url for url in urls if not store.has(url, RAW)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url, downloaded in zip(missing, executor.map(lambda u: _download(u, timeout), missing)):
+            if downloaded is not None:
+                store.save(url, downloaded[0], RAW, downloaded[1])
+                saved += 1
+    if render is not None:
+        for url in urls:
+            if not store.has(url, RENDERED):
+                try:
+                    store.save(url, render(url), RENDERED)
+                    saved += 1
+                except Exception as e:
+                    logger.warning("Failed to render {}: {}".format(url, e))
+    return saved
+
+
+def _download(url: str, timeout: Optional[int]) -> Optional[Tuple[bytes, Optional[str]]]:
+    import requests  # only needed when taking snapshots, and slow to import
+    from .article import DEFAULT_TIMEOUT
+    try:
+        r = requests.get(url, timeout=timeout or DEFAULT_TIMEOUT)
+        r.raise_for_status()
+    except Exception as e:
+        logger.warning("Failed to download {}: {}".format(url, e))
+        return None
+    return r.content, (r.encoding if 'charset' in r.headers.get('content-type', '').lower() else None)
+
+
+class Scores:
+    """
+    How well the tweets we found match the right answers, for each article and overall. Each per-article column is a
+    numpy array, in the same order as the answers passed to `evaluate`.
+    """
+
+    def __init__(self, urls: List[str], true_positives: 'np.ndarray', false_positives: 'np.ndarray',
+                 false_negatives: 'np.ndarray', mention_counts: 'np.ndarray', missing: 'np.ndarray'):
+        self.urls = urls
+        self.true_positives = true_positives
+        self.false_positives = false_positives
+        self.false_negatives = false_negatives
+        self.mention_counts = mention_counts  # -1 if the article's language isn't supported
+        self.missing = missing  # whether we didn't have a snapshot of the article, or couldn't process it
+
+    @property
+    def precision(self) -> float:
+        """Of all the tweets we found, the share that are in the right answers."""
+        found = int(self.true_positives.sum() + self.false_positives.sum())
+        return int(self.true_positives.sum()) / found if found else 0.0
+
+    @property
+    def recall(self) -> float:
+        """Of all the tweets in the right answers, the share that we found."""
+        expected = int(self.true_positives.sum() + self.false_negatives.sum())
+        return int(self.true_positives.sum()) / expected if expected else 0.0
+
+    def to_dict(self) -> Dict[str, List]:
+        """The per-article columns, as plain lists (ie. to make a DataFrame or save as CSV)."""
+        return dict(url=list(self.urls), true_positives=self.true_positives.tolist(),
+                    false_positives=self.false_positives.tolist(), false_negatives=self.false_negatives.tolist(),
+                    mention_count=self.mention_counts.tolist(), missing=self.missing.tolist())
+
+
+def score_tweet_ids(found: List[Iterable[str]], expected: List[Iterable[str]]) -> 'Tuple[np.ndarray, ...]':
+    """
+    Compare the tweet ids found in each article to the right answers, for all the articles at once. Repeats of the same
+    tweet in one article only count once.
+    :param found: the tweet ids we found, for each article
+    :param expected: the right tweet ids, for each article (in the same order)
+    :return: numpy arrays of the true positives, false positives and false negatives for each article
+    """
+    import numpy as np
+    article_count = len(expected)
+    found_articles, found_ids = _flatten(found)
+    expected_articles, expected_ids = _flatten(expected)
+    # number every distinct tweet id, so each (article, tweet) pair can be a single integer
+    codes = np.unique(np.concatenate([found_ids, expected_ids]), return_inverse=True)[1].reshape(-1)
+    tweet_count = max(len(codes), 1)
+    found_pairs = np.unique(found_articles * tweet_count + codes[:len(found_ids)])
+    expected_pairs = np.unique(expected_articles * tweet_count + codes[len(found_ids):])
+    hits = np.isin(found_pairs, expected_pairs, assume_unique=True)
+    true_positives = np.bincount(found_pairs[hits] // tweet_count, minlength=article_count)
+    false_positives = np.bincount(found_pairs // tweet_count, minlength=article_count) - true_positives
+    false_negatives = np.bincount(expected_pairs // tweet_count, minlength=article_count) - true_positives
+    return true_positives, false_positives, false_negatives
+
+
+def _flatten(id_lists: List[Iterable[str]]) -> 'Tuple[np.ndarray, np.ndarray]':
+    """Turn a list of lists of ids into an array of which list each id came from, and an array of the ids."""
+    import numpy as np
+    articles, ids = [], []
+    for article, article_ids in enumerate(id_lists):
+        for tweet_id in article_ids:
+            articles.append(article)
+            ids.append(str(tweet_id))
+    return np.array(articles, dtype=np.int64), np.array(ids, dtype=str)
+
+
+def evaluate(store: SnapshotStore, answers: Dict[str, Iterable[str]], kind: str = RAW, workers: int = None,
+             **article_kwargs) -> Scores:
+    """
+    Find the embedded tweets (and mentions) in the saved snapshot of every article, and score them against the right
+    answers. Nothing is downloaded - articles without a snapshot count as finding nothing, and are marked as `missing`.
+    :param store: where the snapshots were saved by `take_snapshots`
+    :param answers: the right tweet ids for each article, by URL
+    :param kind: which snapshots to use, `RAW` or `RENDERED`
+    :param workers: how many processes to use (see `process_many`)
+    :param article_kwargs: any other arguments to pass to every `Article`
+    :return: the `Scores`
+    """
+    import numpy as np
+    urls = list(answers)
+    found = [[] for _ in urls]
+    mention_counts = np.full(len(urls), -1, dtype=np.int64)
+    missing = np.ones(len(urls), dtype=bool)
+    records = [(row, store.record(url, kind)) for row, url in enumerate(urls)]
+    records = [(row, record) for row, record in records if record is not None]
+    # workers read each snapshot from disk themselves, so only the file name is sent to them
+    results = process_many([record for _, record in records], workers=workers, **article_kwargs)
+    for (row, _), result in zip(records, results):
+        if result['error'] is not None:
+            logger.warning("Failed to process {}: {}".format(urls[row], result['error']))
+            continue
+        found[row] = [tweet['tweet_id'] for tweet in result['embeds']]
+        if result['mentions'] is not None:
+            mention_counts[row] = len(result['mentions'])
+        missing[row] = False
+    true_positives, false_positives, false_negatives = score_tweet_ids(found, [answers[url] for url in urls])
+    return Scores(urls, true_positives, false_positives, false_negatives, mention_counts, missing)
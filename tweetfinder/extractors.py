@@ -0,0 +1,232 @@
+"""
+Ways to pull the main content of an article out of its parsed HTML, which is the text we search for mentions of tweets.
+`Article` uses readability by default. The page is parsed once and shared with finding embeds, but readability only
+hands back its content as HTML, so we parse that (much smaller) HTML a second time to get the text. On the test
+fixtures this takes under 0.1ms, next to 10-30ms for readability itself. The text-density extractor here is much
+faster, because it only looks at the parsed page once instead of cleaning it up and scoring it over and over, and
+takes the text from the tree it picks without parsing anything again. It can be a bit less careful about what it leaves
+in (see `compare-extractors.py` for how the two compare).
+"""
+
+import re
+import copy
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+import lxml.html
+
+logger = logging.getLogger(__name__)
+
+# whitespace is left alone inside these tags when we pull the text out of the content
+_PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def text_content(html_tree: lxml.html.HtmlElement) -> str:
+    """
+    Return all the text in a parsed document. Like BeautifulSoup's `get_text`, whitespace between tags is collapsed into
+    one newline or space so the offsets of mentions in the text don't depend on how the HTML was indented.
+    """
+    strings = []
+    for text in html_tree.xpath('//text()'):
+        if (text.strip(_ASCII_SPACES) == '') and not _preserves_whitespace(text):
+            text = '\n' if '\n' in text else ' '
+        strings.append(text)
+    return ''.join(strings)
+
+
+def _preserves_whitespace(text) -> bool:
+    """Is this string from `xpath('//text()')` inside a tag where whitespace matters?"""
+    container = text.getparent().getparent() if text.is_tail else text.getparent()
+    while container is not None:
+        if container.tag in _PRESERVE_WHITESPACE_TAGS:
+            return True
+        container = container.getparent()
+    return False
+
+
+class ContentExtractor:
+    """
+    Pulls the main content out of a parsed webpage. To use your own way, make a subclass with its own `name` and pass
+    an instance in as `Article(extractor=...)`.
+    """
+
+    # a short name for the extractor, which is part of the cache key so results from different ones aren't mixed up
+    name = None
+
+    def extract(self, html_tree: lxml.html.HtmlElement) -> Tuple[str, str]:
+        """
+        :param html_tree: the whole webpage, parsed via `lxml.html`. This is shared with finding embedded tweets, so
+        don't change it.
+        :return: the content as HTML, and as text (which is what we search for mentions)
+        """
+        raise NotImplementedError()
+
+
+class ReadabilityExtractor(ContentExtractor):
+    """The content that the readability library picks out (the default)."""
+
+    name = 'readability'
+
+    def extract(self, html_tree: lxml.html.HtmlElement) -> Tuple[str, str]:
+        import readability  # slow to import, so only loaded when it is used
+        content = readability.Document(html_tree).summary()
+        # parse the content back (a second, small parse), rather than relying on readability leaving its cleaned up
+        # tree behind for us, which it doesn't promise to do
+        if not content.strip():
+            return content, ''
+        return content, text_content(lxml.html.document_fromstring(content)).strip()
+
+
+# nothing in these is part of the content
+_SKIP_TAGS = {'head', 'script', 'style', 'noscript', 'template', 'nav', 'header', 'footer', 'aside', 'form', 'button',
+              'select', 'iframe', 'svg', 'canvas', 'object', 'embed'}
+# the blocks of text we score, and the tags that make a div more than one block of text
+_TEXT_BLOCK_TAGS = {'p', 'pre', 'td'}
+_BLOCK_TAGS = {'p', 'pre', 'td', 'div', 'table', 'ul', 'ol', 'dl', 'blockquote', 'section', 'article', 'form', 'img',
+               'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+# class names and ids that usually mean the content is (or isn't) in there, as readability uses them
+_POSITIVE_PATTERN = re.compile(r'article|body|content|entry|hentry|h-entry|main|page|pagination|post|text|blog|story',
+                               re.IGNORECASE)
+_NEGATIVE_PATTERN = re.compile(r'combx|comment|com-|contact|foot|footer|footnote|masthead|media|meta|outbrain|promo|'
+                               r'related|scroll|shoutbox|sidebar|sponsor|shopping|tags|tool|widget|share|social|'
+                               r'newsletter|subscribe|advert|banner|nav|menu', re.IGNORECASE)
+_CLASS_WEIGHT = 25
+
+# blocks of text shorter than this (in characters) don't count towards picking the content
+_MIN_BLOCK_LENGTH = 25
+# blocks of text that are more than this share links don't count either (ie. lists of related stories)
+_MAX_BLOCK_LINK_DENSITY = 0.5
+# how many of the best scoring containers to check the link density of before picking one
+_TOP_CANDIDATES = 5
+
+
+class DensityExtractor(ContentExtractor):
+    """
+    A much faster extractor that goes through the parsed page once, scoring each container by how much non-link text
+    is in the blocks of text right inside it, and picks the best one (along with any siblings that look like more of
+    the same article). Unlike readability, it never changes or re-parses the page.
+    """
+
+    name = 'density'
+
+    def extract(self, html_tree: lxml.html.HtmlElement) -> Tuple[str, str]:
+        body = html_tree.find('body')
+        root = body if body is not None else html_tree
+        scores = self._score_containers(root)
+        best = self._best_container(scores)
+        chosen = [root] if best is None else self._with_siblings(best, scores)
+        # copy what we picked, so we can take the boilerplate out without changing the page
+        content = lxml.html.Element('div')
+        for element in chosen:
+            element_copy = copy.deepcopy(element)
+            element_copy.tail = None
+            content.append(element_copy)
+        for element in list(content.iter(*_SKIP_TAGS)):
+            element.drop_tree()
+        return lxml.html.tostring(content, encoding='unicode'), text_content(content).strip()
+
+    def _score_containers(self, root: lxml.html.HtmlElement) -> Dict[lxml.html.HtmlElement, float]:
+        """Add up the score of every block of text into its parent, and half of it into its grandparent."""
+        scores = {}
+        for block in _text_blocks(root):
+            text_length, link_density = _text_and_link_density(block)
+            if (text_length < _MIN_BLOCK_LENGTH) or (link_density > _MAX_BLOCK_LINK_DENSITY):
+                continue
+            # like readability: a point for the block, one for each comma, and one per 100 characters (up to 3)
+            block_text = block.text_content()
+            block_score = 1 + block_text.count(',') + min(text_length // 100, 3)
+            parent = block.getparent()
+            for container, share in [(parent, 1), (None if parent is None else parent.getparent(), 0.5)]:
+                if (container is None) or not isinstance(container.tag, str):
+                    continue
+                if container not in scores:
+                    scores[container] = _class_weight(container) + (5 if container.tag == 'div' else 0)
+                scores[container] += block_score * share
+        return scores
+
+    def _best_container(self, scores: Dict[lxml.html.HtmlElement, float]) -> Optional[lxml.html.HtmlElement]:
+        """The best scoring container, once each of the top few is marked down by how much of its text is links."""
+        best, best_score = None, None
+        for container in sorted(scores, key=scores.get, reverse=True)[:_TOP_CANDIDATES]:
+            score = scores[container] * (1 - _text_and_link_density(container)[1])
+            if (best_score is None) or (score > best_score):
+                best, best_score = container, score
+        return best
+
+    def _with_siblings(self, best: lxml.html.HtmlElement,
+                       scores: Dict[lxml.html.HtmlElement, float]) -> List[lxml.html.HtmlElement]:
+        """The best container, plus any siblings that score well or are paragraphs of text."""
+        parent = best.getparent()
+        if parent is None:
+            return [best]
+        threshold = max(10, scores[best] * 0.2)
+        chosen = []
+        for sibling in parent:
+            if sibling is best:
+                chosen.append(sibling)
+            elif isinstance(sibling.tag, str) and (sibling.tag not in _SKIP_TAGS):
+                if scores.get(sibling, 0) >= threshold:
+                    chosen.append(sibling)
+                elif sibling.tag == 'p':
+                    text_length, link_density = _text_and_link_density(sibling)
+                    if (text_length > 80 and link_density < 0.25) or \
+                            (0 < text_length <= 80 and link_density == 0 and '.' in sibling.text_content()):
+                        chosen.append(sibling)
+        return chosen
+
+
+def _text_blocks(root: lxml.html.HtmlElement):
+    """Every paragraph-like block of text in a page, skipping anything inside tags that are never content."""
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        if not isinstance(element.tag, str) or (element.tag in _SKIP_TAGS):
+            continue  # a comment, or something that can't be content
+        if (element.tag in _TEXT_BLOCK_TAGS) or \
+                ((element.tag == 'div') and not any(child.tag in _BLOCK_TAGS for child in element)):
+            yield element
+        stack.extend(reversed(element))
+
+
+def _text_and_link_density(element: lxml.html.HtmlElement) -> Tuple[int, float]:
+    """How long the text in an element is (ignoring spaces at the ends), and the share of that inside links."""
+    text_length = len(element.text_content().strip())
+    if text_length == 0:
+        return 0, 0.0
+    link_length = sum([len(link.text_content()) for link in element.iter('a')])
+    return text_length, min(link_length / text_length, 1.0)
+
+
+def _class_weight(element: lxml.html.HtmlElement) -> int:
+    weight = 0
+    for name in (element.get('class'), element.get('id')):
+        if name:
+            if _NEGATIVE_PATTERN.search(name):
+                weight -= _CLASS_WEIGHT
+            if _POSITIVE_PATTERN.search(name):
+                weight += _CLASS_WEIGHT
+    return weight
+
+
+# the extractors you can pick by name (ie. on the command line)
+EXTRACTORS = {
+    ReadabilityExtractor.name: ReadabilityExtractor,
+    DensityExtractor.name: DensityExtractor,
+}
+
+
+def get_extractor(extractor: Union[str, ContentExtractor, None]) -> ContentExtractor:
+    """
+    :param extractor: the name of one of the `EXTRACTORS`, a `ContentExtractor`, or `None` for the default (readability)
+    """
+    if extractor is None:
+        return _default_extractor
+    if isinstance(extractor, ContentExtractor):
+        return extractor
+    if extractor not in EXTRACTORS:
+        raise ValueError("Unknown extractor {!r} (try one of: {})".format(extractor, ", ".join(EXTRACTORS)))
+    return EXTRACTORS[extractor]()
+
+
+_default_extractor = ReadabilityExtractor()
@@ -0,0 +1,153 @@
+"""
+Download lots of articles at once with asyncio, reusing connections, and hand them off to be parsed. This needs the
+optional `aiohttp` dependency (`pip install tweetfinder[async]`).
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Iterable, AsyncIterator, Tuple, Dict, Optional
+
+import aiohttp
+
+from .article import DEFAULT_TIMEOUT
+from .batch import process_one
+
+logger = logging.getLogger(__name__)
+
+# the most downloads to run at once in total, and to any one server
+DEFAULT_CONCURRENCY = 64
+DEFAULT_PER_HOST_CONCURRENCY = 4
+
+# how many times to try again if a download fails in a way that might work next time, and how long to wait before
+# the first retry (this doubles each time)
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_SECS = 0.5
+
+# server responses that are worth trying again
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class Fetcher:
+    """
+    A pool of connections to download webpages with. Use it as an async context manager:
+    ```
+    async with Fetcher() as fetcher:
+        html, encoding = await fetcher.fetch(url)
+    ```
+    """
+
+    def __init__(self, timeout: int = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 per_host_concurrency: int = DEFAULT_PER_HOST_CONCURRENCY, retries: int = DEFAULT_RETRIES,
+                 backoff_secs: float = DEFAULT_BACKOFF_SECS):
+        """
+        :param timeout: how long to wait for the server to connect, and then to send more data, before giving up. The
+        default value is `DEFAULT_TIMEOUT` (5 seconds), the same as an `Article` would use.
+        :param concurrency: the most downloads to run at once in total
+        :param per_host_concurrency: the most downloads to run at once from any one server
+        :param retries: how many times to try again after a connection error, timeout, or a server error response
+        :param backoff_secs: how long to wait before the first retry (this doubles each time)
+        """
+        self._timeout = timeout or DEFAULT_TIMEOUT
+        self.concurrency = concurrency
+        self._per_host_concurrency = per_host_concurrency
+        self._retries = retries
+        self._backoff_secs = backoff_secs
+        self._session = None
+
+    async def __aenter__(self) -> 'Fetcher':
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self._per_host_concurrency,
+                                         ttl_dns_cache=300)
+        # like `requests`, the timeout is for connecting and then for each read, not for the whole download
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self._timeout, sock_read=self._timeout)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def fetch(self, url: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Download one webpage. Like `Article` does, we return the content even if the server responds with an error
+        status (after retrying ones that might work next time).
+        :param url: the webpage to download
+        :return: the raw bytes of the webpage, and the character encoding from the HTTP headers (or `None` if the
+        server didn't say, so `Article` can use the one declared in the HTML)
+        """
+        for attempt in range(self._retries + 1):
+            last_attempt = attempt == self._retries
+            try:
+                async with self._session.get(url) as response:
+                    if (response.status not in RETRY_STATUSES) or last_attempt:
+                        return await response.read(), response.charset
+                    logger.debug("Got {} from {}, will retry".format(response.status, url))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    raise
+                logger.debug("Failed to fetch {} ({}), will retry".format(url, e))
+            await asyncio.sleep(self._backoff_secs * (2 ** attempt))
+
+    async def fetch_many(self, urls: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[bytes], Optional[str],
+                                                                           Optional[str]]]:
+        """
+        Download lots of webpages at once, yielding each one as soon as it is ready.
+        :param urls: the webpages to download. These are pulled from the iterable as downloads finish, so it can be a
+        generator over a huge list.
+        :return: a tuple of `(url, html, encoding, error)` for each one, with the raw bytes and encoding like `fetch`
+        returns. If the download failed `html` is `None` and `error` says why.
+        """
+        async def fetch_one(url: str) -> Tuple[str, Optional[bytes], Optional[str], Optional[str]]:
+            try:
+                html, encoding = await self.fetch(url)
+                return url, html, encoding, None
+            except Exception as e:
+                return url, None, None, "{}: {}".format(type(e).__name__, e)
+        url_iter = iter(urls)
+        in_flight = set()
+        while True:
+            # keep the connection pool full, without making a task for every url up front
+            for url in url_iter:
+                in_flight.add(asyncio.ensure_future(fetch_one(url)))
+                if len(in_flight) >= self.concurrency:
+                    break
+            if not in_flight:
+                return
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+
+def _process_fetched(url: str, html: bytes, encoding: Optional[str], article_kwargs: Dict) -> Dict:
+    result = process_one(dict(url=url, html=html, encoding=encoding), **article_kwargs)
+    result['url'] = url
+    return result
+
+
+async def fetch_and_process(urls: Iterable[str], executor: Executor = None, fetcher: Fetcher = None,
+                            **article_kwargs) -> AsyncIterator[Dict]:
+    """
+    Download lots of articles and parse each one as soon as it arrives.
+    :param urls: the articles to download
+    :param executor: where to parse the articles, so parsing doesn't hold up the downloads. Pass in a
+    `ProcessPoolExecutor` to use more than one CPU. The default is the event loop's default thread pool.
+    :param fetcher: a `Fetcher` to download with, if you want to customize the concurrency or retries
+    :param article_kwargs: any other arguments to pass to every `Article` (ie. `mentions_list`)
+    :return: a dict for each article like `process_many` returns, plus the `url`, in the order they finish
+    """
+    loop = asyncio.get_running_loop()
+    fetcher = fetcher or Fetcher(timeout=article_kwargs.get('timeout'))
+    async with fetcher:
+        parsing = set()
+        async for url, html, encoding, error in fetcher.fetch_many(urls):
+            if error is not None:
+                yield dict(url=url, embeds=None, mentions=None, language=None, error=error)
+                continue
+            parsing.add(loop.run_in_executor(executor, _process_fetched, url, html, encoding, article_kwargs))
+            # hand back whatever has been parsed, and wait for parsing to catch up if it is falling behind
+            done, parsing = await asyncio.wait(parsing, timeout=0 if len(parsing) < fetcher.concurrency else None,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        for future in asyncio.as_completed(parsing):
+            yield await future
@@ -0,0 +1,326 @@
+"""
+A persistent index from tweet ids to the articles that embedded them, so questions like "which articles embedded this
+tweet?" or "which tweets did this outlet embed last month?" don't mean processing the whole corpus again.
+
+An index is a directory. Articles are numbered in the order they are added, and what you tell us about each one (ie.
+its `url`, `outlet` and `published` date) is kept as a line of `articles.jsonl`. The tweets are written in segments,
+each a sub-directory of numpy `.npy` files that are memory-mapped when the index is opened, so nothing is read until a
+lookup touches it:
+* `tweet_ids`: every tweet id embedded in the segment's articles, as sorted 64-bit integers
+* `offsets` and `postings`: the article numbers for `tweet_ids[i]` are `postings[offsets[i]:offsets[i + 1]]`
+* `article_offsets` and `article_tweets`: the same the other way around, for the segment's range of articles
+Adding articles writes a new segment, and `merge` combines them all into one. `index.json` lists the segments, and is
+only replaced once everything it points to has been written, so a crash never leaves a half-written index behind.
+"""
+
+import os
+import json
+import shutil
+import logging
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+if TYPE_CHECKING:  # numpy is only imported once an index is opened
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# how many articles to collect in memory before writing them out as a new segment
+DEFAULT_SEGMENT_SIZE = 100000
+
+_MANIFEST_FILENAME = "index.json"
+_ARTICLES_FILENAME = "articles.jsonl"
+_MAX_TWEET_NUMBER = 1 << 64
+_SEGMENT_ARRAYS = ('tweet_ids', 'offsets', 'postings', 'article_offsets', 'article_tweets')
+
+
+def _tweet_number(tweet_id: Union[str, int, None]) -> Optional[int]:
+    """A tweet id as an integer, or `None` if it isn't one (ie. an embed we couldn't find the id of)."""
+    if isinstance(tweet_id, str) and tweet_id.isdigit():
+        tweet_id = int(tweet_id)
+    if isinstance(tweet_id, int) and (0 <= tweet_id < _MAX_TWEET_NUMBER):
+        return tweet_id
+    return None
+
+
+class _Segment:
+    """The memory-mapped arrays for one segment, which covers a range of article numbers."""
+
+    def __init__(self, path: str, first_article: int, article_count: int):
+        import numpy as np
+        self.path = path
+        self.first_article = first_article
+        self.article_count = article_count
+        for name in _SEGMENT_ARRAYS:
+            # a plain array view of the memory-mapped file is quicker to search than the memmap itself
+            setattr(self, name, np.asarray(np.load(os.path.join(path, name + '.npy'), mmap_mode='r')))
+
+    def articles_with(self, tweet_number: int) -> 'np.ndarray':
+        import numpy as np
+        position = int(np.searchsorted(self.tweet_ids, np.uint64(tweet_number)))
+        if (position == len(self.tweet_ids)) or (int(self.tweet_ids[position]) != tweet_number):
+            return self.postings[:0]
+        return self.postings[int(self.offsets[position]):int(self.offsets[position + 1])]
+
+    def tweets_in(self, article: int) -> 'np.ndarray':
+        row = article - self.first_article
+        return self.article_tweets[int(self.article_offsets[row]):int(self.article_offsets[row + 1])]
+
+    def pairs(self) -> 'Tuple[np.ndarray, np.ndarray]':
+        """Every (tweet id, article number) in the segment, as two arrays."""
+        import numpy as np
+        return np.repeat(self.tweet_ids, np.diff(self.offsets).astype(np.int64)), self.postings
+
+
+def _write_segment(path: str, tweet_numbers: 'np.ndarray', articles: 'np.ndarray', first_article: int,
+                   article_count: int) -> None:
+    """Sort the (tweet id, article number) pairs both ways and save them as a new segment."""
+    import numpy as np
+    order = np.lexsort((articles, tweet_numbers))
+    tweet_numbers, articles = tweet_numbers[order], articles[order]
+    # the same tweet can be added more than once for an article (ie. when merging), but only counts once
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (tweet_numbers[1:] != tweet_numbers[:-1]) | (articles[1:] != articles[:-1])
+    tweet_numbers, articles = tweet_numbers[keep], articles[keep]
+    tweet_ids, starts = np.unique(tweet_numbers, return_index=True)
+    by_article = np.lexsort((tweet_numbers, articles))
+    article_counts = np.bincount(articles - first_article, minlength=article_count)
+    arrays = dict(tweet_ids=tweet_ids,
+                  offsets=np.append(starts, len(tweet_numbers)).astype(np.uint64),
+                  postings=articles,
+                  article_offsets=np.concatenate([[0], np.cumsum(article_counts)]).astype(np.uint64),
+                  article_tweets=tweet_numbers[by_article])
+    # write everything off to the side, then move it into place all at once
+    temp_path = path + '.tmp'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+    for name in _SEGMENT_ARRAYS:
+        np.save(os.path.join(temp_path, name + '.npy'), arrays[name])
+    os.replace(temp_path, path)
+
+
+class TweetIndex:
+    """
+    Look up which articles embedded a tweet, and which tweets an article embedded, from an index on disk. Add the
+    results of processing articles with `add`, and they are written out as a new segment every `segment_size`
+    articles (or when you call `flush` or `close`). Only one process should add to an index at a time, but any number
+    can read it.
+    """
+
+    def __init__(self, path: str, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        """
+        :param path: the directory the index is in (it is created if it doesn't exist)
+        :param segment_size: how many articles to collect in memory before writing them out as a new segment
+        """
+        self.path = path
+        self.segment_size = segment_size
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, _MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self._manifest = json.load(f)
+        else:
+            self._manifest = dict(segments=[], article_count=0, articles_bytes=0, next_segment=0)
+        self._segments = [_Segment(os.path.join(path, segment['name']), segment['first_article'],
+                                   segment['article_count']) for segment in self._manifest['segments']]
+        self._articles = None  # the info about each article, read in the first time it is needed
+        self._pending_articles = []  # what we've been told about each article that hasn't been written yet
+        self._pending_tweets = []  # the tweet numbers of each of those articles
+
+    def __enter__(self) -> 'TweetIndex':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """How many articles are in the index."""
+        return self._manifest['article_count'] + len(self._pending_articles)
+
+    def __contains__(self, tweet_id: Union[str, int]) -> bool:
+        return len(self.articles_with_tweet(tweet_id)) > 0
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def add(self, embeds: Iterable[Mapping], **article_info) -> int:
+        """
+        Add an article and the tweets embedded in it.
+        :param embeds: the embedded tweets, ie. from `Article.list_embedded_tweets` or the `embeds` of a result from
+        `process_many`. Ones without a tweet id are left out.
+        :param article_info: anything you want to keep about the article, like its `url`, `outlet` and `published`
+        date (an ISO formatted string, ie. "2021-05-18", so `find_articles` can compare them). These have to be things
+        that can be saved as JSON.
+        :return: the article's number in the index
+        """
+        tweet_numbers = [_tweet_number(tweet.get('tweet_id')) for tweet in embeds or []]
+        self._pending_articles.append(article_info)
+        self._pending_tweets.append(sorted(set([number for number in tweet_numbers if number is not None])))
+        if len(self._pending_articles) >= self.segment_size:
+            self.flush()
+        return len(self) - 1
+
+    def flush(self) -> None:
+        """Write the articles added since the last flush out to disk, as a new segment."""
+        if not self._pending_articles:
+            return
+        import numpy as np
+        first_article = self._manifest['article_count']
+        tweet_numbers = np.array([number for numbers in self._pending_tweets for number in numbers], dtype=np.uint64)
+        articles = np.repeat(np.arange(first_article, first_article + len(self._pending_tweets), dtype=np.uint32),
+                             [len(numbers) for numbers in self._pending_tweets])
+        segment = self._write_segment(tweet_numbers, articles, first_article, len(self._pending_articles))
+        articles_bytes = self._append_articles(self._pending_articles)
+        if self._articles is not None:
+            self._articles += self._pending_articles
+        self._segments.append(segment)
+        self._manifest['article_count'] += len(self._pending_articles)
+        self._manifest['articles_bytes'] = articles_bytes
+        self._save_manifest()
+        self._pending_articles, self._pending_tweets = [], []
+
+    def close(self) -> None:
+        """Write out anything that hasn't been yet."""
+        self.flush()
+
+    def merge(self) -> None:
+        """Combine all the segments into one, so each lookup only has to search one set of arrays."""
+        self.flush()
+        if len(self._segments) <= 1:
+            return
+        import numpy as np
+        old_segments = self._segments
+        pairs = [segment.pairs() for segment in old_segments]
+        segment = self._write_segment(np.concatenate([tweets for tweets, _ in pairs]),
+                                      np.concatenate([articles for _, articles in pairs]), 0,
+                                      self._manifest['article_count'])
+        self._segments = [segment]
+        self._save_manifest()
+        del pairs, old_segments  # let go of the memory-mapped files, so they can be deleted
+        self._remove_unused_segments()
+
+    def add_index(self, other: 'TweetIndex') -> None:
+        """
+        Add every article in another index (ie. one built from another part of the corpus at the same time) to this
+        one, after the ones already in this one. They become a single new segment.
+        """
+        import numpy as np
+        self.flush()
+        other.flush()
+        first_article = self._manifest['article_count']
+        pairs = [segment.pairs() for segment in other._segments]
+        tweet_numbers = np.concatenate([np.empty(0, dtype=np.uint64)] + [tweets for tweets, _ in pairs])
+        articles = np.concatenate([np.empty(0, dtype=np.uint32)] + [articles for _, articles in pairs])
+        segment = self._write_segment(tweet_numbers, (articles + first_article).astype(np.uint32), first_article,
+                                      len(other))
+        articles_bytes = self._append_articles(other.articles())
+        if self._articles is not None:
+            self._articles += other.articles()
+        self._segments.append(segment)
+        self._manifest['article_count'] += len(other)
+        self._manifest['articles_bytes'] = articles_bytes
+        self._save_manifest()
+
+    def articles_with_tweet(self, tweet_id: Union[str, int]) -> List[int]:
+        """The numbers of the articles that embedded a tweet, in the order they were added."""
+        tweet_number = _tweet_number(tweet_id)
+        if tweet_number is None:
+            return []
+        articles = []
+        for segment in self._segments:
+            articles += segment.articles_with(tweet_number).tolist()
+        first_pending = self._manifest['article_count']
+        articles += [first_pending + row for row, numbers in enumerate(self._pending_tweets) if tweet_number in numbers]
+        return articles
+
+    def tweets_in_article(self, article: int) -> List[str]:
+        """The ids of the tweets an article embedded (in order of their ids, not where they were on the page)."""
+        if article >= self._manifest['article_count']:
+            return [str(number) for number in self._pending_tweets[article - self._manifest['article_count']]]
+        segment_index = bisect_right([segment.first_article for segment in self._segments], article) - 1
+        return [str(number) for number in self._segments[segment_index].tweets_in(article).tolist()]
+
+    def article(self, article: int) -> Dict:
+        """What you told us about an article when you added it."""
+        saved_articles = self._saved_articles()
+        if article < len(saved_articles):
+            return saved_articles[article]
+        return self._pending_articles[article - len(saved_articles)]
+
+    def articles(self) -> List[Dict]:
+        """What you told us about every article, in the order they were added."""
+        return self._saved_articles() + self._pending_articles
+
+    def _saved_articles(self) -> List[Dict]:
+        if self._articles is None:
+            self._articles = []
+            if self._manifest['articles_bytes'] > 0:
+                with open(os.path.join(self.path, _ARTICLES_FILENAME), 'rb') as f:
+                    # anything after the size we saved was written by a flush that didn't finish, so isn't included
+                    for line in f.read(self._manifest['articles_bytes']).splitlines():
+                        self._articles.append(json.loads(line))
+        return self._articles
+
+    def find_articles(self, outlet: str = None, since: str = None, until: str = None) -> List[int]:
+        """
+        The numbers of the articles from an outlet, or published in a range of dates.
+        :param outlet: only articles with this `outlet`
+        :param since: only articles `published` on or after this (ie. "2021-05-01")
+        :param until: only articles `published` before this (ie. "2021-06-01")
+        """
+        matches = []
+        for article, info in enumerate(self.articles()):
+            published = info.get('published')
+            if (outlet is not None) and (info.get('outlet') != outlet):
+                continue
+            if (since is not None) and ((published is None) or (published < since)):
+                continue
+            if (until is not None) and ((published is None) or (published >= until)):
+                continue
+            matches.append(article)
+        return matches
+
+    def tweets_in_articles(self, articles: Iterable[int]) -> List[str]:
+        """The ids of every tweet embedded in any of these articles, each listed once (in order of their ids)."""
+        tweet_numbers = set()
+        for article in articles:
+            tweet_numbers.update(self.tweets_in_article(article))
+        return sorted(tweet_numbers, key=int)
+
+    def _write_segment(self, tweet_numbers: 'np.ndarray', articles: 'np.ndarray', first_article: int,
+                       article_count: int) -> _Segment:
+        # a flush that crashed before saving the manifest can have left a segment behind under the next name, so skip
+        # over any that are taken (they aren't in the manifest, so the next `merge` removes them)
+        while True:
+            name = "segment-{:06d}".format(self._manifest['next_segment'])
+            self._manifest['next_segment'] += 1
+            path = os.path.join(self.path, name)
+            if not os.path.exists(path):
+                break
+        _write_segment(path, tweet_numbers, articles, first_article, article_count)
+        return _Segment(path, first_article, article_count)
+
+    def _append_articles(self, articles: List[Dict]) -> int:
+        """Save the info about some articles, and return how big the file of them is now."""
+        with open(os.path.join(self.path, _ARTICLES_FILENAME), 'ab') as f:
+            # throw away anything written by a flush that didn't finish
+            f.truncate(self._manifest['articles_bytes'])
+            for info in articles:
+                f.write((json.dumps(info) + "\n").encode('utf-8'))
+            return f.tell()
+
+    def _save_manifest(self) -> None:
+        self._manifest['segments'] = [dict(name=os.path.basename(segment.path), first_article=segment.first_article,
+                                           article_count=segment.article_count) for segment in self._segments]
+        # write it to the side and then swap it in, so a crash can't leave a half-written manifest behind
+        temp_path = os.path.join(self.path, _MANIFEST_FILENAME + '.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(self._manifest, f)
+        os.replace(temp_path, os.path.join(self.path, _MANIFEST_FILENAME))
+
+    def _remove_unused_segments(self) -> None:
+        in_use = set([os.path.basename(segment.path) for segment in self._segments])
+        for name in os.listdir(self.path):
+            if name.startswith("segment-") and (name not in in_use):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
@@ -1,6 +1,10 @@
-import py3langid as langid
+# how much text to look at when guessing the language (more text barely changes the answer, but takes longer)
+SAMPLE_SIZE = 2000
 
 
-def detect_most_likely(text: str) -> str:
+def detect_most_likely(text: str, sample_size: int = None) -> str:
+    # imported here, because loading it (and numpy) takes a while and lots of uses never need to detect the language
+    import py3langid as langid
+    if sample_size is not None:
+        text = text[:sample_size]
     return langid.classify(text)[0]
-
@@ -0,0 +1,177 @@
+"""
+Find mentions of tweets in text by matching a list of phrases in a single pass.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Iterable, Optional, Pattern, Tuple, Union
+
+import ahocorasick
+
+from . import mentions
+from .results import Mention, MENTIONS_CONTEXT_WINDOW_SIZE
+
+# how many different compiled phrase lists to keep around for reuse
+MATCHER_CACHE_SIZE = 128
+
+
+class MentionMatcher:
+    """
+    A compiled set of mention phrases. Build this once from a list of phrases and then reuse it on as many texts as you
+    want - all the phrases are found with one pass over the text via an Aho-Corasick automaton, instead of searching the
+    text again for each phrase.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        """
+        :param phrases: the snippets that count as "mentions" of tweets. These are stripped and lowercased, and
+        duplicates are removed.
+        """
+        # make the list of mentions unique here as a safeguard, and also sort it for reproduceable results
+        self.phrases = sorted(set([term.strip().lower() for term in phrases]) - {''})
+        self._automaton = ahocorasick.Automaton()
+        for phrase_order, phrase in enumerate(self.phrases):
+            self._automaton.add_word(phrase, (phrase_order, phrase))
+        if len(self.phrases) > 0:
+            self._automaton.make_automaton()
+        self._stem_patterns = None  # compiled the first time `might_match` needs them
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def __reduce__(self):
+        # the compiled automaton is rebuilt from the phrases, which is much smaller to send to another process
+        return MentionMatcher, (self.phrases,)
+
+    def might_match(self, html: Union[str, bytes]) -> bool:
+        """
+        A quick check of the raw HTML of a webpage, without parsing it. If this is `False` none of the phrases can be in
+        the text of the page, so there's no need to extract the text and search it. This looks for a few short stems
+        that every phrase contains (ie. "tweet" and "twitter" for the built-in list), ignoring case.
+        :param html: the raw HTML, as bytes (in an ASCII-compatible encoding) or text
+        """
+        if len(self.phrases) == 0:
+            return False
+        if self._stem_patterns is None:
+            self._stem_patterns = _compile_stems(_covering_stems(self.phrases))
+        return _search_stems(self._stem_patterns, html)
+
+    def find_all(self, text: str) -> List[Mention]:
+        """
+        Find every occurrence of every phrase in the text, ignoring case.
+        :param text: the text to search
+        :return: A list with one `Mention` per occurrence, each with the `phrase`, some `context` via a window of text
+        around it, and the `content_start_index` into the text. Occurrences are sorted by phrase and then by position.
+        The same phrase never matches overlapping text twice.
+        """
+        if len(self.phrases) == 0:
+            return []
+        matches = []
+        # the phrases are lowercase, so search a lowercase copy of the text and cut the context out of the original
+        lowercase_text = _lower_same_length(text)
+        next_start_by_phrase = {}
+        # the automaton reports matches in order of where they end, which for any one phrase is also where they start
+        for end_index, (phrase_order, phrase) in self._automaton.iter(lowercase_text):
+            start_index = end_index - len(phrase) + 1
+            if start_index >= next_start_by_phrase.get(phrase_order, 0):
+                matches.append((phrase_order, start_index))
+                next_start_by_phrase[phrase_order] = start_index + len(phrase)
+        matches.sort()
+        return [Mention(self.phrases[phrase_order], start_index, text) for phrase_order, start_index in matches]
+
+
+def _covering_stems(phrases: List[str]) -> Optional[List[str]]:
+    """
+    Pick a few short stems so that every phrase has at least one of them inside one of its words. Stems are only made of
+    ASCII letters and digits, because those are written the same way in the raw HTML as in the text (unlike ie.
+    apostrophes, which are often entities). Returns `None` if some phrase doesn't have any such word.
+    """
+    words_by_phrase = [re.findall(r'[a-z0-9]+', phrase) for phrase in phrases]
+    if any(len(words) == 0 for words in words_by_phrase):
+        return None
+    candidates = sorted(set([word for words in words_by_phrase for word in words]))
+    stems = []
+    # greedily pick the word in the most phrases we haven't covered yet, preferring longer (rarer) ones in a tie
+    while len(words_by_phrase) > 0:
+        stem = max(candidates, key=lambda candidate: (sum([any(candidate in word for word in words)
+                                                           for words in words_by_phrase]), len(candidate)))
+        stems.append(stem)
+        words_by_phrase = [words for words in words_by_phrase if not any(stem in word for word in words)]
+    return stems
+
+
+def _compile_stems(stems: Optional[List[str]]) -> Tuple[Optional[Pattern], Optional[Pattern]]:
+    """Patterns that find any of the stems in text, and in bytes, ignoring case (`None` if there aren't any stems)."""
+    if stems is None:
+        return None, None
+    pattern = '|'.join([re.escape(stem) for stem in stems])
+    return re.compile(pattern, re.IGNORECASE), re.compile(pattern.encode('ascii'), re.IGNORECASE)
+
+
+def _search_stems(stem_patterns: Tuple[Optional[Pattern], Optional[Pattern]], html: Union[str, bytes]) -> bool:
+    text_pattern, bytes_pattern = stem_patterns
+    if text_pattern is None:
+        return True  # some phrase has no stem we can safely look for, so we have to check the text
+    pattern = text_pattern if isinstance(html, str) else bytes_pattern
+    return pattern.search(html) is not None
+
+
+_all_languages_stem_patterns = None
+
+
+def might_match_any_language(html: Union[str, bytes]) -> bool:
+    """
+    Like `MentionMatcher.might_match` for the built-in phrases of every language at once, for when we don't know what
+    language a page is in yet. This only looks for `mentions.ALL_LANGUAGES_STEMS`, so no phrases are read or compiled.
+    """
+    global _all_languages_stem_patterns
+    if _all_languages_stem_patterns is None:
+        _all_languages_stem_patterns = _compile_stems(mentions.ALL_LANGUAGES_STEMS)
+    return _search_stems(_all_languages_stem_patterns, html)
+
+
+def _lower_same_length(text: str) -> str:
+    """Lowercase text without changing where anything in it is (which `str.lower` can do for a few characters)."""
+    lowercase_text = text.lower()
+    if len(lowercase_text) != len(text):
+        lowercase_text = ''.join([c if len(c.lower()) != 1 else c.lower() for c in text])
+    return lowercase_text
+
+
+_default_matcher = None
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _compile(phrases: frozenset) -> MentionMatcher:
+    return MentionMatcher(phrases)
+
+
+def get_matcher(phrases: Union[Iterable[str], MentionMatcher] = None) -> MentionMatcher:
+    """
+    Return a compiled matcher for a list of phrases, reusing a cached one if we've already seen that list.
+    :param phrases: a list of mention phrases, or a `MentionMatcher` (which is returned as-is). The default is
+    `mentions.ALL`.
+    :return: a `MentionMatcher` you can share across as many Articles as you like
+    """
+    global _default_matcher
+    if isinstance(phrases, MentionMatcher):
+        return phrases
+    if phrases is None:
+        if _default_matcher is None:
+            _default_matcher = MentionMatcher(mentions.ALL)
+        return _default_matcher
+    return _compile(frozenset(phrases))
+
+
+@lru_cache(maxsize=None)
+def get_language_matcher(language: str) -> Optional[MentionMatcher]:
+    """
+    Return the compiled matcher for the built-in phrases in one language (see `mentions.for_language`). Each one is only
+    loaded and compiled the first time an article in that language needs it.
+    :param language: a two-letter language code (ie. "es")
+    :return: a `MentionMatcher`, or `None` if we can't find mentions in that language
+    """
+    if language == 'en':
+        return get_matcher()
+    phrases = mentions.for_language(language)
+    return None if phrases is None else MentionMatcher(phrases)
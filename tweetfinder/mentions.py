@@ -1,8 +1,11 @@
 """
 Provide various sets of snippets that count as "mentions" of tweets in text. These are ones created from our work,
-and also sourced from other academic paper authors (as linked to below).
+and also sourced from other academic paper authors (as linked to below). Use `for_language` to get the ones for articles
+in a specific language.
 """
 import os
+import sys
+from typing import List, Optional
 
 module_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -10,11 +13,51 @@ module_dir = os.path.dirname(os.path.abspath(__file__))
 BASIC = ['tweeted', 'to twitter', 'tweets', 'tweeting', 'retweet', 'in a tweet', 'to tweet', 'tweet from',
          'wrote on twitter', 'said on twitter', 'from a tweet']
 
-# twitter phrases from https://arxiv.org/abs/1810.13078
-with open(os.path.join(module_dir, "data", "twitter-patterns-rony-2018.txt"), "r") as rony_2018_file:
-    RONY_2018 = rony_2018_file.readlines()
-
 # twitter phrases from https://www.tandfonline.com/doi/full/10.1080/1369118X.2021.1874037
 MOLYNEUX_2020 = ['retweet', 'according to a tweet']
 
-ALL = set(BASIC + RONY_2018 + MOLYNEUX_2020)
+
+# the phrases to search for in articles in each language we can find mentions in (the rest are loaded from data
+# files, and only the first time an article in that language needs them)
+LANGUAGES = {'en': 'ALL', 'es': 'SPANISH', 'de': 'GERMAN', 'fr': 'FRENCH', 'pt': 'PORTUGUESE'}
+
+# short stems that every built-in phrase in every language has in it (ie. "tuit" in "tuiteó"), so the prefilter can
+# rule out a page before we know its language without reading every language's phrases (test_matcher checks this)
+ALL_LANGUAGES_STEMS = ['twitter', 'tweet', 'tuit', 'gazouillis']
+
+_DATA_FILES = {
+    'RONY_2018': "twitter-patterns-rony-2018.txt",  # twitter phrases from https://arxiv.org/abs/1810.13078
+    'SPANISH': "mentions-es.txt",
+    'GERMAN': "mentions-de.txt",
+    'FRENCH': "mentions-fr.txt",
+    'PORTUGUESE': "mentions-pt.txt",
+}
+
+
+def _load_data_file(filename: str) -> List[str]:
+    with open(os.path.join(module_dir, "data", filename), "r", encoding="utf-8") as phrases_file:
+        # lines starting with # say where the phrases came from, and aren't phrases
+        return [line for line in phrases_file.readlines() if not line.startswith('#')]
+
+
+def for_language(language: str) -> Optional[List[str]]:
+    """
+    The phrases that count as mentions of tweets in articles written in one language.
+    :param language: a two-letter language code (ie. "es")
+    :return: the phrases, or `None` if we don't have any for that language
+    """
+    if language not in LANGUAGES:
+        return None
+    return getattr(sys.modules[__name__], LANGUAGES[language])
+
+
+def __getattr__(name: str):
+    # the lists that live in data files are only read the first time someone asks for them, not at import time
+    if name in _DATA_FILES:
+        value = _load_data_file(_DATA_FILES[name])
+    elif name == 'ALL':
+        value = set(BASIC + __getattr__('RONY_2018') + MOLYNEUX_2020)
+    else:
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+    globals()[name] = value
+    return value
@@ -0,0 +1,187 @@
+"""
+Compact records of what we found in articles. Each embedded tweet and mention is a small slotted object that still
+works like the dict it used to be, and a whole batch of results can be packed into columns of numpy arrays for export.
+"""
+
+from array import array
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator
+
+if TYPE_CHECKING:  # numpy is only imported once you make a `ColumnarResults`
+    import numpy as np
+
+# when we find a mention, we include this many characters of context before and after it
+MENTIONS_CONTEXT_WINDOW_SIZE = 100
+
+
+class EmbeddedTweet(Mapping):
+    """
+    One tweet embedded on a webpage. This works like a read-only dict with the `tweet_id`, `html_source` and (if it was
+    embedded the official way) `username` and `full_url`.
+    """
+
+    __slots__ = ('tweet_id', 'username', 'full_url', 'html_source')
+    _KEYS = __slots__
+
+    def __init__(self, tweet_id: str, html_source: str, username: str = None, full_url: str = None):
+        self.tweet_id = tweet_id
+        self.username = username
+        self.full_url = full_url
+        self.html_source = html_source
+
+    def __getitem__(self, key: str):
+        if key in self._KEYS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._KEYS if getattr(self, key) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return "EmbeddedTweet({})".format(", ".join(["{}={!r}".format(key, value) for key, value in self.items()]))
+
+
+class Mention(Mapping):
+    """
+    One mention of a tweet in the text of an article. This works like a read-only dict with the `phrase`, some
+    `context` via a window of text around it, and the `content_start_index` into the text. Only the offset is stored -
+    the context is cut out of the text each time you ask for it, so lots of mentions don't each keep a copy.
+    """
+
+    __slots__ = ('phrase', 'content_start_index', '_text')
+    _KEYS = ('phrase', 'context', 'content_start_index')
+
+    def __init__(self, phrase: str, content_start_index: int, text: str):
+        """
+        :param phrase: the phrase that was found
+        :param content_start_index: where it starts in the text
+        :param text: the text it was found in (shared by every mention in the same text)
+        """
+        self.phrase = phrase
+        self.content_start_index = content_start_index
+        self._text = text
+
+    @property
+    def context(self) -> str:
+        context_start = max(0, self.content_start_index - MENTIONS_CONTEXT_WINDOW_SIZE)
+        context_end = self.content_start_index + len(self.phrase) + MENTIONS_CONTEXT_WINDOW_SIZE
+        return self._text[context_start:context_end]
+
+    def __getitem__(self, key: str):
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __reduce__(self):
+        # send just the context along, instead of the whole text, when pickling
+        context_start = max(0, self.content_start_index - MENTIONS_CONTEXT_WINDOW_SIZE)
+        return _unpickle_mention, (self.phrase, self.content_start_index, context_start, self.context)
+
+    def __repr__(self) -> str:
+        return "Mention(phrase={!r}, content_start_index={})".format(self.phrase, self.content_start_index)
+
+
+def _unpickle_mention(phrase: str, content_start_index: int, context_start: int, context: str) -> Mention:
+    # pad the front of the text, so the offset (and so the context) is the same as in the original text
+    return Mention(phrase, content_start_index, _OffsetText(context_start, context))
+
+
+class _OffsetText:
+    """Part of a longer text, which can be sliced with offsets into the whole thing."""
+
+    __slots__ = ('start', 'text')
+
+    def __init__(self, start: int, text: str):
+        self.start = start
+        self.text = text
+
+    def __getitem__(self, key: slice) -> str:
+        return self.text[max(0, key.start - self.start):max(0, key.stop - self.start)]
+
+
+class ColumnarResults:
+    """
+    The results for a batch of articles (ie. from `process_many`), packed into columns of numpy arrays. This takes much
+    less memory than keeping lists of dicts around, and is easy to export (ie. to a pandas DataFrame or an `.npz` file).
+    There are three tables, each a dict from column name to array:
+    * `articles`: `index`, `language`, `embed_count`, `mention_count` (-1 if the language isn't supported) and `error`
+    * `embeds`: `article` (the row in `articles`), `tweet_id`, `username` and `html_source`
+    * `mentions`: `article` (the row in `articles`), `phrase` and `content_start_index`
+    """
+
+    TABLES = ('articles', 'embeds', 'mentions')
+
+    def __init__(self, articles: Dict[str, 'np.ndarray'], embeds: Dict[str, 'np.ndarray'],
+                 mentions: Dict[str, 'np.ndarray']):
+        self.articles = articles
+        self.embeds = embeds
+        self.mentions = mentions
+
+    def __len__(self) -> int:
+        return len(self.articles['index'])
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict]) -> 'ColumnarResults':
+        """
+        Pack results into columns as they stream in, so the whole list of dicts never has to be in memory at once.
+        :param results: dicts from `process_many`, `process_one` or `fetch_and_process`
+        """
+        articles = dict(index=array('q'), language=[], embed_count=array('i'), mention_count=array('i'), error=[])
+        embeds = dict(article=array('q'), tweet_id=[], username=[], html_source=[])
+        mentions = dict(article=array('q'), phrase=[], content_start_index=array('q'))
+        for row, result in enumerate(results):
+            articles['index'].append(result.get('index', row))
+            articles['language'].append(result['language'] or '')
+            articles['embed_count'].append(len(result['embeds'] or []))
+            articles['mention_count'].append(-1 if result['mentions'] is None else len(result['mentions']))
+            articles['error'].append(result['error'] or '')
+            for tweet in result['embeds'] or []:
+                embeds['article'].append(row)
+                embeds['tweet_id'].append(tweet['tweet_id'] or '')
+                embeds['username'].append(tweet.get('username') or '')
+                embeds['html_source'].append(tweet['html_source'])
+            for mention in result['mentions'] or []:
+                mentions['article'].append(row)
+                mentions['phrase'].append(mention['phrase'])
+                mentions['content_start_index'].append(mention['content_start_index'])
+        return cls(*[{name: _to_array(values) for name, values in table.items()}
+                     for table in (articles, embeds, mentions)])
+
+    def to_dict(self) -> Dict[str, 'np.ndarray']:
+        """All the columns, named like `embeds.tweet_id`."""
+        return {"{}.{}".format(table, name): values for table in self.TABLES
+                for name, values in getattr(self, table).items()}
+
+    def save(self, path: str) -> None:
+        """Save all the columns to a compressed numpy `.npz` file."""
+        import numpy as np
+        np.savez_compressed(path, **self.to_dict())
+
+    @classmethod
+    def load(cls, path: str) -> 'ColumnarResults':
+        """Load columns saved earlier with `save`."""
+        import numpy as np
+        tables = {table: {} for table in cls.TABLES}
+        with np.load(path) as columns:
+            for key in columns.files:
+                table, name = key.split('.', 1)
+                tables[table][name] = columns[key]
+        return cls(**tables)
+
+
+def _to_array(values) -> 'np.ndarray':
+    import numpy as np
+    if isinstance(values, array):
+        return np.frombuffer(values, dtype=values.typecode).copy()
+    return np.array(values, dtype=str)
@@ -0,0 +1,89 @@
+"""
+Optional instrumentation, to see how long each stage of processing articles takes. Nothing is recorded unless you pass
+a stats object to `Article`, or set a default one here.
+"""
+
+import threading
+from typing import Dict, List
+
+# the stages of processing an article that we record, in the order they run
+STAGES = ['download', 'prefilter', 'parse', 'embeds', 'extract', 'language', 'mentions']
+
+
+class StageStats:
+    """
+    Adds up how many times each stage ran, how long it took, how much input it worked on, and how many results it
+    produced. Any object with a `record` method like this one's can be used instead (ie. to send each measurement
+    straight to your own metrics system).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage: str, secs: float, input_size: int = 0, output_count: int = 0) -> None:
+        """
+        Record one run of a stage.
+        :param stage: the name of the stage (one of `STAGES`)
+        :param secs: how long it took (wall time)
+        :param input_size: how much it worked on (ie. characters of HTML)
+        :param output_count: how many results it produced (ie. embedded tweets found)
+        """
+        with self._lock:
+            totals = self._stages.get(stage)
+            if totals is None:
+                totals = self._stages[stage] = dict(count=0, secs=0.0, max_secs=0.0, input_size=0, output_count=0)
+            totals['count'] += 1
+            totals['secs'] += secs
+            totals['max_secs'] = max(totals['max_secs'], secs)
+            totals['input_size'] += input_size
+            totals['output_count'] += output_count
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages = {}
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """
+        :return: the totals for each stage that has run, keyed by stage name. Each has the `count` of runs, total
+        `secs`, slowest run `max_secs`, total `input_size` and total `output_count`.
+        """
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._stages.items()}
+
+    def to_prometheus(self, prefix: str = 'tweetfinder') -> str:
+        """
+        :param prefix: what to start each metric name with
+        :return: the totals in the Prometheus text exposition format, ready to serve from a `/metrics` endpoint
+        """
+        metrics = [
+            ('stage_runs_total', 'counter', 'count', "Times each stage of processing an article ran"),
+            ('stage_seconds_total', 'counter', 'secs', "Total wall time spent in each stage"),
+            ('stage_max_seconds', 'gauge', 'max_secs', "Slowest single run of each stage"),
+            ('stage_input_size_total', 'counter', 'input_size', "Total size of the input to each stage"),
+            ('stage_output_count_total', 'counter', 'output_count', "Total results produced by each stage"),
+        ]
+        totals_by_stage = self.to_dict()
+        lines: List[str] = []
+        for name, metric_type, key, description in metrics:
+            lines.append("# HELP {}_{} {}".format(prefix, name, description))
+            lines.append("# TYPE {}_{} {}".format(prefix, name, metric_type))
+            for stage, totals in totals_by_stage.items():
+                lines.append('{}_{}{{stage="{}"}} {}'.format(prefix, name, stage, totals[key]))
+        return "\n".join(lines) + "\n"
+
+
+_default_stats = None
+
+
+def set_default_stats(stats) -> None:
+    """
+    Record stats for every Article that isn't passed its own stats object. Pass in `None` to turn this off again.
+    Stats are only recorded in this process, so they don't include articles handled by `process_many` worker processes.
+    """
+    global _default_stats
+    _default_stats = stats
+
+
+def get_default_stats():
+    return _default_stats
@@ -0,0 +1,71 @@
+"""
+Find tweets embedded in very large webpages (ie. live blogs that are many megabytes) without ever holding the whole
+page in memory. The raw HTML is fed to the parser a chunk at a time as it downloads or is read from disk, and nothing
+is kept from it except the tweets found, so memory use depends on the chunk size rather than the size of the page.
+Finding mentions needs the whole content of the page, so use `Article` for that.
+"""
+
+import logging
+from typing import Iterable, List, Union, BinaryIO
+
+from lxml import etree
+
+from . import charsets
+from .article import DEFAULT_TIMEOUT
+from .embeds import _EmbedScanner
+from .results import EmbeddedTweet
+
+logger = logging.getLogger(__name__)
+
+# how many bytes of HTML to read and parse at a time
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def scan_embeds_stream(chunks: Iterable[bytes], encoding: str = None) -> List[EmbeddedTweet]:
+    """
+    Find embedded tweets in HTML that arrives a chunk at a time.
+    :param chunks: the raw bytes of the webpage, in order
+    :param encoding: the character encoding, if you know it (ie. from the HTTP headers). The default is to use the one
+    declared near the start of the HTML, or utf-8 if there isn't one.
+    :return: a list of info about each tweet embedded (the same as `Article.list_embedded_tweets`)
+    """
+    chunks = iter(chunks)
+    # hold on to just enough of the start of the page to see how it is encoded
+    start = b''
+    for chunk in chunks:
+        start += chunk
+        if len(start) >= charsets.META_CHARSET_SEARCH_BYTES:
+            break
+    parser = etree.HTMLParser(target=_EmbedScanner(), encoding=charsets.guess_encoding(start, encoding))
+    parser.feed(start)
+    del start
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def embeds_from_file(file: Union[str, BinaryIO], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     encoding: str = None) -> List[EmbeddedTweet]:
+    """
+    Find embedded tweets in a saved webpage, reading it a chunk at a time.
+    :param file: the path to the HTML file, or a file opened in binary mode
+    :param chunk_size: how many bytes to read at a time
+    :param encoding: the character encoding, if you know it
+    """
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            return embeds_from_file(f, chunk_size, encoding)
+    return scan_embeds_stream(iter(lambda: file.read(chunk_size), b''), encoding)
+
+
+def embeds_from_url(url: str, timeout: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[EmbeddedTweet]:
+    """
+    Find embedded tweets in a webpage, parsing it a chunk at a time as it downloads.
+    :param url: the webpage to download
+    :param timeout: how long to wait for the server to respond. The default value is `DEFAULT_TIMEOUT` (5 seconds).
+    :param chunk_size: how many bytes to download at a time
+    """
+    import requests  # only needed if we download anything, and slow to import
+    with requests.get(url, timeout=timeout or DEFAULT_TIMEOUT, stream=True) as r:
+        encoding = r.encoding if 'charset' in r.headers.get('content-type', '').lower() else None
+        return scan_embeds_stream(r.iter_content(chunk_size), encoding)
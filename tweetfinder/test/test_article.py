@@ -2,6 +2,7 @@ import os
 from unittest import TestCase
 import logging
 import time
+from unittest import mock
 from goose3 import Goose
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -100,7 +101,7 @@ class TestMentionedTweets(TestCase):
         assert len(mentions) == 2
         print("!!!!"+mentions[0]['phrase'])
         assert mentions[0]['phrase'] == "from a tweet"
-        assert "virtually with friends I made from a tweet".lower() in mentions[0]['context']
+        assert "virtually with friends I made from a tweet" in mentions[0]['context']
         assert mentions[1]['phrase'] == "tweeted"
         assert "randomly tweeted something" in mentions[1]['context']
 
@@ -109,12 +110,93 @@ class TestMentionedTweets(TestCase):
         article = Article("https://www.theguardian.com/film/2020/jan/01/the-most-exciting-movies-of-2020-horror")
         assert article.mentions_tweets() is False
 
+    def testEmptyListMeansDefault(self):
+        html = _load_fixture("guardian.html", False)
+        default_mentions = Article(html=html).list_mentioned_tweets()
+        assert len(default_mentions) == 2
+        assert Article(html=html, mentions_list=[]).list_mentioned_tweets() == default_mentions
+
     def testNoMentions(self):
         article = _load_fixture("npr.html")
         assert article.mentions_tweets() is False
         assert article.count_mentioned_tweets() == 0
 
 
+class TestLanguage(TestCase):
+    """
+    Test that we only search for mentions in supported languages
+    """
+
+    SPANISH_HTML = "<html><body><p>El presidente tuiteó que las elecciones serán el próximo domingo, y muchos " \
+                   "usuarios respondieron con tweets de apoyo durante toda la noche en todo el país.</p></body></html>"
+
+    ITALIAN_HTML = "<html><body><p>Il presidente ha twittato che le elezioni si terranno domenica prossima, e molti " \
+                   "utenti hanno risposto con dei tweet di sostegno per tutta la notte.</p></body></html>"
+
+    def testDetected(self):
+        article = _load_fixture("guardian.html")
+        assert article.get_language() == 'en'
+
+    def testOtherLanguage(self):
+        article = Article(html=self.SPANISH_HTML)
+        assert article.get_language() == 'es'
+        assert [m['phrase'] for m in article.list_mentioned_tweets()] == ['tuiteó']
+        assert Article(html=self.SPANISH_HTML, prefilter=True).count_mentioned_tweets() == 1
+        # a custom list is used whatever the language is
+        assert Article(html=self.SPANISH_HTML, mentions_list=['tweets']).count_mentioned_tweets() == 1
+
+    def testUnsupportedLanguage(self):
+        article = Article(html=self.ITALIAN_HTML)
+        assert article.get_language() == 'it'
+        assert article.list_mentioned_tweets() is None
+        assert article.count_mentioned_tweets() == 0
+        assert article.mentions_tweets() is False
+
+    def testKnownLanguage(self):
+        html = _load_fixture("guardian.html", False)
+        with mock.patch('tweetfinder.language.detect_most_likely') as detect_most_likely:
+            article = Article(html=html, language='en')
+            assert article.count_mentioned_tweets() == 2
+            detect_most_likely.assert_not_called()
+        article = Article(html=html, language='it')
+        assert article.get_language() == 'it'
+        assert article.list_mentioned_tweets() is None
+
+
+class TestLazyProcessing(TestCase):
+    """
+    Test that lazy articles only do the work needed for what you ask for
+    """
+
+    def testEmbedsOnly(self):
+        html = _load_fixture("time.html", False)
+        with mock.patch('readability.Document') as document, \
+                mock.patch('tweetfinder.language.detect_most_likely') as detect_most_likely:
+            article = Article(html=html, lazy=True)
+            assert article.count_embedded_tweets() == 11
+            assert article.list_embedded_tweets()[1]['tweet_id'] == "580932146874957824"
+            document.assert_not_called()
+            detect_most_likely.assert_not_called()
+
+    def testSameResults(self):
+        html = _load_fixture("guardian.html", False)
+        article = Article(html=html)
+        lazy_article = Article(html=html, lazy=True)
+        assert lazy_article.list_mentioned_tweets() == article.list_mentioned_tweets()
+        assert lazy_article.get_content() == article.get_content()
+        assert lazy_article.list_embedded_tweets() == article.list_embedded_tweets()
+
+    def testXmlDeclaration(self):
+        # lxml won't parse text that declares an encoding, so this has to work without a tree too
+        html = ('<?xml version="1.0" encoding="utf-8"?>\n<html><body><p>The mayor tweeted that the road would be '
+                'closed.</p><blockquote class="twitter-tweet"><a href="https://twitter.com/mayor/status/123">May 1'
+                '</a></blockquote></body></html>')
+        for lazy in [False, True]:
+            article = Article(html=html, lazy=lazy)
+            assert [t['tweet_id'] for t in article.list_embedded_tweets()] == ['123']
+            assert article.count_mentioned_tweets() == 1
+
+
 class TestParsing(TestCase):
     """
     Test basic parsing and fetching of webpages
@@ -139,6 +221,108 @@ class TestParsing(TestCase):
         assert html.startswith('<!doctype html>')
 
 
+class TestRawBytes(TestCase):
+    """
+    Test passing in, or downloading, raw HTML bytes and figuring out how they are encoded
+    """
+
+    def testSameAsText(self):
+        for filename in ["time.html", "guardian.html", "buzzfeed.html"]:
+            with open(os.path.join(fixtures_dir, filename), "rb") as f:
+                html = f.read()
+            article = Article(html=html)
+            text_article = Article(html=html.decode("utf-8"))
+            assert article.list_embedded_tweets() == text_article.list_embedded_tweets()
+            assert article.list_mentioned_tweets() == text_article.list_mentioned_tweets()
+            assert article.get_content() == text_article.get_content()
+
+    def testEncodings(self):
+        html = "<html><body><p>The café owner tweeted about it.</p></body></html>"
+        # no encoding declared anywhere, so it is read as utf-8
+        assert "café" in Article(html=html.encode("utf-8"), language='en').get_content()
+        # declared in the HTML
+        declared = html.replace("<html>", '<html><head><meta charset="iso-8859-1"></head>')
+        assert "café" in Article(html=declared.encode("latin-1"), language='en').get_content()
+        # passed in (ie. from the HTTP headers)
+        assert "café" in Article(html=html.encode("latin-1"), encoding="latin-1", language='en').get_content()
+        lazy_article = Article(html=html.encode("latin-1"), encoding="latin-1", language='en', lazy=True)
+        assert lazy_article.list_embedded_tweets() == []
+        assert "café" in lazy_article.get_content()
+        # an encoding we've never heard of
+        assert "café" in Article(html=html.encode("utf-8"), encoding="not-a-real-one", language='en').get_content()
+
+    def testDownloadKeepsCase(self):
+        html = '<html><body><blockquote class="twitter-tweet"><p>Hi</p>' \
+               '<a href="https://twitter.com/SomeOne/status/1234">March 1</a></blockquote>' \
+               '<p>She TWEETED that she loved this café.</p></body></html>'
+        response = mock.Mock(content=html.encode("latin-1"), headers={'content-type': 'text/html; charset=ISO-8859-1'},
+                             encoding='ISO-8859-1')
+        with mock.patch('requests.get', return_value=response):
+            article = Article(url="https://example.com/story", language='en')
+        tweet = article.list_embedded_tweets()[0]
+        assert tweet['username'] == 'SomeOne'
+        assert tweet['full_url'] == 'https://twitter.com/SomeOne/status/1234'
+        mention = article.list_mentioned_tweets()[0]
+        assert mention['phrase'] == 'tweeted'
+        assert 'She TWEETED that she loved this café.' in mention['context']
+
+
+class TestPrefilter(TestCase):
+    """
+    Test skipping articles that can't have any embeds or mentions without parsing them
+    """
+
+    def testSameResultsOnFixtures(self):
+        for filename in ["1987377089.html", "buzzfeed.html", "cnn.html", "guardian.html", "npr.html", "time.html"]:
+            html = _load_fixture(filename, return_article=False)
+            article = _load_fixture(filename)
+            for lazy in [False, True]:
+                for raw_html in [html, html.encode("utf-8")]:
+                    prefiltered = Article(html=raw_html, prefilter=True, lazy=lazy)
+                    assert prefiltered.list_embedded_tweets() == article.list_embedded_tweets()
+                    assert prefiltered.list_mentioned_tweets() == article.list_mentioned_tweets()
+
+    def testSkipsNegative(self):
+        html = "<html><body><p>The council met on Tuesday and approved the budget.</p></body></html>"
+        with mock.patch('readability.Document') as document, \
+                mock.patch('tweetfinder.language.detect_most_likely') as detect_most_likely:
+            article = Article(html=html.encode("utf-8"), prefilter=True)
+            assert article.list_embedded_tweets() == []
+            assert article.list_mentioned_tweets() == []
+            document.assert_not_called()
+            detect_most_likely.assert_not_called()
+
+    def testUtf16(self):
+        # we can't look for markers in bytes like these, so they are always processed
+        html = "<html><body><p>She tweeted about it earlier today.</p></body></html>"
+        article = Article(html=html.encode("utf-16"), prefilter=True, language='en')
+        assert article.count_mentioned_tweets() == 1
+
+
+class TestScriptEmbeds(TestCase):
+    """
+    Test finding tweets that Javascript would embed, from the scripts on the page
+    """
+
+    HTML = '<html><body><p>The story.</p><div data-tweet-id="20"></div>' \
+           '<script>twttr.widgets.createTweet("1234", document.getElementById("t"));</script></body></html>'
+
+    def testOptIn(self):
+        assert Article(html=self.HTML).count_embedded_tweets() == 0
+        for lazy in [False, True]:
+            article = Article(html=self.HTML, script_embeds=True, lazy=lazy)
+            assert [t['tweet_id'] for t in article.list_embedded_tweets()] == ['20', '1234']
+
+    def testOnlyAddsToFixtures(self):
+        article = _load_fixture("buzzfeed.html")
+        html = _load_fixture("buzzfeed.html", return_article=False)
+        with_scripts = Article(html=html, script_embeds=True)
+        assert with_scripts.list_embedded_tweets()[:article.count_embedded_tweets()] == article.list_embedded_tweets()
+        assert with_scripts.count_embedded_tweets() == 13
+        assert Article(html=html, script_embeds=True, prefilter=True).list_embedded_tweets() == \
+            with_scripts.list_embedded_tweets()
+
+
 class TestArticleViaSelenium(TestCase):
     """
     Test, and provide an example, of how to use Selenium to parse HTML rendered by a JS-heaving webpage.
@@ -0,0 +1,96 @@
+import os
+import pickle
+from unittest import mock
+
+from tweetfinder import Article, process_many, get_matcher
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+FIXTURES = ["time.html", "guardian.html", "npr.html", "cnn.html"]
+
+
+def _load_fixtures():
+    html = []
+    for filename in FIXTURES:
+        with open(os.path.join(fixtures_dir, filename)) as f:
+            html.append(f.read())
+    return html
+
+
+class TestProcessMany:
+
+    def test_same_as_article_in_order(self):
+        pages = _load_fixtures()
+        results = list(process_many(pages, workers=2, chunk_size=1, max_in_flight=2))
+        assert [r['index'] for r in results] == list(range(len(pages)))
+        for page, result in zip(pages, results):
+            article = Article(html=page)
+            assert result['error'] is None
+            assert result['embeds'] == article.list_embedded_tweets()
+            assert result['mentions'] == article.list_mentioned_tweets()
+
+    def test_unordered(self):
+        pages = _load_fixtures()
+        results = list(process_many(iter(pages), workers=2, chunk_size=1, ordered=False))
+        assert sorted([r['index'] for r in results]) == list(range(len(pages)))
+        by_index = {r['index']: r for r in results}
+        assert len(by_index[0]['embeds']) == 11
+
+    def test_in_this_process(self):
+        pages = _load_fixtures()
+        results = list(process_many(pages, workers=1))
+        assert [len(r['embeds']) for r in results] == [11, 0, 0, 1]
+
+    def test_custom_mentions_and_errors(self):
+        matcher = get_matcher(['randomly tweeted'])
+        items = [dict(html=_load_fixtures()[1]), dict(), "<p>no mentions here</p>"]
+        results = list(process_many(items, workers=2, mentions_list=matcher))
+        assert [m['phrase'] for m in results[0]['mentions']] == ['randomly tweeted']
+        assert results[1]['embeds'] is None
+        assert results[1]['error'].startswith('ValueError')
+        assert results[2]['mentions'] == []
+
+    def test_matcher_pickles(self):
+        matcher = get_matcher(['tweeted', 'in a tweet'])
+        copy = pickle.loads(pickle.dumps(matcher))
+        assert copy.phrases == matcher.phrases
+        assert copy.find_all("she tweeted") == matcher.find_all("she tweeted")
+
+
+class TestDedup:
+
+    def _pages(self):
+        time_page, guardian_page, npr_page, cnn_page = _load_fixtures()
+        # a syndicated copy of the guardian story, with different page around it and an edited sentence
+        copy = guardian_page.replace("One of the biggest challenges", "One of the greatest challenges")
+        copy = copy.replace("<title>", "<title>Syndicated: ")
+        return [guardian_page, time_page, copy, npr_page, guardian_page, cnn_page, copy]
+
+    def test_in_this_process(self):
+        pages = self._pages()
+        results = list(process_many(pages, workers=1, dedup=True))
+        assert [r['duplicate_of'] for r in results] == [None, None, 0, None, 0, None, 0]
+        assert results[2]['mentions'] == results[0]['mentions']
+        assert results[2]['language'] == 'en'
+        assert all('fingerprint' not in r for r in results)
+        assert [len(r['embeds']) for r in results] == [0, 11, 0, 0, 0, 1, 0]
+
+    def test_workers_agree(self):
+        pages = self._pages()
+        expected = list(process_many(pages, workers=1, dedup=True))
+        for ordered in [True, False]:
+            results = list(process_many(pages, workers=2, chunk_size=2, ordered=ordered, dedup=True))
+            assert sorted(results, key=lambda r: r['index']) == expected
+
+    def test_skips_work_for_duplicates(self):
+        guardian_page = _load_fixtures()[1]
+        with mock.patch('tweetfinder.matcher.MentionMatcher.find_all', autospec=True, return_value=[]) as find_all, \
+                mock.patch('tweetfinder.language.detect_most_likely', return_value='en') as detect:
+            results = list(process_many([guardian_page] * 3, workers=1, dedup=True))
+        assert [r['duplicate_of'] for r in results] == [None, 0, 0]
+        assert find_all.call_count == 1
+        assert detect.call_count == 1
+
+    def test_off_by_default(self):
+        assert all('duplicate_of' not in r for r in process_many(self._pages()[:3], workers=1))
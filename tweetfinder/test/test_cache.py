@@ -0,0 +1,135 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+from unittest import TestCase, mock
+
+from tweetfinder import Article, process_many
+from tweetfinder.cache import ParseCache
+from tweetfinder.stats import StageStats
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _fixture_html(filename: str) -> str:
+    with open(os.path.join(fixtures_dir, filename)) as f:
+        return f.read()
+
+
+class TestParseCache(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def testGetAndPut(self):
+        cache = ParseCache(self.cache_path)
+        key = cache.key("<html><body>hello</body></html>")
+        assert key == cache.key(b"<html><body>hello</body></html>")
+        assert key != cache.key("<html><body>goodbye</body></html>")
+        assert key != cache.key("<html><body>hello</body></html>", "script_embeds")
+        assert cache.get(key) is None
+        cache.put(key, dict(embeds=[], language='en'))
+        assert cache.get(key) == dict(embeds=[], language='en')
+        assert len(cache) == 1
+        # it is still there when the file is opened again
+        cache.close()
+        assert ParseCache(self.cache_path).get(key) == dict(embeds=[], language='en')
+
+    def testVersionInKey(self):
+        key = ParseCache.key("<html></html>")
+        with mock.patch('tweetfinder.__version__', '0.0.0'):
+            assert ParseCache.key("<html></html>") != key
+
+    def testEviction(self):
+        cache = ParseCache(self.cache_path, max_bytes=2000)
+        for i in range(10):
+            cache.put(str(i), dict(text=os.urandom(200).hex()))
+            cache.get('0')  # keep using the first one, so it isn't the least recently used
+        assert cache.size_bytes() <= 2000
+        assert cache.get('0') is not None
+        assert cache.get('1') is None
+        assert cache.get('9') is not None
+
+    def testSizeKeptUpToDate(self):
+        cache = ParseCache(self.cache_path)
+        cache.put('a', dict(text='a' * 100))
+        cache.put('b', dict(text=os.urandom(100).hex()))
+        cache.put('a', dict(text=os.urandom(100).hex()))  # replacing one only counts its new size
+        with sqlite3.connect(self.cache_path) as db:
+            assert cache.size_bytes() == db.execute("SELECT SUM(size) FROM parse_results").fetchone()[0]
+            # a cache from before the size was kept starts from what is in it
+            db.execute("DROP TABLE cache_info")
+        assert ParseCache(self.cache_path).size_bytes() == cache.size_bytes()
+        cache.clear()
+        assert cache.size_bytes() == 0
+
+    def testPickle(self):
+        cache = pickle.loads(pickle.dumps(ParseCache(self.cache_path, max_bytes=1234)))
+        assert cache.path == self.cache_path
+        assert cache.max_bytes == 1234
+
+    def testArticle(self):
+        html = _fixture_html("guardian.html")
+        uncached = Article(html=html)
+        cache = ParseCache(self.cache_path)
+        Article(html=html, cache=cache)
+        assert len(cache) == 1
+        # the second time nothing is parsed again, and only the mentions are searched for
+        stats = StageStats()
+        with mock.patch('readability.Document') as document:
+            article = Article(html=html, cache=cache, stats=stats)
+            document.assert_not_called()
+        assert set(stats.to_dict().keys()) == {'mentions'}
+        assert article.get_content() == uncached.get_content()
+        assert article.list_embedded_tweets() == uncached.list_embedded_tweets()
+        assert article.get_language() == 'en'
+        assert article.list_mentioned_tweets() == uncached.list_mentioned_tweets()
+        # a different phrase list reuses the cached content too
+        article = Article(html=html, cache=cache, mentions_list=['twitter'])
+        assert article.list_mentioned_tweets() == Article(html=html, mentions_list=['twitter']).list_mentioned_tweets()
+
+    def testExtractorInKey(self):
+        html = _fixture_html("guardian.html")
+        cache = ParseCache(self.cache_path)
+        Article(html=html, cache=cache)
+        article = Article(html=html, cache=cache, extractor='density')
+        assert len(cache) == 2
+        assert article.get_content() == Article(html=html, extractor='density').get_content()
+
+    def testEncodingInKey(self):
+        html = "<html><body><p>Caf\u00e9 owners tweeted about it, in a long enough story to keep.</p></body></html>"
+        cache = ParseCache(self.cache_path)
+        first = Article(html=html.encode('utf-8'), encoding='utf-8', cache=cache)
+        article = Article(html=html.encode('utf-8'), encoding='windows-1252', cache=cache)
+        assert len(cache) == 2
+        assert article.get_content() == Article(html=html.encode('utf-8'), encoding='windows-1252').get_content()
+        assert article.get_content() != first.get_content()
+
+    def testLazyArticle(self):
+        html = _fixture_html("time.html")
+        cache = ParseCache(self.cache_path)
+        article = Article(html=html, cache=cache, lazy=True)
+        article.list_embedded_tweets()
+        assert len(cache) == 0  # not everything has been found yet
+        article.list_mentioned_tweets()
+        assert len(cache) == 1
+
+    def testPassedInLanguageNotCached(self):
+        html = _fixture_html("time.html")
+        cache = ParseCache(self.cache_path)
+        Article(html=html, cache=cache, language='fr')
+        article = Article(html=html, cache=cache)
+        assert article.get_language() == 'en'
+        assert cache.get(cache.key(html))['language'] == 'en'
+
+    def testProcessMany(self):
+        cache = ParseCache(self.cache_path)
+        items = [_fixture_html(filename) for filename in ["time.html", "npr.html"]]
+        first = list(process_many(items, workers=2, chunk_size=1, cache=cache))
+        assert len(cache) == 2
+        assert list(process_many(items, workers=2, chunk_size=1, cache=cache)) == first
@@ -0,0 +1,105 @@
+import os
+import csv
+import json
+import tempfile
+from unittest import TestCase
+
+from tweetfinder import cli
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _fixture_html(filename: str) -> str:
+    with open(os.path.join(fixtures_dir, filename)) as f:
+        return f.read()
+
+
+class TestCorpusRunner(TestCase):
+    """
+    Test running a corpus of stories from a file through the command-line tool
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, "stories.jsonl")
+        with open(self.input_path, "w") as f:
+            for stories_id, filename in enumerate(["time.html", "npr.html", "cnn.html", "guardian.html"]):
+                f.write(json.dumps(dict(stories_id=stories_id, html=_fixture_html(filename))) + "\n")
+            f.write(json.dumps(dict(stories_id=99)) + "\n")  # no url or html, so this one fails
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read_jsonl(self, path: str):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def testJsonl(self):
+        output_path = os.path.join(self.temp_dir.name, "results.jsonl")
+        cli.main([self.input_path, output_path, "--workers", "2", "--chunk-size", "1"])
+        records = self._read_jsonl(output_path)
+        assert [r['stories_id'] for r in records] == [0, 1, 2, 3, 99]
+        assert [len(r['embeds']) for r in records[:4]] == [11, 0, 1, 0]
+        assert len(records[3]['mentions']) == 2
+        assert records[4]['embeds'] is None
+        assert records[4]['error'].startswith("ValueError")
+
+    def testCsv(self):
+        output_path = os.path.join(self.temp_dir.name, "results.csv")
+        cli.main([self.input_path, output_path, "--workers", "1"])
+        with open(output_path) as f:
+            rows = list(csv.DictReader(f))
+        assert [row['embed_count'] for row in rows] == ['11', '0', '1', '0', '0']
+        assert rows[0]['tweet_ids'].split(" ")[1] == "580932146874957824"
+        assert rows[3]['mention_count'] == '2'
+
+    def testLargeCsvField(self):
+        csv_path = os.path.join(self.temp_dir.name, "stories.csv")
+        html = _fixture_html("buzzfeed.html")
+        assert len(html) > 131072  # csv's default limit on the size of a field
+        with open(csv_path, "w", newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['stories_id', 'html'])
+            writer.writeheader()
+            writer.writerow(dict(stories_id=1, html=html))
+        output_path = os.path.join(self.temp_dir.name, "results.jsonl")
+        cli.main([csv_path, output_path, "--workers", "1"])
+        records = self._read_jsonl(output_path)
+        assert records[0]['error'] is None
+        assert len(records[0]['embeds']) == 13
+
+    def testDedup(self):
+        with open(self.input_path, "a") as f:
+            f.write(json.dumps(dict(stories_id=100, html=_fixture_html("guardian.html"))) + "\n")
+        output_path = os.path.join(self.temp_dir.name, "results.csv")
+        cli.main([self.input_path, output_path, "--workers", "2", "--dedup"])
+        with open(output_path) as f:
+            rows = list(csv.DictReader(f))
+        assert [row['duplicate_of'] for row in rows] == ['', '', '', '', '', '3']
+        assert rows[5]['mention_count'] == '2'
+
+    def testDedupIdZero(self):
+        with open(self.input_path, "a") as f:
+            f.write(json.dumps(dict(stories_id=100, html=_fixture_html("time.html"))) + "\n")
+        output_path = os.path.join(self.temp_dir.name, "results.jsonl")
+        cli.main([self.input_path, output_path, "--workers", "1", "--dedup"])
+        with open(output_path) as f:
+            records = [json.loads(line) for line in f]
+        assert records[5]['duplicate_of'] == 0
+
+    def testResume(self):
+        output_path = os.path.join(self.temp_dir.name, "results.jsonl")
+        cli.run(self.input_path, output_path, workers=1, checkpoint_every=2)
+        complete = self._read_jsonl(output_path)
+        # pretend we crashed after the second checkpoint, partway through writing out another story
+        with open(output_path, "r+") as f:
+            f.seek(0)
+            lines = f.readlines()
+            f.seek(0)
+            f.truncate()
+            f.writelines(lines[:4])
+            f.write(lines[4][:10])
+        with open(output_path + ".checkpoint", "w") as f:
+            json.dump(dict(stories_done=4, output_bytes=len("".join(lines[:4]))), f)
+        assert cli.run(self.input_path, output_path, workers=1, resume=True) == 1
+        assert self._read_jsonl(output_path) == complete
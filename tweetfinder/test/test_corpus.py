@@ -0,0 +1,134 @@
+import os
+import gzip
+import zlib
+import shutil
+import tempfile
+from unittest import TestCase
+
+from tweetfinder import Article, process_many
+from tweetfinder.corpus import read_corpus, CorpusRecord
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _fixture_bytes(filename: str) -> bytes:
+    with open(os.path.join(fixtures_dir, filename), 'rb') as f:
+        return f.read()
+
+
+def _warc_record(record_type: str, url: str, block: bytes, content_type: str) -> bytes:
+    headers = "WARC/1.0\r\nWARC-Type: {}\r\nWARC-Target-URI: {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n\r\n"\
+        .format(record_type, url, content_type, len(block))
+    return headers.encode() + block + b"\r\n\r\n"
+
+
+def _http_response(body: bytes, content_type: str = "text/html; charset=utf-8", status: str = "200 OK",
+                   extra_headers: str = "") -> bytes:
+    headers = "HTTP/1.1 {}\r\nContent-Type: {}\r\n{}Content-Length: {}\r\n\r\n".format(status, content_type,
+                                                                                   extra_headers, len(body))
+    return headers.encode() + body
+
+
+def _chunked(body: bytes, chunk_size: int = 1000) -> bytes:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    return b"".join([b"%x\r\n" % len(chunk) + chunk + b"\r\n" for chunk in chunks]) + b"0\r\n\r\n"
+
+
+def _warc_records():
+    """A mix of records, only some of which are webpages we should process."""
+    return [
+        _warc_record("warcinfo", "", b"software: test\r\n", "application/warc-fields"),
+        _warc_record("request", "https://time.com/story", b"GET /story HTTP/1.1\r\n\r\n", "application/http"),
+        _warc_record("response", "https://time.com/story", _http_response(_fixture_bytes("time.html")),
+                     "application/http; msgtype=response"),
+        _warc_record("response", "https://example.com/logo.png", _http_response(b"\x89PNG", "image/png"),
+                     "application/http; msgtype=response"),
+        _warc_record("response", "https://example.com/missing",
+                     _http_response(b"<html></html>", status="404 Not Found"), "application/http; msgtype=response"),
+        _warc_record("response", "https://guardian.com/story",
+                     _http_response(_chunked(gzip.compress(_fixture_bytes("guardian.html"))),
+                                    extra_headers="Content-Encoding: gzip\r\nTransfer-Encoding: chunked\r\n"),
+                     "application/http; msgtype=response"),
+        _warc_record("resource", "file:///saved/npr.html", _fixture_bytes("npr.html"), "text/html"),
+    ]
+
+
+class TestCorpus(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.warc_path = os.path.join(self.temp_dir, "crawl.warc")
+        with open(self.warc_path, 'wb') as f:
+            f.write(b"".join(_warc_records()))
+        self.warc_gz_path = os.path.join(self.temp_dir, "crawl.warc.gz")
+        with open(self.warc_gz_path, 'wb') as f:
+            f.write(b"".join([gzip.compress(record) for record in _warc_records()]))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _check_records(self, records):
+        assert [record.url for record in records] == ["https://time.com/story", "https://guardian.com/story",
+                                                      "file:///saved/npr.html"]
+        assert records[0].encoding == "utf-8"
+        assert bytes(records[0].read()) == _fixture_bytes("time.html")
+        assert bytes(records[1].read()) == _fixture_bytes("guardian.html")
+        assert bytes(records[2].read()) == _fixture_bytes("npr.html")
+
+    def testWarc(self):
+        records = list(read_corpus(self.warc_path))
+        self._check_records(records)
+        # the page is a view straight into the file, not a copy
+        assert isinstance(records[0].read(), memoryview)
+        with open(self.warc_path, 'rb') as f:
+            f.seek(records[0].offset)
+            assert f.read(records[0].length) == _fixture_bytes("time.html")
+
+    def testMultipleEncodings(self):
+        html = _fixture_bytes("time.html")
+        warc_path = os.path.join(self.temp_dir, "encodings.warc")
+        with open(warc_path, 'wb') as f:
+            # deflated and then gzipped, listed with a space after the comma
+            f.write(_warc_record("response", "https://time.com/story",
+                                 _http_response(_chunked(gzip.compress(zlib.compress(html))),
+                                                extra_headers="Content-Encoding: deflate, gzip\r\n"
+                                                              "Transfer-Encoding: identity, chunked\r\n"),
+                                 "application/http; msgtype=response"))
+        records = list(read_corpus(warc_path))
+        assert records[0].content_encoding == "chunked,gzip,deflate"
+        assert bytes(records[0].read()) == html
+
+    def testGzippedWarc(self):
+        self._check_records(list(read_corpus(self.warc_gz_path)))
+
+    def testDirectory(self):
+        html_dir = os.path.join(self.temp_dir, "pages")
+        os.makedirs(os.path.join(html_dir, "more"))
+        shutil.copy(os.path.join(fixtures_dir, "time.html"), html_dir)
+        shutil.copy(os.path.join(fixtures_dir, "npr.html"), os.path.join(html_dir, "more"))
+        with open(os.path.join(html_dir, "notes.txt"), 'w') as f:
+            f.write("not a webpage")
+        records = list(read_corpus(html_dir))
+        assert [os.path.basename(record.path) for record in records] == ["time.html", "npr.html"]
+        assert bytes(records[1].read()) == _fixture_bytes("npr.html")
+
+    def testArticle(self):
+        record = next(read_corpus(self.warc_path))
+        article = Article(html=record.read(), encoding=record.encoding)
+        expected = Article(html=_fixture_bytes("time.html"))
+        assert article.list_embedded_tweets() == expected.list_embedded_tweets()
+        assert article.list_mentioned_tweets() == expected.list_mentioned_tweets()
+        assert Article(html=record.read(), prefilter=True, lazy=True).count_embedded_tweets() == 11
+
+    def testProcessMany(self):
+        for workers in [1, 2]:
+            results = list(process_many(read_corpus([self.warc_path, self.warc_gz_path]), workers=workers,
+                                        chunk_size=2))
+            assert [len(result['embeds']) for result in results] == [11, 0, 0] * 2
+            assert len(results[1]['mentions']) == 2
+            # each result points back to where it came from
+            source = results[3]['source']
+            assert source['path'] == self.warc_gz_path
+            assert bytes(CorpusRecord(source['path'], source['offset'], source['length']).read()) == \
+                _fixture_bytes("time.html")
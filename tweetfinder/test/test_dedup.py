@@ -0,0 +1,66 @@
+import os
+
+from tweetfinder import Article
+from tweetfinder.dedup import DuplicateIndex, fingerprint, similarity, _band_rows, NUM_PERMUTATIONS
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _fixture_text(filename: str) -> str:
+    with open(os.path.join(fixtures_dir, filename)) as f:
+        return Article(html=f.read())._get_content_no_tags()
+
+
+class TestFingerprint:
+
+    def test_exact(self):
+        first = fingerprint("The council met on Tuesday.\n\nIt approved the budget!")
+        second = fingerprint("the council met on tuesday - it approved   the budget")
+        assert first.digest == second.digest
+        assert similarity(first, second) == 1.0
+        assert fingerprint("The council met on Wednesday.").digest != first.digest
+
+    def test_near_duplicate(self):
+        text = _fixture_text("guardian.html")
+        edited = fingerprint(text.replace("One of the biggest challenges", "One of the greatest challenges"))
+        original = fingerprint(text)
+        assert edited.digest != original.digest
+        assert similarity(edited, original) > 0.9
+        assert similarity(original, fingerprint(_fixture_text("npr.html"))) < 0.1
+
+    def test_no_words(self):
+        assert fingerprint("") is None
+        assert fingerprint(" - \n") is None
+        assert len(fingerprint("short").signature) == NUM_PERMUTATIONS
+
+    def test_band_rows(self):
+        for threshold in [0.5, 0.8, 0.9]:
+            rows = _band_rows(threshold)
+            assert NUM_PERMUTATIONS % rows == 0
+            assert (rows / NUM_PERMUTATIONS) ** (1 / rows) <= threshold
+
+
+class TestDuplicateIndex:
+
+    def test_find(self):
+        text = _fixture_text("guardian.html")
+        index = DuplicateIndex()
+        index.add('guardian', fingerprint(text), 'guardian results')
+        index.add('npr', fingerprint(_fixture_text("npr.html")), 'npr results')
+        assert len(index) == 2
+        assert index.find(fingerprint(text.upper())) == 'guardian'
+        assert index.find(fingerprint(text.replace("biggest", "greatest"))) == 'guardian'
+        assert index.find(fingerprint(_fixture_text("time.html"))) is None
+        # the first half of the article isn't similar enough
+        assert index.find(fingerprint(text[:len(text) // 2])) is None
+
+    def test_duplicates(self):
+        index = DuplicateIndex()
+        index.add(0, fingerprint("the first story"), 'first')
+        index.add_duplicate(3, 0)
+        index.add_duplicate(5, 3)
+        assert (3 in index) and (5 in index) and (4 not in index)
+        assert index.original(5) == 0
+        assert index.get(5) == 'first'
+        assert index.original(1) == 1
@@ -0,0 +1,145 @@
+import os
+import lxml.html
+
+from tweetfinder.embeds import find_embeds, scan_embeds
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _find(html: str, scripts: bool = False):
+    # both ways of finding embeds have to agree on everything
+    tweets = find_embeds(lxml.html.document_fromstring(html), scripts)
+    assert scan_embeds(html, scripts=scripts) == tweets
+    assert scan_embeds(html.encode("utf-8"), scripts=scripts) == tweets
+    return tweets
+
+
+class TestFindEmbeds:
+
+    def test_blockquote_url_pattern(self):
+        tweets = _find('<blockquote class="twitter-tweet"><p>hi</p><a>no link</a>'
+                       '<a href="https://twitter.com/someone">@someone</a>'
+                       '<a href="https://twitter.com/someone/status/1234?ref=src">date</a></blockquote>')
+        assert tweets == [dict(tweet_id='1234', username='someone',
+                               full_url='https://twitter.com/someone/status/1234?ref=src',
+                               html_source='blockquote url pattern')]
+
+    def test_blockquote_x_url(self):
+        tweets = _find('<blockquote class="twitter-tweet"><a href="https://x.com/someone/status/1234">date</a>'
+                       '</blockquote><blockquote><a href="https://twitter.com/i/web/status/5678">more</a></blockquote>')
+        assert tweets == [dict(tweet_id='1234', username='someone', full_url='https://x.com/someone/status/1234',
+                               html_source='blockquote url pattern'),
+                          dict(tweet_id='5678', full_url='https://twitter.com/i/web/status/5678',
+                               html_source='blockquote url pattern')]
+
+    def test_blockquote_url_fallback(self):
+        tweets = _find('<blockquote><a href="https://twitter.com/someone">@someone</a></blockquote>')
+        assert len(tweets) == 1
+        assert tweets[0]['html_source'] == 'blockquote url fallback'
+        assert tweets[0]['full_url'] == 'https://twitter.com/someone'
+
+    def test_blockquote_without_tweet(self):
+        assert _find('<blockquote><a href="https://example.com/">quote</a></blockquote>') == []
+
+    def test_div_with_data_embed_id(self):
+        tweets = _find('<div class="media  embed-twitter" data-embed-id="42"></div>'
+                       '<div class="embed-twitter-like" data-embed-id="43"></div>')
+        assert tweets == [dict(tweet_id='42', html_source='div with data-embed-id')]
+
+    def test_rendered_iframe(self):
+        tweets = _find('<div class="twitter-tweet twitter-tweet-rendered"><iframe data-tweet-id="99"></iframe></div>')
+        assert tweets == [dict(tweet_id='99', html_source='rendered iframe')]
+
+    def test_nested(self):
+        tweets = _find('<blockquote><a href="https://twitter.com/a/status/1">1</a>'
+                       '<blockquote><a href="https://twitter.com/b/status/2">2</a></blockquote></blockquote>'
+                       '<div class="twitter-tweet-rendered"><iframe data-tweet-id="3"></iframe>'
+                       '<div class="twitter-tweet-rendered"><iframe data-tweet-id="4"></iframe></div></div>')
+        assert [t['tweet_id'] for t in tweets] == ['1', '2', '3', '4', '4']
+
+    def test_no_embeds(self):
+        assert _find('<html><body><p>Nothing to see <b>here</b></p></body></html>') == []
+
+
+class TestScanEmbeds:
+
+    def test_same_as_tree_on_fixtures(self):
+        for filename in os.listdir(fixtures_dir):
+            if filename.endswith(".html"):
+                with open(os.path.join(fixtures_dir, filename), "rb") as f:
+                    raw_html = f.read()
+                assert scan_embeds(raw_html) == find_embeds(lxml.html.document_fromstring(raw_html)), filename
+
+    def test_upper_case_tags(self):
+        tweets = _find('<BLOCKQUOTE><A HREF="https://twitter.com/a/status/1">1</A></BLOCKQUOTE>')
+        assert [t['tweet_id'] for t in tweets] == ['1']
+
+
+class TestScriptEmbeds:
+
+    def test_not_by_default(self):
+        assert _find('<div data-tweet-id="1"></div><script>twttr.widgets.createTweet("2", el);</script>') == []
+
+    def test_data_tweet_id(self):
+        tweets = _find('<div class="tweet-placeholder" data-tweet-id="1"></div>', scripts=True)
+        assert tweets == [dict(tweet_id='1', html_source='data-tweet-id attribute')]
+
+    def test_widgets_js(self):
+        tweets = _find("<script>twttr.widgets.createTweet( '20', document.getElementById('tweet'));</script>",
+                       scripts=True)
+        assert tweets == [dict(tweet_id='20', html_source='script widgets.js')]
+
+    def test_oembed(self):
+        tweets = _find('<script>fetch("https://publish.twitter.com/oembed?url=https%3A%2F%2Ftwitter.com%2Fsomeone'
+                       '%2Fstatus%2F55&omit_script=1")</script>', scripts=True)
+        assert tweets == [dict(tweet_id='55', username='someone', full_url='https://twitter.com/someone/status/55',
+                               html_source='script oembed')]
+
+    def test_embed_html(self):
+        tweets = _find('<script>var embed = "<blockquote class=\\"twitter-tweet\\"><a href=\\"https:\\/\\/x.com'
+                       '\\/someone\\/status\\/7\\">date<\\/a><\\/blockquote>";</script>', scripts=True)
+        assert tweets == [dict(tweet_id='7', username='someone', full_url='https://x.com/someone/status/7',
+                               html_source='script embed html')]
+
+    def test_json(self):
+        tweets = _find('<script id="__NEXT_DATA__" type="application/json">{"props": {"blocks": ['
+                       '{"type": "tweet", "tweetId": "11"}, '
+                       '{"type": "embed", "url": "https://twitter.com/a/status/12"},'
+                       '{"type": "html", "html": "<blockquote><a href=\\"https://twitter.com/b/status/13\\">b</a>'
+                       '</blockquote>"}, {"type": "text", "text": "See https://twitter.com/c/status/14 for more"}]}}'
+                       '</script><script type="application/ld+json">{"@type": "VideoObject", '
+                       '"embedUrl": "https://x.com/d/status/15"}</script>', scripts=True)
+        assert [(t['tweet_id'], t['html_source']) for t in tweets] == [('11', 'script json'), ('12', 'script json'),
+                                                                       ('13', 'script json'), ('15', 'script json')]
+
+    def test_links_in_json_dont_count(self):
+        # an ordinary link in the rich text of the article, and a JSON-LD citation
+        assert _find('<p>As <a href="https://twitter.com/bob/status/111">Bob said</a>.</p>'
+                     '<script id="__NEXT_DATA__" type="application/json">{"props": {"body": [{"type": "paragraph", '
+                     '"children": [{"type": "link", "href": "https://twitter.com/bob/status/111", '
+                     '"children": [{"text": "Bob said"}]}]}]}}</script>'
+                     '<script type="application/ld+json">{"@type": "NewsArticle", '
+                     '"citation": "https://x.com/a/status/222"}</script>', scripts=True) == []
+
+    def test_links_in_scripts_dont_count(self):
+        assert _find('<script>var shareUrl = "https://twitter.com/intent/tweet?url=x";'
+                     'var related = "https://twitter.com/someone/status/1";</script>', scripts=True) == []
+
+    def test_only_new_tweets(self):
+        tweets = _find('<blockquote class="twitter-tweet"><a href="https://twitter.com/a/status/1">1</a></blockquote>'
+                       '<script>twttr.widgets.createTweet("1", a); twttr.widgets.createTweet("2", b);'
+                       'twttr.widgets.createTweet("2", c);</script>', scripts=True)
+        assert [(t['tweet_id'], t['html_source']) for t in tweets] == [('1', 'blockquote url pattern'),
+                                                                       ('2', 'script widgets.js')]
+
+    def test_same_as_tree_on_fixtures(self):
+        for filename in os.listdir(fixtures_dir):
+            if filename.endswith(".html"):
+                with open(os.path.join(fixtures_dir, filename), "rb") as f:
+                    raw_html = f.read()
+                tweets = find_embeds(lxml.html.document_fromstring(raw_html), scripts=True)
+                assert scan_embeds(raw_html, scripts=True) == tweets, filename
+                # scripts only ever add tweets
+                without_scripts = find_embeds(lxml.html.document_fromstring(raw_html))
+                assert tweets[:len(without_scripts)] == without_scripts, filename
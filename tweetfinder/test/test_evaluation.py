@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from unittest import TestCase
+
+from tweetfinder import Article
+from tweetfinder.evaluation import SnapshotStore, take_snapshots, evaluate, score_tweet_ids, RAW, RENDERED
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+TIME_TWEET_IDS = ['567053242429734913', '580932146874957824', '811531782982078464', '819044196371800065',
+                  '266031293945503744', '551561686755598336', '474141231996350466', '590682675847032833',
+                  '120620074301267968', '849813577770778624', '440322224407314432']
+
+
+def _fixture_bytes(filename: str) -> bytes:
+    with open(os.path.join(fixtures_dir, filename), 'rb') as f:
+        return f.read()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class TestScoreTweetIds:
+
+    def test_score(self):
+        tp, fp, fn = score_tweet_ids([['1', '2', '2', '9'], [], ['5']], [['1', '2', '3'], ['4'], ['5']])
+        assert tp.tolist() == [2, 0, 1]
+        assert fp.tolist() == [1, 0, 0]
+        assert fn.tolist() == [1, 1, 0]
+
+    def test_same_tweet_in_other_article(self):
+        # finding the right tweet in the wrong article doesn't count
+        tp, fp, fn = score_tweet_ids([['1'], ['2']], [['2'], ['1']])
+        assert tp.tolist() == [0, 0]
+        assert fp.tolist() == [1, 1]
+
+    def test_empty(self):
+        tp, fp, fn = score_tweet_ids([], [])
+        assert len(tp) == 0
+        tp, fp, fn = score_tweet_ids([[]], [[]])
+        assert tp.tolist() == [0]
+
+
+class TestEvaluation(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def testStore(self):
+        self.store.save("https://time.com/story", _fixture_bytes("time.html"), encoding="utf-8")
+        self.store.save("https://time.com/story", "<html><body>rendered</body></html>", RENDERED)
+        reloaded = SnapshotStore(self.temp_dir)
+        assert len(reloaded) == 1
+        assert "https://time.com/story" in reloaded
+        assert reloaded.has("https://time.com/story", RENDERED)
+        record = reloaded.record("https://time.com/story", RAW)
+        assert bytes(record.read()) == _fixture_bytes("time.html")
+        assert record.encoding == "utf-8"
+        assert reloaded.record("https://example.com/other") is None
+
+    def testEvaluate(self):
+        self.store.save("https://time.com/story", _fixture_bytes("time.html"))
+        self.store.save("https://npr.org/story", _fixture_bytes("npr.html"))
+        answers = {
+            "https://time.com/story": TIME_TWEET_IDS[:10] + ['1'],
+            "https://npr.org/story": ['2'],
+            "https://example.com/never-saved": ['3', '4'],
+        }
+        time_mentions = Article(html=_fixture_bytes("time.html")).count_mentioned_tweets()
+        for workers in [1, 2]:
+            scores = evaluate(self.store, answers, workers=workers)
+            assert scores.true_positives.tolist() == [10, 0, 0]
+            assert scores.false_positives.tolist() == [1, 0, 0]
+            assert scores.false_negatives.tolist() == [1, 1, 2]
+            assert scores.missing.tolist() == [False, False, True]
+            assert scores.mention_counts.tolist() == [time_mentions, 0, -1]
+            assert scores.precision == 10 / 11
+            assert scores.recall == 10 / 14
+        assert scores.to_dict()['url'] == list(answers)
+
+    def testTakeSnapshots(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=fixtures_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            base_url = "http://127.0.0.1:{}/".format(server.server_address[1])
+            urls = [base_url + "time.html", base_url + "npr.html", base_url + "missing.html"]
+            rendered = []
+
+            def render(url):
+                rendered.append(url)
+                return "<html><body><p>rendered {}</p></body></html>".format(url)
+
+            assert take_snapshots(urls, self.store, render=render) == 5
+            assert bytes(self.store.record(urls[0]).read()) == _fixture_bytes("time.html")
+            assert not self.store.has(urls[2], RAW)
+            assert self.store.has(urls[2], RENDERED)
+            # nothing is downloaded or rendered again
+            assert take_snapshots(urls[:2], self.store, render=render) == 0
+            assert len(rendered) == 3
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,101 @@
+import os
+import re
+
+import lxml.html
+import pytest
+
+from tweetfinder import Article
+from tweetfinder.extractors import ContentExtractor, ReadabilityExtractor, DensityExtractor, get_extractor
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+PAGE = """<html><head><title>Story</title><script>var tweeted = "in a tweet";</script></head><body>
+<nav><ul><li><a href="/">Home</a></li><li><a href="/politics">Politics, elections, and more</a></li></ul></nav>
+<div class="main-content">
+  <h1>The council approved the budget</h1>
+  <div class="article-body" id="story">
+    <p>The council met on Tuesday, and after a long debate, approved the budget for next year by a vote of 7 to 2.</p>
+    <p>The mayor tweeted that she was pleased with the result, and thanked the members for their hard work on it.</p>
+    <p>Several residents spoke against the plan, saying it did too little for parks, libraries, and public pools.</p>
+  </div>
+</div>
+<aside class="sidebar"><p>Sign up for our newsletter, and get the latest news in a tweet every morning, for free!</p>
+</aside>
+<div class="related-stories"><p><a href="/1">Another story that was also tweeted about by lots of people</a></p></div>
+<footer><p>Copyright, all rights reserved, tweeted by nobody in particular at all, ever.</p></footer>
+</body></html>"""
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r'\w+', text.lower()))
+
+
+class TestReadabilityExtractor:
+
+    def test_text_is_the_content(self):
+        tree = lxml.html.document_fromstring(PAGE)
+        before = lxml.html.tostring(tree)
+        content, text = ReadabilityExtractor().extract(tree)
+        assert "The mayor tweeted that" in text
+        assert _words(text) == _words(lxml.html.fromstring(content).text_content())
+        assert lxml.html.tostring(tree) == before
+
+
+class TestDensityExtractor:
+
+    def test_picks_the_story(self):
+        tree = lxml.html.document_fromstring(PAGE)
+        before = lxml.html.tostring(tree)
+        content, text = DensityExtractor().extract(tree)
+        assert text.startswith("The council met on Tuesday")
+        assert "Several residents spoke" in text
+        for boilerplate in ["Politics", "newsletter", "Another story", "Copyright", "var tweeted"]:
+            assert boilerplate not in text
+        assert 'class="article-body"' in content
+        # the page is shared with finding embeds, so it can't be changed
+        assert lxml.html.tostring(tree) == before
+
+    def test_no_paragraphs(self):
+        content, text = DensityExtractor().extract(lxml.html.document_fromstring(
+            "<html><body><span>Just a line</span><script>x = 1;</script></body></html>"))
+        assert text == "Just a line"
+
+    def test_similar_to_readability_on_fixtures(self):
+        for filename in ["buzzfeed.html", "cnn.html", "guardian.html", "npr.html", "time.html"]:
+            with open(os.path.join(fixtures_dir, filename), "rb") as f:
+                tree = lxml.html.document_fromstring(f.read())
+            readability_words = _words(ReadabilityExtractor().extract(tree)[1])
+            density_words = _words(DensityExtractor().extract(tree)[1])
+            assert len(readability_words & density_words) / len(readability_words) > 0.95, filename
+            assert len(readability_words & density_words) / len(density_words) > 0.9, filename
+
+
+class TestExtractorInArticle:
+
+    def test_same_mentions_on_fixtures(self):
+        for filename in ["guardian.html", "time.html"]:
+            with open(os.path.join(fixtures_dir, filename)) as f:
+                html = f.read()
+            density = Article(html=html, extractor='density')
+            assert density.count_mentioned_tweets() == Article(html=html).count_mentioned_tweets()
+            assert density.get_language() == 'en'
+
+    def test_custom_extractor(self):
+        class FirstParagraph(ContentExtractor):
+            name = 'first paragraph'
+
+            def extract(self, html_tree):
+                paragraph = html_tree.find('.//p')
+                return lxml.html.tostring(paragraph, encoding='unicode'), paragraph.text_content()
+        article = Article(html=PAGE, extractor=FirstParagraph(), language='en')
+        assert [m['phrase'] for m in article.list_mentioned_tweets()] == []
+        assert article.get_content().startswith("<p>The council met")
+
+    def test_get_extractor(self):
+        assert isinstance(get_extractor(None), ReadabilityExtractor)
+        assert isinstance(get_extractor('density'), DensityExtractor)
+        extractor = DensityExtractor()
+        assert get_extractor(extractor) is extractor
+        with pytest.raises(ValueError):
+            get_extractor('goose')
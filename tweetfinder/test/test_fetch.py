@@ -0,0 +1,103 @@
+import os
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import TestCase
+
+from tweetfinder import Article
+from tweetfinder.fetch import Fetcher, fetch_and_process
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+# a page that only says what its encoding is in the HTML, not in the HTTP headers
+WINDOWS_1252_PAGE = ('<html><head><meta charset="windows-1252"></head><body><p>The mayor\u2019s office tweeted that '
+                     'the road would be closed all week.</p></body></html>').encode('windows-1252')
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """Serve the HTML fixtures, plus a page that fails a couple of times before it works."""
+
+    failures_left = 0
+
+    def do_GET(self):
+        if self.path == '/windows-1252.html':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(WINDOWS_1252_PAGE)))
+            self.end_headers()
+            self.wfile.write(WINDOWS_1252_PAGE)
+            return
+        if self.path == '/flaky.html':
+            if _FixtureHandler.failures_left > 0:
+                _FixtureHandler.failures_left -= 1
+                self.send_response(503)
+                self.end_headers()
+                return
+            self.path = '/time.html'
+        filename = os.path.join(fixtures_dir, os.path.basename(self.path))
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                body = f.read()
+            self.send_response(200)
+        else:
+            body = b"<html><body><p>Not found</p></body></html>"
+            self.send_response(404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetcher(TestCase):
+    """
+    Test downloading via a local stand-in for news websites
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testFetch(self):
+        async def fetch():
+            async with Fetcher() as fetcher:
+                return await fetcher.fetch(self.base_url + "/npr.html")
+        html, encoding = asyncio.run(fetch())
+        with open(os.path.join(fixtures_dir, "npr.html"), 'rb') as f:
+            assert html == f.read()
+        assert encoding == 'utf-8'
+
+    def testRetries(self):
+        _FixtureHandler.failures_left = 2
+
+        async def fetch():
+            async with Fetcher(retries=2, backoff_secs=0.01) as fetcher:
+                return await fetcher.fetch(self.base_url + "/flaky.html")
+        html, encoding = asyncio.run(fetch())
+        assert Article(html=html, encoding=encoding).count_embedded_tweets() == 11
+
+    def testFetchAndProcess(self):
+        urls = [self.base_url + "/" + name for name in ["time.html", "guardian.html", "missing.html"]]
+        urls.append("http://127.0.0.1:1/unreachable.html")
+        urls.append(self.base_url + "/windows-1252.html")
+
+        async def process():
+            fetcher = Fetcher(retries=0, concurrency=2)
+            return [result async for result in fetch_and_process(urls, fetcher=fetcher)]
+        results = {result['url']: result for result in asyncio.run(process())}
+        assert len(results[urls[0]]['embeds']) == 11
+        with open(os.path.join(fixtures_dir, "guardian.html")) as f:
+            assert results[urls[1]]['mentions'] == Article(html=f.read()).list_mentioned_tweets()
+        assert results[urls[2]]['embeds'] == []  # like Article, a 404 page is still parsed
+        assert results[urls[3]]['embeds'] is None
+        assert results[urls[3]]['error'] is not None
+        # the encoding declared in the HTML is used when the server doesn't send one
+        assert "mayor\u2019s office" in results[urls[4]]['mentions'][0]['context']
@@ -0,0 +1,61 @@
+import sys
+import subprocess
+
+# the most time (in microseconds) that importing `Article` may take, not counting what Python loads at startup
+IMPORT_TIME_BUDGET = 50000
+
+# these take a while to import, so only the things that need them should load them
+HEAVY_MODULES = ['readability', 'requests', 'py3langid', 'numpy', 'aiohttp']
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+
+
+def _import_time(code: str) -> int:
+    """Add up how long (in microseconds) the code's own imports took, via `python -X importtime`."""
+    total = 0
+    started = False
+    for line in _run(code).stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == 'site':
+            started = True  # everything before this is Python starting up
+        elif started and not name.startswith('  '):  # only count each top-level import once
+            total += int(cumulative)
+    return total
+
+
+def _loaded_heavy_modules(code: str) -> list:
+    code += "\nimport sys\nprint(' '.join(name for name in {} if name in sys.modules))".format(HEAVY_MODULES)
+    return _run(code).stdout.split()
+
+
+class TestImports:
+
+    def test_package_is_light(self):
+        assert _loaded_heavy_modules("import tweetfinder") == []
+        assert _loaded_heavy_modules("from tweetfinder import Article, process_many, get_matcher") == []
+
+    def test_embeds_only(self):
+        code = "from tweetfinder import Article\n" \
+               "article = Article(html='<blockquote><a href=\"https://x.com/a/status/1\">1</a></blockquote>', " \
+               "lazy=True)\n" \
+               "assert article.count_embedded_tweets() == 1"
+        assert _loaded_heavy_modules(code) == []
+
+    def test_loaded_when_needed(self):
+        code = "from tweetfinder import Article\n" \
+               "Article(html='<p>She tweeted about it earlier today.</p>').list_mentioned_tweets()"
+        assert set(_loaded_heavy_modules(code)) == {'readability', 'py3langid', 'numpy'}
+
+    def test_density_extractor(self):
+        code = "from tweetfinder import Article\n" \
+               "Article(html='<p>She tweeted about it earlier today.</p>', extractor='density').list_mentioned_tweets()"
+        assert set(_loaded_heavy_modules(code)) == {'py3langid', 'numpy'}
+
+    def test_budget(self):
+        # take the fastest of a few tries, so a busy machine doesn't fail this
+        import_time = min(_import_time("from tweetfinder import Article") for _ in range(3))
+        assert import_time < IMPORT_TIME_BUDGET, "importing Article took {}us".format(import_time)
@@ -0,0 +1,131 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from tweetfinder import process_many
+from tweetfinder.index import TweetIndex
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _embeds(*tweet_ids):
+    return [dict(tweet_id=tweet_id, html_source='blockquote url pattern') for tweet_id in tweet_ids]
+
+
+class TestTweetIndex(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "index")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _build(self, segment_size: int = 3) -> TweetIndex:
+        index = TweetIndex(self.path, segment_size=segment_size)
+        index.add(_embeds('5', '7', '5'), url='https://a.com/1', outlet='a', published='2021-05-01')
+        index.add([], url='https://b.com/1', outlet='b', published='2021-05-02')
+        index.add(_embeds('7') + [dict(full_url='https://twitter.com/someone', html_source='blockquote url fallback')],
+                  url='https://a.com/2', outlet='a', published='2021-06-01')
+        index.add(_embeds('18446744073709551615'), url='https://b.com/2', outlet='b', published='2021-05-20')
+        return index
+
+    def testLookups(self):
+        index = self._build()
+        # the last article hasn't been written out yet, but is still found
+        assert index.segment_count == 1
+        assert len(index) == 4
+        assert index.articles_with_tweet('7') == [0, 2]
+        assert index.articles_with_tweet(18446744073709551615) == [3]
+        assert index.articles_with_tweet('8') == []
+        assert index.articles_with_tweet('not a tweet id') == []
+        assert '5' in index
+        assert index.tweets_in_article(0) == ['5', '7']
+        assert index.tweets_in_article(1) == []
+        assert index.article(2)['url'] == 'https://a.com/2'
+
+    def testReopen(self):
+        with self._build() as index:
+            index.add(_embeds('9'), url='https://c.com/1')
+        index = TweetIndex(self.path)
+        assert len(index) == 5
+        assert index.segment_count == 2
+        assert index.articles_with_tweet('7') == [0, 2]
+        assert index.tweets_in_article(4) == ['9']
+        assert [info['url'] for info in index.articles()][-1] == 'https://c.com/1'
+
+    def testFindArticles(self):
+        index = self._build()
+        assert index.find_articles(outlet='a') == [0, 2]
+        may = index.find_articles(since='2021-05-01', until='2021-06-01')
+        assert may == [0, 1, 3]
+        assert index.tweets_in_articles(index.find_articles(outlet='a', since='2021-05-01', until='2021-06-01')) == \
+            ['5', '7']
+
+    def testMerge(self):
+        index = self._build(segment_size=1)
+        index.flush()
+        assert index.segment_count == 4
+        index.merge()
+        assert index.segment_count == 1
+        assert len([name for name in os.listdir(self.path) if name.startswith("segment-")]) == 1
+        index = TweetIndex(self.path)
+        assert index.articles_with_tweet('7') == [0, 2]
+        assert index.tweets_in_article(3) == ['18446744073709551615']
+
+    def testAddIndex(self):
+        self._build().close()
+        with TweetIndex(os.path.join(self.temp_dir.name, "other")) as other:
+            other.add(_embeds('7', '11'), url='https://c.com/1')
+        index = TweetIndex(self.path)
+        index.add_index(other)
+        assert len(index) == 5
+        assert index.articles_with_tweet('7') == [0, 2, 4]
+        assert index.article(4)['url'] == 'https://c.com/1'
+        assert TweetIndex(self.path).tweets_in_article(4) == ['7', '11']
+
+    def testUnfinishedFlush(self):
+        self._build().close()
+        # pretend we crashed partway through adding another article
+        with open(os.path.join(self.path, "articles.jsonl"), "a") as f:
+            f.write('{"url": "https://never.com/fin')
+        index = TweetIndex(self.path)
+        assert len(index.articles()) == 4
+        index.add(_embeds('9'), url='https://c.com/1')
+        index.close()
+        assert TweetIndex(self.path).article(4)['url'] == 'https://c.com/1'
+
+    def testCrashBeforeManifest(self):
+        self._build().close()
+        index = TweetIndex(self.path)
+        index.add(_embeds('9'), url='https://c.com/1')
+        # pretend we crashed after writing the new segment, but before saving the manifest that points to it
+        with mock.patch.object(TweetIndex, '_save_manifest', side_effect=OSError("crashed")):
+            with self.assertRaises(OSError):
+                index.flush()
+        index = TweetIndex(self.path)
+        assert len(index) == 4
+        index.add(_embeds('9'), url='https://c.com/1')
+        index.add(_embeds('7'), url='https://c.com/2')
+        index.close()
+        index = TweetIndex(self.path)
+        assert index.articles_with_tweet('9') == [4]
+        assert index.articles_with_tweet('7') == [0, 2, 5]
+        index.merge()
+        assert len([name for name in os.listdir(self.path) if name.startswith("segment-")]) == 1
+
+    def testFromResults(self):
+        filenames = ["time.html", "npr.html", "cnn.html"]
+        pages = []
+        for filename in filenames:
+            with open(os.path.join(fixtures_dir, filename)) as f:
+                pages.append(f.read())
+        with TweetIndex(self.path) as index:
+            for filename, result in zip(filenames, process_many(pages, workers=1, lazy=True)):
+                index.add(result['embeds'], url=filename)
+        index = TweetIndex(self.path)
+        assert index.articles_with_tweet('580932146874957824') == [0]
+        assert len(index.tweets_in_article(0)) == 11
+        # the only embed in this one is a guess without a tweet id, so there's nothing to index
+        assert index.tweets_in_article(2) == []
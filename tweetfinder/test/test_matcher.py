@@ -0,0 +1,174 @@
+import os
+import re
+import sys
+import random
+import subprocess
+
+from tweetfinder import Article, mentions
+from tweetfinder.matcher import MentionMatcher, MENTIONS_CONTEXT_WINDOW_SIZE, get_matcher, get_language_matcher, \
+    _covering_stems, might_match_any_language
+
+
+def _find_one_phrase_at_a_time(phrases, text):
+    # the original approach, searching the whole text again for each phrase, that the matcher has to agree with
+    results = []
+    for twitter_phrase in sorted(set([p.strip().lower() for p in phrases])):
+        phrase_index = text.find(twitter_phrase)
+        while phrase_index != -1:
+            context_start = max(0, phrase_index - MENTIONS_CONTEXT_WINDOW_SIZE)
+            context_end = min(len(text), phrase_index + len(twitter_phrase) + MENTIONS_CONTEXT_WINDOW_SIZE)
+            results.append({'phrase': twitter_phrase, 'context': text[context_start:context_end],
+                            'content_start_index': phrase_index})
+            phrase_index = text.find(twitter_phrase, phrase_index + len(twitter_phrase))
+    return results
+
+
+class TestMentionMatcher:
+
+    def test_normalizes_phrases(self):
+        matcher = MentionMatcher([' Tweeted\n', 'tweeted', 'in a Tweet', ''])
+        assert matcher.phrases == ['in a tweet', 'tweeted']
+        assert len(matcher) == 2
+
+    def test_order_and_context(self):
+        matcher = MentionMatcher(['tweeted', 'in a tweet'])
+        text = "she tweeted this. then in a tweet he tweeted back"
+        found = matcher.find_all(text)
+        assert [m['phrase'] for m in found] == ['in a tweet', 'tweeted', 'tweeted']
+        assert [m['content_start_index'] for m in found] == [23, 4, 37]
+        assert found[0]['context'] == text
+
+    def test_overlapping_phrases(self):
+        # a phrase never overlaps itself, but different phrases can share text
+        matcher = MentionMatcher(['aa', 'retweet', 'tweet'])
+        assert _find_one_phrase_at_a_time(['aa', 'retweet', 'tweet'], "aaaaa retweets") == \
+            matcher.find_all("aaaaa retweets")
+
+    def test_empty(self):
+        assert MentionMatcher([]).find_all("tweeted") == []
+        assert MentionMatcher(['tweeted']).find_all("") == []
+
+    def test_same_as_one_phrase_at_a_time(self):
+        phrases = list(mentions.ALL) + ['a', 'ab', 'aba', 'b a']
+        matcher = MentionMatcher(phrases)
+        rng = random.Random(42)
+        words = ['tweet', 'tweets', 'retweeted', 'on twitter', 'a', 'b', 'ab', "'s", ' ', ' ', 'in a', 'from']
+        for _ in range(200):
+            text = "".join(rng.choice(words) for _ in range(rng.randint(0, 150)))
+            assert matcher.find_all(text) == _find_one_phrase_at_a_time(phrases, text)
+
+
+class TestMightMatch:
+
+    def test_default_stems(self):
+        assert _covering_stems(get_matcher().phrases) == ['twitter', 'tweet']
+
+    def test_might_match(self):
+        matcher = get_matcher()
+        assert matcher.might_match("<p>She RETWEETED it</p>")
+        assert matcher.might_match(b"<a href='https://Twitter.com/someone'>her account</a>")
+        assert not matcher.might_match("<p>Nothing to see here, according to officials.</p>")
+        assert not matcher.might_match(b"<p>Nothing to see here.</p>")
+
+    def test_never_misses_a_mention(self):
+        phrases = list(mentions.ALL) + ['a', 'ab', 'aba', 'b a']
+        matcher = MentionMatcher(phrases)
+        rng = random.Random(42)
+        words = ['tweet', 'twitter', 'Twitter', 'retweeted', 'posted', 'a', 'b', 'ab', "'s", ' ', 'in a', 'from']
+        for _ in range(200):
+            text = "".join(rng.choice(words) for _ in range(rng.randint(0, 20)))
+            if len(matcher.find_all(text)) > 0:
+                assert matcher.might_match(text)
+                assert matcher.might_match(text.encode('utf-8'))
+
+    def test_phrase_without_stem(self):
+        # we can't rule out a phrase that is only punctuation, so everything might match
+        matcher = MentionMatcher(['tweeted', '!!!'])
+        assert matcher.might_match("<p>Nothing to see here.</p>")
+        assert not MentionMatcher([]).might_match("<p>tweeted</p>")
+
+
+class TestGetMatcher:
+
+    def test_default_is_shared(self):
+        assert get_matcher() is get_matcher()
+        assert get_matcher().phrases == sorted(set([p.strip().lower() for p in mentions.ALL]))
+
+    def test_cached_by_phrases(self):
+        matcher = get_matcher(['tweeted', 'in a tweet'])
+        assert get_matcher(['in a tweet', 'tweeted']) is matcher
+        assert get_matcher(matcher) is matcher
+        assert get_matcher(['tweeted']) is not matcher
+
+    def test_articles_share_matcher(self):
+        matcher = get_matcher(['tweeted'])
+        article = Article(html="<html><body><p>She tweeted about it earlier today.</p></body></html>",
+                          mentions_list=matcher)
+        assert article.count_mentioned_tweets() == 1
+        assert article.list_mentioned_tweets()[0]['phrase'] == 'tweeted'
+
+
+class TestLanguageMatchers:
+
+    SAMPLES = {
+        'en': "She tweeted about it earlier today.",
+        'es': "El ministro tuiteó su respuesta esa misma noche.",
+        'de': "Die Ministerin hat am Abend getwittert, dass sie zurücktritt.",
+        'fr': "Le ministre a tweeté sa réponse le soir même.",
+        'pt': "O ministro tuitou sua resposta na mesma noite.",
+    }
+
+    def test_each_language(self):
+        for language, text in self.SAMPLES.items():
+            matcher = get_language_matcher(language)
+            assert len(matcher.find_all(text)) == 1, language
+            assert matcher.might_match(text.encode('utf-8')), language
+            assert get_language_matcher(language) is matcher
+            assert Article(html="<html><body><p>{}</p></body></html>".format(text),
+                           language=language).count_mentioned_tweets() == 1, language
+
+    def test_packs(self):
+        for language in ['es', 'de', 'fr', 'pt']:
+            with open(os.path.join(os.path.dirname(mentions.__file__), "data", "mentions-{}.txt".format(language)),
+                      encoding="utf-8") as f:
+                assert f.readline().startswith("# "), language  # says where the phrases came from
+            phrases = [phrase.strip().lower() for phrase in mentions.for_language(language)]
+            assert all(not phrase.startswith('#') for phrase in phrases), language
+            # the prefilter needs a stem of a few letters in every phrase, or it matches almost every page
+            assert all(re.search(r'[a-z0-9]{3,}', phrase) for phrase in phrases), language
+            # one mention would be counted twice if a phrase was in another one
+            contained = [(short, long) for short in phrases for long in phrases if (short != long) and (short in long)]
+            assert not contained, language
+
+    def test_any_language_stems(self):
+        # every phrase in every pack has to have one of the stems, or the prefilter could skip a page with a mention
+        for language in mentions.LANGUAGES:
+            for phrase in mentions.for_language(language):
+                assert any(stem in phrase.strip().lower() for stem in mentions.ALL_LANGUAGES_STEMS), phrase
+        for text in self.SAMPLES.values():
+            assert might_match_any_language(text) and might_match_any_language(text.encode('utf-8'))
+        assert not might_match_any_language(b"<html><body><p>Nothing to see here.</p></body></html>")
+
+    def test_prefilter_reads_no_packs(self):
+        code = "from tweetfinder import Article, mentions\n" \
+               "Article(html='<p>El ministro habla.</p>', prefilter=True, lazy=True).list_mentioned_tweets()\n" \
+               "print(sorted(name for name in ['SPANISH', 'GERMAN', 'FRENCH', 'PORTUGUESE'] if name in vars(mentions)))"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "[]"
+
+    def test_english_is_default(self):
+        assert get_language_matcher('en') is get_matcher()
+        assert mentions.for_language('en') is mentions.ALL
+
+    def test_unsupported(self):
+        assert get_language_matcher('it') is None
+        assert mentions.for_language('it') is None
+
+    def test_loaded_lazily(self):
+        # only the packs for languages we actually see are ever read
+        code = "from tweetfinder import Article, mentions\n" \
+               "Article(html='<p>El ministro tuiteó su respuesta.</p>', language='es').list_mentioned_tweets()\n" \
+               "print(sorted(name for name in ['SPANISH', 'GERMAN', 'FRENCH', 'PORTUGUESE', 'ALL'] " \
+               "if name in vars(mentions)))"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "['SPANISH']"
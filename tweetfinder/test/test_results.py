@@ -0,0 +1,101 @@
+import os
+import json
+import pickle
+import tempfile
+
+import numpy as np
+
+from tweetfinder import Article, process_many
+from tweetfinder.results import EmbeddedTweet, Mention, ColumnarResults, MENTIONS_CONTEXT_WINDOW_SIZE
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _fixture_html(filename: str) -> str:
+    with open(os.path.join(fixtures_dir, filename)) as f:
+        return f.read()
+
+
+class TestEmbeddedTweet:
+
+    def test_like_a_dict(self):
+        tweet = EmbeddedTweet('123', 'blockquote url pattern', username='someone',
+                              full_url='https://twitter.com/someone/status/123')
+        assert tweet == dict(tweet_id='123', username='someone', full_url='https://twitter.com/someone/status/123',
+                             html_source='blockquote url pattern')
+        assert tweet['username'] == 'someone'
+        assert json.loads(json.dumps(dict(tweet))) == tweet
+
+    def test_missing_keys(self):
+        tweet = EmbeddedTweet('42', 'div with data-embed-id')
+        assert dict(tweet) == dict(tweet_id='42', html_source='div with data-embed-id')
+        assert 'username' not in tweet
+        assert tweet.get('username') is None
+        assert not hasattr(tweet, '__dict__')
+
+
+class TestMention:
+
+    def test_context(self):
+        text = "a" * 300 + "tweeted" + "b" * 300
+        mention = Mention('tweeted', 300, text)
+        assert mention['context'] == text[300 - MENTIONS_CONTEXT_WINDOW_SIZE:307 + MENTIONS_CONTEXT_WINDOW_SIZE]
+        assert Mention('tweeted', 0, "tweeted it")['context'] == "tweeted it"
+        assert dict(mention) == dict(phrase='tweeted', context=mention.context, content_start_index=300)
+        assert not hasattr(mention, '__dict__')
+
+    def test_pickle(self):
+        text = "a" * 10000 + "tweeted" + "b" * 10000
+        mention = Mention('tweeted', 10000, text)
+        pickled = pickle.dumps(mention)
+        assert len(pickled) < 1000  # only the context is sent along, not the whole text
+        assert pickle.loads(pickled) == mention
+
+
+class TestArticleRelease:
+
+    def test_release(self):
+        html = _fixture_html("guardian.html")
+        article = Article(html=html, lazy=True)
+        article.release()
+        assert article.get_html() is None
+        assert article.get_content() is None
+        uncached = Article(html=html)
+        assert article.list_embedded_tweets() == uncached.list_embedded_tweets()
+        assert article.list_mentioned_tweets() == uncached.list_mentioned_tweets()
+        assert article.get_language() == 'en'
+
+
+class TestColumnarResults:
+
+    def test_from_results(self):
+        items = [_fixture_html(filename) for filename in ["time.html", "guardian.html", "npr.html"]]
+        items.append(dict())  # no url or html, so this one fails
+        results = list(process_many(items, workers=1))
+        columns = ColumnarResults.from_results(results)
+        assert len(columns) == 4
+        assert columns.articles['embed_count'].tolist() == [11, 0, 0, 0]
+        assert columns.articles['language'].tolist() == ['en', 'en', 'en', '']
+        assert columns.articles['error'][3].startswith('ValueError')
+        assert len(columns.embeds['tweet_id']) == 11
+        assert columns.embeds['tweet_id'][1] == "580932146874957824"
+        assert (columns.embeds['article'] == 0).all()
+        guardian_phrases = columns.mentions['phrase'][columns.mentions['article'] == 1]
+        assert guardian_phrases.tolist() == [m['phrase'] for m in results[1]['mentions']]
+        assert columns.mentions['content_start_index'].dtype == np.int64
+
+    def test_save_and_load(self):
+        columns = ColumnarResults.from_results(process_many([_fixture_html("time.html")], workers=1))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "results.npz")
+            columns.save(path)
+            loaded = ColumnarResults.load(path)
+        assert loaded.to_dict().keys() == columns.to_dict().keys()
+        for name, values in columns.to_dict().items():
+            assert (loaded.to_dict()[name] == values).all()
+
+    def test_empty(self):
+        columns = ColumnarResults.from_results([])
+        assert len(columns) == 0
+        assert len(columns.mentions['phrase']) == 0
@@ -0,0 +1,61 @@
+import os
+
+from tweetfinder import Article
+from tweetfinder.stats import StageStats, STAGES, set_default_stats, get_default_stats
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+
+def _fixture_html(filename: str) -> str:
+    with open(os.path.join(fixtures_dir, filename)) as f:
+        return f.read()
+
+
+class TestStageStats:
+
+    def test_record(self):
+        stats = StageStats()
+        stats.record('parse', 0.5, 100, 1)
+        stats.record('parse', 1.5, 300, 1)
+        stats.record('embeds', 0.25, 100, 3)
+        totals = stats.to_dict()
+        assert totals['parse'] == dict(count=2, secs=2.0, max_secs=1.5, input_size=400, output_count=2)
+        assert totals['embeds']['output_count'] == 3
+        stats.reset()
+        assert stats.to_dict() == {}
+
+    def test_prometheus(self):
+        stats = StageStats()
+        stats.record('mentions', 0.5, 100, 2)
+        text = stats.to_prometheus()
+        assert '# TYPE tweetfinder_stage_seconds_total counter' in text
+        assert 'tweetfinder_stage_runs_total{stage="mentions"} 1' in text
+        assert 'tweetfinder_stage_output_count_total{stage="mentions"} 2' in text
+
+    def test_article_stages(self):
+        stats = StageStats()
+        html = _fixture_html("time.html")
+        article = Article(html=html, stats=stats)
+        totals = stats.to_dict()
+        assert list(totals.keys()) == [stage for stage in STAGES if stage not in ('download', 'prefilter')]
+        assert all([t['count'] == 1 for t in totals.values()])
+        assert totals['parse']['input_size'] == len(html)
+        assert totals['embeds']['output_count'] == article.count_embedded_tweets()
+        assert totals['mentions']['output_count'] == article.count_mentioned_tweets()
+
+    def test_lazy_article_stages(self):
+        stats = StageStats()
+        Article(html=_fixture_html("time.html"), stats=stats, lazy=True).count_embedded_tweets()
+        assert list(stats.to_dict().keys()) == ['embeds']
+
+    def test_default_stats(self):
+        stats = StageStats()
+        set_default_stats(stats)
+        try:
+            assert get_default_stats() is stats
+            Article(html=_fixture_html("npr.html"))
+        finally:
+            set_default_stats(None)
+        Article(html=_fixture_html("npr.html"))
+        assert stats.to_dict()['extract']['count'] == 1
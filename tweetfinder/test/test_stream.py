@@ -0,0 +1,67 @@
+import io
+import os
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+from unittest import TestCase
+
+import lxml.html
+
+from tweetfinder.embeds import find_embeds
+from tweetfinder.stream import scan_embeds_stream, embeds_from_file, embeds_from_url
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+fixtures_dir = os.path.join(this_dir, "fixtures")
+
+FIXTURES = ["1987377089.html", "buzzfeed.html", "cnn.html", "guardian.html", "npr.html", "time.html"]
+
+
+def _fixture_embeds(filename: str):
+    with open(os.path.join(fixtures_dir, filename), 'rb') as f:
+        return find_embeds(lxml.html.document_fromstring(f.read()))
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class TestStreaming(TestCase):
+
+    def testSameAsTree(self):
+        for filename in FIXTURES:
+            # small chunks, so plenty of tags are split across them
+            tweets = embeds_from_file(os.path.join(fixtures_dir, filename), chunk_size=1000)
+            assert tweets == _fixture_embeds(filename)
+
+    def testEncoding(self):
+        html = '<html><head><meta charset="iso-8859-1"></head><body>' \
+               '<blockquote><p>Caf\xe9</p><a href="https://twitter.com/Caf\xe9Fan/status/42">x</a></blockquote>' \
+               '</body></html>'
+        tweets = embeds_from_file(io.BytesIO(html.encode('latin-1')), chunk_size=10)
+        assert tweets[0]['tweet_id'] == '42'
+        assert tweets[0]['full_url'] == 'https://twitter.com/Caf\xe9Fan/status/42'
+        assert scan_embeds_stream([html.encode('latin-1')], encoding='latin-1') == tweets
+
+    def testBoundedMemory(self):
+        # only counts memory used by Python objects, not by the parser itself
+        chunk_size = 32 * 1024
+        path = os.path.join(fixtures_dir, "cnn.html")
+        tracemalloc.start()
+        embeds_from_file(path, chunk_size=chunk_size)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert os.path.getsize(path) > 20 * chunk_size
+        assert peak < 5 * chunk_size
+
+    def testUrl(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=fixtures_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = "http://127.0.0.1:{}/time.html".format(server.server_address[1])
+            assert embeds_from_url(url, chunk_size=4096) == _fixture_embeds("time.html")
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,47 @@
+from tweetfinder.urls import parse_tweet_url, parse_tweet_urls, is_twitter_link, TweetUrl
+
+
+class TestParseTweetUrl:
+
+    def test_forms(self):
+        expected = {
+            'https://twitter.com/someone/status/1234': ('1234', 'someone'),
+            'http://twitter.com/someone/statuses/1234?ref_src=twsrc%5Etfw': ('1234', 'someone'),
+            'https://twitter.com/#!/someone/status/1234': ('1234', 'someone'),
+            'https://www.twitter.com/someone/status/1234/photo/1': ('1234', 'someone'),
+            'https://mobile.twitter.com/someone/status/1234': ('1234', 'someone'),
+            'https://m.twitter.com/someone/status/1234': ('1234', 'someone'),
+            'HTTPS://TWITTER.COM/SomeOne/STATUS/1234': ('1234', 'SomeOne'),
+            'https://x.com/someone/status/1234': ('1234', 'someone'),
+            'https://mobile.x.com/someone/status/1234': ('1234', 'someone'),
+            'https://twitter.com/i/web/status/1234': ('1234', None),
+            'https://x.com/i/status/1234': ('1234', None),
+        }
+        for url, (tweet_id, username) in expected.items():
+            assert parse_tweet_url(url) == TweetUrl(tweet_id, username, url), url
+
+    def test_not_tweets(self):
+        for url in ['https://twitter.com/someone', 'https://twitter.com/hashtag/news', 'https://example.com/status/1',
+                    'https://box.com/someone/status/1234', 'https://notx.com/someone/status/1234',
+                    'see https://twitter.com/someone/status/1234', '/someone/status/1234', '']:
+            assert parse_tweet_url(url) is None, url
+
+
+class TestParseTweetUrls:
+
+    def test_batch(self):
+        urls = ['https://example.com/', None, 'https://x.com/a/status/1', '', 'https://twitter.com/i/web/status/2']
+        assert parse_tweet_urls(urls) == [None, None, TweetUrl('1', 'a', urls[2]), None, TweetUrl('2', None, urls[4])]
+        assert parse_tweet_urls(iter(urls)) == [parse_tweet_url(url or '') for url in urls]
+        assert parse_tweet_urls([]) == []
+
+
+class TestIsTwitterLink:
+
+    def test_links(self):
+        assert is_twitter_link('https://twitter.com/someone')
+        assert is_twitter_link('https://publish.twitter.com/?url=x')
+        assert is_twitter_link('https://x.com/someone')
+        assert is_twitter_link('https://mobile.x.com/hashtag/news')
+        assert not is_twitter_link('https://box.com/someone')
+        assert not is_twitter_link('https://example.com/x')
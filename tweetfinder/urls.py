@@ -0,0 +1,59 @@
+"""
+Recognize links to tweets, in all the forms they come in: `twitter.com` and `x.com`, with or without `www.`, `mobile.`
+or `m.`, old `#!/` links, `/statuses/`, and `/i/web/status/` links that don't say who tweeted it. Works on one URL, or
+on a whole list (or column) of them in one call, so it can be used on links from anywhere - not just ones in an
+`Article`.
+"""
+
+import re
+from typing import Iterable, List, NamedTuple, Optional
+
+# modified from https://stackoverflow.com/questions/4138483/twitter-status-url-regex
+TWEET_URL_PATTERN = re.compile(
+    r'^https?://(?:(?:www|mobile|m)\.)?(?:twitter|x)\.com/(?:#!/)?(?:i/(?:web/)?status|(\w+)/status(?:es)?)/(\d+)',
+    re.IGNORECASE)
+
+# anything that links to twitter at all (ie. a profile or a hashtag), whether or not it is to a specific tweet
+TWITTER_LINK_PATTERN = re.compile(r'twitter\.com|//(?:[\w-]+\.)?x\.com', re.IGNORECASE)
+
+
+class TweetUrl(NamedTuple):
+    """A link to a single tweet."""
+    tweet_id: str
+    username: Optional[str]  # `None` for links that don't say who tweeted it (ie. `/i/web/status/`)
+    url: str  # the whole link, as it was passed in
+
+
+def parse_tweet_url(url: str) -> Optional[TweetUrl]:
+    """
+    Figure out which tweet a URL links to.
+    :param url: any URL
+    :return: the tweet it links to, or `None` if it isn't a link to a tweet
+    """
+    match = TWEET_URL_PATTERN.match(url)
+    if match is None:
+        return None
+    return TweetUrl(match.group(2), match.group(1), url)
+
+
+def parse_tweet_urls(urls: Iterable[str]) -> List[Optional[TweetUrl]]:
+    """
+    Figure out which tweet each of a bunch of URLs links to (ie. every link on a page, or a column of links from some
+    other dataset). This is the same as calling `parse_tweet_url` on each one, except that missing values are fine.
+    :param urls: any URLs. `None`s (ie. missing values) are allowed, and aren't links to tweets.
+    :return: the tweet each one links to (or `None` if it doesn't), in the same order
+    """
+    match = TWEET_URL_PATTERN.match
+    tweets = []
+    for url in urls:
+        found = match(url) if url else None
+        tweets.append(None if found is None else TweetUrl(found.group(2), found.group(1), url))
+    return tweets
+
+
+def is_twitter_link(url: str) -> bool:
+    """
+    Whether or not a URL seems to link to twitter at all.
+    :param url: any URL
+    """
+    return TWITTER_LINK_PATTERN.search(url) is not None